@@ -1,6 +1,7 @@
 #!/bin/bash
-# ensure-sprites.sh — WSL起動時にPixoo用スプライトを/tmpにコピー
+# ensure-sprites.sh — WSL起動時にPixoo用スプライトを/tmpにコピー + atlas生成
 # lobster-desktop-widget/assets/sprites/ → /tmp/lob64-*.png
+#                                        → ~/.local/share/pixoo-display/sprites.atlas
 
 SPRITES="/home/yama/lobster-desktop-widget/assets/sprites"
 DEST="/tmp"
@@ -37,3 +38,17 @@ if [ "$COPIED" -gt 0 ]; then
 else
     echo "[$(date '+%Y-%m-%d %H:%M:%S')] All sprites already in place"
 fi
+
+# Packed sprite atlas (~/.local/share/pixoo-display/sprites.atlas) — survives /tmp wipes,
+# mmap'd by the display daemon at startup. /tmp PNGs above remain the fallback.
+# 再生成は atlas が無いか、元 PNG / 生成スクリプトの方が新しいときだけ
+ATLAS="$HOME/.local/share/pixoo-display/sprites.atlas"
+BUILDER="$(dirname "$0")/pixoo-display-test.py"
+if [ -f "$ATLAS" ] && [ ! "$BUILDER" -nt "$ATLAS" ] \
+        && [ -z "$(find "$SPRITES" -name '*.png' -newer "$ATLAS" -print -quit)" ]; then
+    echo "[$(date '+%Y-%m-%d %H:%M:%S')] Sprite atlas up to date"
+elif python3 "$BUILDER" --build-sprite-atlas "$SPRITES"; then
+    echo "[$(date '+%Y-%m-%d %H:%M:%S')] Sprite atlas rebuilt"
+else
+    echo "[WARN] Sprite atlas build failed — display will decode /tmp PNGs" >&2
+fi
@@ -10,6 +10,7 @@ Usage:
   python3 pixoo-agent-ctl.py remove-all <char>            # remove ALL entries for a char
   python3 pixoo-agent-ctl.py clear                        # remove all
   python3 pixoo-agent-ctl.py list                         # show current state
+  python3 pixoo-agent-ctl.py notify on|off                # hand the device to a notification / take it back
 
 Characters: opus, sonnet, haiku, gemini, kusomegane, codex, grok
 """
@@ -21,6 +22,7 @@ import uuid
 from pathlib import Path
 
 STATE_FILE = Path("/tmp/pixoo-agents.json")
+NOTIFY_MODE_FILE = Path("/tmp/pixoo-notify-mode")  # display pauses pushes while this exists
 VALID_CHARS = {"opus", "sonnet", "haiku", "gemini", "kusomegane", "codex", "grok"}
 
 
@@ -127,6 +129,15 @@ def cmd_list() -> None:
         print(f"  [{agent_id}] {a['char']}: {a['task']} ({m}:{s:02d} elapsed)")
 
 
+def cmd_notify(mode: str) -> None:
+    if mode == "on":
+        NOTIFY_MODE_FILE.touch()
+        print("[notify] on — display paused")
+    else:
+        NOTIFY_MODE_FILE.unlink(missing_ok=True)
+        print("[notify] off — display resumed")
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(__doc__)
@@ -143,6 +154,8 @@ if __name__ == "__main__":
         cmd_clear()
     elif action == "list":
         cmd_list()
+    elif action == "notify" and len(sys.argv) >= 3 and sys.argv[2] in ("on", "off"):
+        cmd_notify(sys.argv[2])
     else:
         print(__doc__)
         sys.exit(1)
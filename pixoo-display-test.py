@@ -10,18 +10,34 @@ Pixoo-64 status display v6
 from __future__ import annotations
 
 import argparse
+import asyncio
+import base64
+import ctypes
+import ctypes.util
+import hashlib
+import http.client
 import json
+import mmap
 import os
+import struct
 import sys
+import tempfile
+import threading
 import time
-import types
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
+from io import BytesIO
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, NamedTuple, Sequence, Tuple
 
 import logging
 import re
 
-from PIL import Image, ImageDraw, ImageFont
+STARTUP_T0 = time.monotonic()  # time-to-first-pixel is measured from here (stdlib imports are ~free)
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
@@ -29,54 +45,33 @@ import os as _os
 if _os.environ.get("PIXOO_DEBUG") == "1":
     logging.basicConfig(level=logging.DEBUG, format="[%(name)s] %(levelname)s: %(message)s")
 
+# Pilmoji is imported on first use (load_pilmoji) — it pulls in requests, the slowest import here
+Pilmoji = None
+_PILMOJI_EMOJI_RE = None
 
-def _ensure_pixoo_import_works_without_tk() -> None:
-    try:
-        import tkinter  # noqa: F401
-        return
-    except Exception:
-        pass
-    tk_stub = types.ModuleType("tkinter")
-
-    class _Dummy:
-        def __init__(self, *a, **kw): pass
-        def __getattr__(self, _): return lambda *a, **k: None
-        def pack(self, *a, **kw): pass
-        def create_image(self, *a, **kw): return None
-        def itemconfig(self, *a, **kw): pass
-        def update(self, *a, **kw): pass
-        def title(self, *a, **kw): pass
-        def geometry(self, *a, **kw): pass
-        def attributes(self, *a, **kw): pass
-
-    tk_stub.Tk = _Dummy
-    tk_stub.Canvas = _Dummy
-    sys.modules.setdefault("tkinter", tk_stub)
-    imgtk_stub = types.ModuleType("PIL.ImageTk")
-
-    class PhotoImage:
-        def __init__(self, *a, **kw): pass
-
-    imgtk_stub.PhotoImage = PhotoImage
-    sys.modules.setdefault("PIL.ImageTk", imgtk_stub)
-
+# Frame dedup hash: xxhash when installed (fast), blake2b otherwise
+try:
+    import xxhash  # noqa: E402
 
-_ensure_pixoo_import_works_without_tk()
-from pixoo import Pixoo  # noqa: E402
-from pilmoji import Pilmoji  # noqa: E402
+    def frame_digest(data) -> bytes:
+        return xxhash.xxh3_64_digest(data)
+except ImportError:
+    def frame_digest(data) -> bytes:  # type: ignore[misc]
+        return hashlib.blake2b(data, digest_size=8).digest()
 
-# Phase 6: notify mode integration (fallback to always-False if import fails)
+# Phase 6: notify mode integration — legacy check, polled off the frame path (NOTIFY_MODE_FILE is the fast path)
 try:
     sys.path.insert(0, "/home/yama/pixoo-follow-notify")
     from src.pixoo_mode import is_notify_mode  # noqa: E402
     print("[i] Phase 6: notify mode import OK")
 except Exception:
-    def is_notify_mode() -> bool:  # type: ignore[misc]
-        return False
-    print("[!] Phase 6: notify mode import FAILED, fallback to always-False")
+    is_notify_mode = None
+    print("[!] Phase 6: notify mode import FAILED, NOTIFY_MODE_FILE only")
 
 # --- Config ---
 PIXOO_IP = "192.168.86.42"
+PIXOO_HTTP_TIMEOUT_SEC = 5.0
+GIF_ID_RESET_AT = 32  # Draw/ResetHttpGifId once PicID reaches this (same limit as the pixoo library)
 DISPLAY_SIZE = 64
 FRAME_INTERVAL_MS = 250
 SCROLL_SPEED_MS = 150  # ~6.7 FPS scroll (Phase 5-C: reduced from 100ms to save CPU)
@@ -84,9 +79,18 @@ WORKER_SCROLL_PAUSE_TICKS = 10  # frames to pause at end of worker name before r
 TEXT_STEP_PX = 1
 CHARACTER_SWAP_SEC = 5.0
 STATE_FILE = Path("/tmp/pixoo-agents.json")
-STATE_POLL_SEC = 3.0  # Phase 5-C: sync daemon polls every 3s, no need to check faster
+STATE_STAT_POLL_SEC = 0.5  # state file stat() interval when inotify is unavailable
+NOTIFY_MODE_FILE = Path("/tmp/pixoo-notify-mode")  # exists while a notification owns the device
+NOTIFY_LEGACY_POLL_SEC = 1.0  # is_notify_mode() interval (only when pixoo-follow-notify imports)
 SLEEP_AFTER_SEC = 1200  # 20 minutes idle — 10分だとロブ🦞が思考中に寝てしまう問題の修正
 AGENT_TTL_SEC = 600    # auto-expire agents after 10 minutes (safety net)
+DEDUP_STATS_SEC = 300  # log pushed/skipped frame counts every 5 minutes
+RENDER_AHEAD_FRAMES = 8  # frames composed ahead of their deadline on the worker thread
+LOOP_STABLE_SEC = 10.0   # state unchanged this long → precompute the whole rotation/scroll loop
+LOOP_CACHE_MAX = 2048    # encoded frames kept per state (~16 KiB each)
+LOOP_SCAN_TICKS = 16384  # longest loop (frame + scroll ticks) searched for a repeat
+TICK_LATE_MS = 20        # a tick running later than this past its deadline counts as a miss
+LATENESS_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)  # TickStats histogram bounds
 
 SCROLL_FONT_SIZE = 10
 UI_FONT_SIZE = 8
@@ -95,6 +99,8 @@ FALLBACK_TICKER = "ロブ稼働中！サブエージェント待機中..."
 SLEEP_TICKER = "ロブ就寝中...zzZ"
 TODO_FILE = Path("/mnt/c/Users/danpu/OneDrive/Desktop/obsidianVault/openclaw/memory/tasks/todo-priority.md")
 TODO_POLL_SEC = 60  # re-read todo file every 60s
+TICKER_FETCH_TIMEOUT_SEC = 5.0  # a ticker source slower than this is skipped for the round (/mnt/c stalls)
+TICKER_TTL_SEC = 600  # a source's last text is trusted this long without a successful refresh
 
 # Git repos to scan for latest commits (ticker display)
 GIT_REPOS = [
@@ -111,7 +117,8 @@ GIT_REPOS = [
     Path("/home/yama/tuya-home-proxy"),
     Path("/home/yama/pixoo-notify-proxy"),
 ]
-GIT_POLL_SEC = 30  # re-scan git repos every 30s
+GIT_POLL_SEC = 30  # full re-scan of git repos (catches what the inotify watches miss, e.g. /mnt/c)
+GIT_SETTLE_SEC = 0.05  # after a repo change event, wait for the rest of the commit's writes
 
 CHARACTER_FRAMES = {
     "opus":       [f"/tmp/lob64-opus-frame{i}.png" for i in range(1, 5)],
@@ -123,6 +130,15 @@ CHARACTER_FRAMES = {
     "grok":       [f"/tmp/lob64-grok-frame{i}.png" for i in range(1, 5)],
 }
 SLEEP_FRAMES = [f"/tmp/lob64-opus-sleep-frame{i}.png" for i in range(1, 5)]
+SLEEP_SPRITE = "_sleep"  # SpriteStore name for SLEEP_FRAMES
+SPRITE_TOP_CROP = 4      # px trimmed off the top of every sprite (leaves room for the icon bar)
+# Packed sprite atlas — persistent (WSL wipes /tmp, see BUG-005), mmap'd at startup
+SPRITE_SOURCE_DIR = Path("/home/yama/lobster-desktop-widget/assets/sprites")
+SPRITE_ATLAS_FILE = Path.home() / ".local" / "share" / "pixoo-display" / "sprites.atlas"
+SPRITE_ATLAS_MAGIC = b"PXSA"
+SPRITE_ATLAS_VERSION = 1
+# magic, version, frame size (px), index length, data offset
+SPRITE_ATLAS_HEADER = struct.Struct("<4sHHII")
 
 TIMER_COLORS = [
     (255, 50, 50),
@@ -149,6 +165,9 @@ ICON_BAR_H = 21  # Issue #2: 2-row layout (row1: worker name 11px, row2: role la
 ICON_BAR_ROW1_FONT_SIZE = 11  # worker name (Issue #2: was 8, now 11 for readability)
 ICON_BAR_ROW2_FONT_SIZE = 9   # role label (large, readable on 64px LED)
 ICON_LABEL_GAP = 1
+TIMER_FONT_SIZE = 7
+TIMER_Y = 13  # subagent timer, right side of icon-bar row 2
+WORKER_NAME_CACHE_MAX = 16  # pre-rendered row-1 name strips (one per rotating agent)
 
 ROLE_LABELS: dict[str, str] = {
     "DIR": "DIR",
@@ -167,6 +186,18 @@ FONT_CANDIDATES = [
     "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
 ]
 
+# Glyph atlas: bitmap text for the icon bar / timer / count (bypasses FreeType per frame)
+GLYPH_CACHE_DIR = Path.home() / ".cache" / "pixoo-display"
+GLYPH_ATLAS_VERSION = 1
+GLYPH_ATLAS_WIDTH = 256
+GLYPH_LAYOUT_CACHE_MAX = 128  # laid-out strings kept per atlas
+GLYPH_WARM_CHARS = "".join(chr(c) for c in range(0x20, 0x7F))  # printable ASCII
+
+# Offline emoji images for Pilmoji (Twemoji-style names: 1f527.png, 1f468-200d-1f4bb.png)
+EMOJI_DIR = Path.home() / ".local" / "share" / "pixoo-display" / "emoji"
+EMOJI_CACHE_MAX = 64  # decoded PNG bytes kept in memory (LRU)
+EMOJI_PREWARM = "🔧🦞🟠🤓😎🌀⚡"  # git ticker prefix + character emojis
+
 
 _EMOJI_RE = re.compile(
     r"[\U0001F300-\U0001F9FF\U0001FA00-\U0001FEFF\u2300-\u23FF\u2600-\u26FF\u2700-\u27BF\u2B50-\u2B55\u200D\uFE0F]+"
@@ -194,7 +225,9 @@ def advance_worker_scroll(offset: int, wn_w: int, max_w: int) -> int:
     return offset + 1
 
 
+@lru_cache(maxsize=None)
 def load_font(size: int = 8) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """One font object per size — run(), compose_frame and the timer share it."""
     for fp in FONT_CANDIDATES:
         if os.path.exists(fp):
             try:
@@ -211,9 +244,101 @@ def text_bbox_size(font: ImageFont.ImageFont, text: str) -> Tuple[int, int]:
     return b[2] - b[0], b[3] - b[1]
 
 
+class LocalEmojiSource:
+    """Pilmoji emoji source backed by an on-disk PNG set — never touches the network.
+
+    Pilmoji's default source fetches every emoji from a CDN, which can block
+    the render loop (or hang offline) whenever a new ticker appears.  Images
+    are read from EMOJI_DIR and kept in an in-memory LRU; misses are cached
+    too so a missing file is only stat'ed once.  Registered as a pilmoji
+    BaseSource by load_pilmoji().
+    """
+
+    def __init__(self, emoji_dir: Path = EMOJI_DIR, max_entries: int = EMOJI_CACHE_MAX):
+        self._dir = emoji_dir
+        self._max = max_entries
+        self._lru: dict[str, bytes | None] = {}
+
+    @staticmethod
+    def _candidate_names(emoji: str) -> list[str]:
+        cps = [f"{ord(c):x}" for c in emoji]
+        full = "-".join(cps)
+        bare = "-".join(cp for cp in cps if cp != "fe0f")
+        return [full] if full == bare else [full, bare]
+
+    def _lookup(self, emoji: str) -> bytes | None:
+        if emoji in self._lru:
+            data = self._lru.pop(emoji)
+            self._lru[emoji] = data  # refresh LRU position
+            return data
+        data = None
+        for name in self._candidate_names(emoji):
+            try:
+                data = (self._dir / f"{name}.png").read_bytes()
+                break
+            except OSError:
+                continue
+        self._lru[emoji] = data
+        if len(self._lru) > self._max:
+            del self._lru[next(iter(self._lru))]
+        return data
+
+    def get_emoji(self, emoji: str, /) -> BytesIO | None:
+        data = self._lookup(emoji)
+        # Fresh stream per call: Pilmoji closes cached streams on exit.
+        return BytesIO(data) if data is not None else None
+
+    def get_discord_emoji(self, id: int, /) -> BytesIO | None:
+        return None
+
+    def warm(self, text: str) -> int:
+        """Pre-load every emoji in text; returns how many were found on disk."""
+        return sum(1 for e in find_emoji(text) if self._lookup(e) is not None)
+
+    def covers(self, text: str) -> bool:
+        """True if every emoji in text can be drawn from the local set."""
+        return all(self._lookup(e) is not None for e in find_emoji(text))
+
+
+def load_pilmoji() -> type:
+    """Import Pilmoji on first use: only tickers that contain emoji need it."""
+    global Pilmoji, _PILMOJI_EMOJI_RE
+    if Pilmoji is None:
+        from pilmoji import Pilmoji as _Pilmoji
+        try:
+            from pilmoji.source import BaseSource
+            from pilmoji.helpers import EMOJI_REGEX
+        except ImportError:  # older/stubbed pilmoji — LocalEmojiSource still works standalone
+            pass
+        else:
+            BaseSource.register(LocalEmojiSource)
+            _PILMOJI_EMOJI_RE = EMOJI_REGEX
+        Pilmoji = _Pilmoji
+    return Pilmoji
+
+
+def find_emoji(text: str) -> list[str]:
+    """Split text into the emoji Pilmoji will request from its source."""
+    if _PILMOJI_EMOJI_RE is not None:
+        return [m for m in _PILMOJI_EMOJI_RE.findall(text) if not m.startswith("<")]
+    # Fallback: split _EMOJI_RE runs into clusters joined by ZWJ / VS16
+    clusters: list[str] = []
+    for run in _EMOJI_RE.findall(text):
+        start = len(clusters)
+        for ch in run:
+            if len(clusters) > start and (ch in "\u200d\ufe0f" or clusters[-1].endswith("\u200d")):
+                clusters[-1] += ch
+            else:
+                clusters.append(ch)
+    return clusters
+
+
+_emoji_source = LocalEmojiSource()
+
+
 def measure_pilmoji_width(text: str, font: ImageFont.ImageFont) -> int:
     probe = Image.new("RGB", (800, 40), (0, 0, 0))
-    with Pilmoji(probe) as pm:
+    with load_pilmoji()(probe, source=_emoji_source) as pm:
         try:
             size = pm.getsize(text, font)
             return size[0] if isinstance(size, tuple) else size
@@ -222,6 +347,219 @@ def measure_pilmoji_width(text: str, font: ImageFont.ImageFont) -> int:
             return w
 
 
+class GlyphAtlas:
+    """Bitmap glyph atlas — each codepoint goes through FreeType only once.
+
+    Glyph masks are shelf-packed into one "L" bitmap together with their
+    bbox offsets and advances, and strings are laid out from those cached
+    metrics.  Drawing a worker name or role label is then a few bitmap
+    pastes instead of a Meiryo/Noto TTC render on every frame.
+
+    The atlas is persisted under GLYPH_CACHE_DIR, keyed by font file
+    (path + mtime + size) and point size, so restarts skip rasterizing.
+    """
+
+    def __init__(self, font: ImageFont.ImageFont, cache_dir: Path | None = None):
+        self._font = font
+        self._atlas = Image.new("L", (GLYPH_ATLAS_WIDTH, 16), 0)
+        # char → (atlas_x, atlas_y, w, h, offset_x, offset_y, advance)
+        self._glyphs: dict[str, tuple[int, int, int, int, int, int, float]] = {}
+        self._shelf_x = 0
+        self._shelf_y = 0
+        self._shelf_h = 0
+        # text → (mask | None, x0, y0) — laid-out strings, LRU by insertion order
+        self._layouts: dict[str, tuple[Image.Image | None, int, int]] = {}
+        self._dirty = False
+        self._cache_base = self._cache_path(font, cache_dir)
+        self._load()
+
+    @staticmethod
+    def _cache_path(font: ImageFont.ImageFont, cache_dir: Path | None) -> Path | None:
+        font_path = getattr(font, "path", None)
+        if cache_dir is None or not isinstance(font_path, str):
+            return None  # in-memory font (load_default) — nothing stable to key on
+        try:
+            st = os.stat(font_path)
+        except OSError:
+            return None
+        size = getattr(font, "size", 0)
+        ident = f"{font_path}:{st.st_mtime_ns}:{st.st_size}:{size}:{GLYPH_ATLAS_VERSION}"
+        digest = hashlib.sha1(ident.encode("utf-8")).hexdigest()[:12]
+        return cache_dir / f"glyphs-{Path(font_path).stem}-{size}-{digest}"
+
+    def _cache_file(self, suffix: str) -> Path:
+        return Path(f"{self._cache_base}{suffix}")
+
+    def _load(self) -> None:
+        if self._cache_base is None:
+            return
+        index_path = self._cache_file(".json")
+        png_path = self._cache_file(".png")
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            with Image.open(png_path) as im:
+                atlas = im.convert("L")
+            if index.get("version") != GLYPH_ATLAS_VERSION or atlas.height != index.get("height"):
+                return
+            glyphs = {ch: tuple(g) for ch, g in index["glyphs"].items()}
+            shelf_x, shelf_y, shelf_h = index["shelf"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # missing or corrupt cache — rasterize from scratch
+        self._atlas = atlas
+        self._glyphs = glyphs
+        self._shelf_x, self._shelf_y, self._shelf_h = shelf_x, shelf_y, shelf_h
+        logger.debug("[glyph] loaded %d glyphs from %s", len(glyphs), png_path)
+
+    def save(self) -> None:
+        """Persist the atlas if new glyphs were rasterized since the last save."""
+        if not self._dirty or self._cache_base is None:
+            return
+        index = {
+            "version": GLYPH_ATLAS_VERSION,
+            "height": self._atlas.height,
+            "shelf": [self._shelf_x, self._shelf_y, self._shelf_h],
+            "glyphs": {ch: list(g) for ch, g in self._glyphs.items()},
+        }
+        try:
+            self._cache_base.parent.mkdir(parents=True, exist_ok=True)
+            # PNG first, index last: the index is the commit point for a load.
+            png_tmp = self._cache_file(".png.tmp")
+            self._atlas.save(png_tmp, format="PNG")
+            os.replace(png_tmp, self._cache_file(".png"))
+            json_tmp = self._cache_file(".json.tmp")
+            json_tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+            os.replace(json_tmp, self._cache_file(".json"))
+            self._dirty = False
+        except OSError as e:
+            print(f"[!] Glyph atlas save failed: {e}")
+
+    def _alloc(self, w: int, h: int) -> tuple[int, int]:
+        """Reserve a w×h slot (1px gutter) on the current shelf, growing the atlas as needed."""
+        if self._shelf_x + w > self._atlas.width:
+            self._shelf_y += self._shelf_h + 1
+            self._shelf_x = 0
+            self._shelf_h = 0
+        if w > self._atlas.width or self._shelf_y + h > self._atlas.height:
+            grown = Image.new(
+                "L",
+                (max(self._atlas.width, w), max(self._atlas.height * 2, self._shelf_y + h)),
+                0,
+            )
+            grown.paste(self._atlas, (0, 0))
+            self._atlas = grown
+        pos = (self._shelf_x, self._shelf_y)
+        self._shelf_x += w + 1
+        self._shelf_h = max(self._shelf_h, h)
+        return pos
+
+    def _glyph(self, ch: str) -> tuple[int, int, int, int, int, int, float]:
+        g = self._glyphs.get(ch)
+        if g is not None:
+            return g
+        bbox = self._font.getbbox(ch)
+        w = max(0, bbox[2] - bbox[0])
+        h = max(0, bbox[3] - bbox[1])
+        advance = float(self._font.getlength(ch))
+        if w == 0 or h == 0:
+            g = (0, 0, 0, 0, 0, 0, advance)  # whitespace: advance only
+        else:
+            mask = Image.new("L", (w, h), 0)
+            ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), ch, font=self._font, fill=255)
+            ax, ay = self._alloc(w, h)
+            self._atlas.paste(mask, (ax, ay))
+            g = (ax, ay, w, h, bbox[0], bbox[1], advance)
+        self._glyphs[ch] = g
+        self._dirty = True
+        return g
+
+    def warm(self, chars: str) -> None:
+        """Rasterize chars ahead of time (startup)."""
+        for ch in chars:
+            self._glyph(ch)
+
+    def layout(self, text: str) -> tuple[Image.Image | None, int, int]:
+        """Return (mask, x0, y0): the string's ink mask and its offset from the draw origin.
+
+        Equivalent to ImageDraw.text() placement at (0, 0) — mask is None for
+        strings with no ink (empty / whitespace).
+        """
+        cached = self._layouts.pop(text, None)
+        if cached is not None:
+            self._layouts[text] = cached  # refresh LRU position
+            return cached
+
+        placed: list[tuple[int, int, tuple]] = []
+        pen = 0.0
+        for ch in text:
+            g = self._glyph(ch)
+            if g[2] and g[3]:
+                placed.append((round(pen) + g[4], g[5], g))
+            pen += g[6]
+
+        if not placed:
+            result: tuple[Image.Image | None, int, int] = (None, 0, 0)
+        else:
+            x0 = min(px for px, _, _ in placed)
+            y0 = min(py for _, py, _ in placed)
+            x1 = max(px + g[2] for px, _, g in placed)
+            y1 = max(py + g[3] for _, py, g in placed)
+            mask = Image.new("L", (x1 - x0, y1 - y0), 0)
+            for px, py, g in placed:
+                ax, ay, w, h = g[0], g[1], g[2], g[3]
+                glyph = self._atlas.crop((ax, ay, ax + w, ay + h))
+                # paste-through-mask so overlapping antialiased edges combine
+                mask.paste(255, (px - x0, py - y0), glyph)
+            result = (mask, x0, y0)
+
+        self._layouts[text] = result
+        if len(self._layouts) > GLYPH_LAYOUT_CACHE_MAX:
+            del self._layouts[next(iter(self._layouts))]
+        return result
+
+    def measure(self, text: str) -> Tuple[int, int]:
+        """Ink bbox size — same semantics as text_bbox_size()."""
+        mask, _, _ = self.layout(text)
+        return mask.size if mask is not None else (0, 0)
+
+    def draw(self, draw: ImageDraw.ImageDraw, xy: tuple[int, int], text: str, fill) -> None:
+        mask, x0, y0 = self.layout(text)
+        if mask is not None:
+            draw.bitmap((xy[0] + x0, xy[1] + y0), mask, fill=fill)
+
+    def draw_outlined(self, draw: ImageDraw.ImageDraw, xy: tuple[int, int], text: str, fill) -> None:
+        """Bitmap counterpart of draw_outlined_text() (8-direction black outline)."""
+        mask, x0, y0 = self.layout(text)
+        if mask is None:
+            return
+        x, y = xy[0] + x0, xy[1] + y0
+        for ox in [-1, 0, 1]:
+            for oy in [-1, 0, 1]:
+                if ox == 0 and oy == 0:
+                    continue
+                draw.bitmap((x + ox, y + oy), mask, fill=(0, 0, 0))
+        draw.bitmap((x, y), mask, fill=fill)
+
+
+_glyph_atlases: dict[tuple, GlyphAtlas] = {}
+
+
+def glyph_atlas(font: ImageFont.ImageFont) -> GlyphAtlas:
+    """Return the shared GlyphAtlas for a font (one per font file + size)."""
+    font_path = getattr(font, "path", None)
+    key = (font_path if isinstance(font_path, str) else id(font), getattr(font, "size", 0))
+    atlas = _glyph_atlases.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(font, cache_dir=GLYPH_CACHE_DIR)
+        _glyph_atlases[key] = atlas
+    return atlas
+
+
+def flush_glyph_atlases() -> None:
+    """Write newly rasterized glyphs to disk (cheap no-op when nothing changed)."""
+    for atlas in _glyph_atlases.values():
+        atlas.save()
+
+
 def load_frames(paths: list) -> List[Image.Image] | None:
     frames = []
     for path in paths:
@@ -234,24 +572,175 @@ def load_frames(paths: list) -> List[Image.Image] | None:
     return frames if frames else None
 
 
-def read_agent_state() -> tuple[list, bool]:
-    """Returns (agents_list, main_active_flag)."""
-    if not STATE_FILE.exists():
-        return [], False
+class SpriteStore:
+    """Every character + sleep frame packed into one contiguous RGB buffer.
+
+    At load time each frame is converted to RGB, shifted up by
+    SPRITE_TOP_CROP (bottom rows left black) and copied into a single
+    bytearray, so compose_frame starts from a ready-made canvas instead of
+    crop + paste on every frame.  frame() returns zero-copy memoryviews.
+    """
+
+    FRAME_BYTES = DISPLAY_SIZE * DISPLAY_SIZE * 3
+
+    def __init__(self, buffer, index: dict[str, tuple[int, int]]):
+        self._buf = memoryview(buffer)
+        self._index = index  # name → (first slot, frame count)
+        self.source = "png"
+
+    @staticmethod
+    def pack_frame(img: Image.Image) -> bytes:
+        """RGB canvas for one sprite: top margin removed, same as the old per-frame crop."""
+        canvas = Image.new("RGB", (DISPLAY_SIZE, DISPLAY_SIZE), (0, 0, 0))
+        canvas.paste(img.crop((0, SPRITE_TOP_CROP, DISPLAY_SIZE, DISPLAY_SIZE)), (0, 0))
+        return canvas.tobytes()
+
+    @classmethod
+    def from_pngs(cls, frame_sets: dict[str, list]) -> SpriteStore:
+        packed: dict[str, list[bytes]] = {}
+        for name, paths in frame_sets.items():
+            frames = load_frames(paths)
+            if frames:
+                packed[name] = [cls.pack_frame(f) for f in frames]
+        buf = bytearray(sum(len(f) for f in packed.values()) * cls.FRAME_BYTES)
+        index: dict[str, tuple[int, int]] = {}
+        slot = 0
+        for name, frames in packed.items():
+            index[name] = (slot, len(frames))
+            for data in frames:
+                buf[slot * cls.FRAME_BYTES:(slot + 1) * cls.FRAME_BYTES] = data
+                slot += 1
+        return cls(buf, index)
+
+    def save_atlas(self, path: Path) -> None:
+        """Write the packed frames as a versioned atlas file (header + JSON index + raw RGB).
+
+        Atomic via tempfile + os.replace so a running daemon never maps a
+        half-written file.
+        """
+        index = json.dumps(self._index).encode("utf-8")
+        data_offset = -(-(SPRITE_ATLAS_HEADER.size + len(index)) // 16) * 16  # 16-byte aligned
+        header = SPRITE_ATLAS_HEADER.pack(
+            SPRITE_ATLAS_MAGIC, SPRITE_ATLAS_VERSION, DISPLAY_SIZE, len(index), data_offset,
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=".sprites-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(index)
+                f.write(b"\0" * (data_offset - len(header) - len(index)))
+                f.write(self._buf)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def from_atlas(cls, path: Path) -> SpriteStore:
+        """mmap an atlas written by save_atlas() — no PNG decoding, pages load on demand.
+
+        Raises ValueError for a foreign, outdated or truncated file.
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, size, index_len, data_offset = SPRITE_ATLAS_HEADER.unpack_from(mm, 0)
+            if magic != SPRITE_ATLAS_MAGIC or version != SPRITE_ATLAS_VERSION or size != DISPLAY_SIZE:
+                raise ValueError(f"unsupported sprite atlas {path} (v{version}, {size}px)")
+            start = SPRITE_ATLAS_HEADER.size
+            raw_index = json.loads(mm[start:start + index_len].decode("utf-8"))
+            index = {name: (int(first), int(count)) for name, (first, count) in raw_index.items()}
+            frames = sum(count for _, count in index.values())
+            if len(mm) - data_offset != frames * cls.FRAME_BYTES:
+                raise ValueError(f"truncated sprite atlas {path}")
+        except (struct.error, TypeError) as e:
+            mm.close()
+            raise ValueError(f"corrupt sprite atlas {path}: {e}") from e
+        except ValueError:
+            mm.close()
+            raise
+        store = cls(memoryview(mm)[data_offset:], index)
+        store.source = str(path)
+        return store
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def names(self) -> list[str]:
+        return list(self._index)
+
+    def frame_count(self, name: str) -> int:
+        return self._index[name][1]
+
+    def frame(self, name: str, idx: int) -> memoryview:
+        first, count = self._index[name]
+        start = (first + idx % count) * self.FRAME_BYTES
+        return self._buf[start:start + self.FRAME_BYTES]
+
+    @property
+    def nbytes(self) -> int:
+        return self._buf.nbytes
+
+
+def sprite_source_sets(src_dir: Path) -> dict[str, list]:
+    """Frame paths in the sprite source tree (same naming as ensure-sprites.sh)."""
+    sets = {
+        name: [str(src_dir / f"{name}-frame{i}.png") for i in range(1, 5)]
+        for name in CHARACTER_FRAMES
+    }
+    sets[SLEEP_SPRITE] = [str(src_dir / f"sleep-frame{i}.png") for i in range(1, 5)]
+    return sets
+
+
+def build_sprite_atlas(src_dir: Path, out_path: Path = SPRITE_ATLAS_FILE) -> SpriteStore:
+    """Sprite compiler: decode every character + sleep frame once and pack them into out_path."""
+    store = SpriteStore.from_pngs(sprite_source_sets(src_dir))
+    if "opus" not in store:
+        raise RuntimeError(f"Opus frames not found in {src_dir}")
+    store.save_atlas(out_path)
+    return store
+
+
+def load_sprite_store() -> SpriteStore:
+    """Map the packed atlas if present; fall back to decoding the /tmp PNGs."""
+    try:
+        return SpriteStore.from_atlas(SPRITE_ATLAS_FILE)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"[!] Sprite atlas unusable ({e}), falling back to PNGs")
+    return SpriteStore.from_pngs({**CHARACTER_FRAMES, SLEEP_SPRITE: SLEEP_FRAMES})
+
+
+def _agent_ts(agent: dict, now: float) -> float:
+    """Last time the sync daemon saw the agent (last_seen, else started); now for invalid values."""
+    try:
+        return float(agent.get("last_seen", agent.get("started", now)))
+    except (TypeError, ValueError):
+        return now
+
+
+def parse_state_file(path: Path) -> dict:
+    """Raw STATE_FILE contents ({} when missing or unreadable)."""
+    try:
+        data = json.loads(path.read_text())
+    except (json.JSONDecodeError, OSError, UnicodeDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def agent_state_from(data: dict, now: float) -> tuple[list, bool]:
+    """(live agents, main_active) from parsed state — TTL applied against wall time now."""
     try:
-        data = json.loads(STATE_FILE.read_text())
         agents = data.get("agents", [])
         main_active = data.get("main_active", False)
         # TTL: auto-expire stale agents (safety net for missed removes)
         # Use last_seen (when sync daemon last wrote) instead of started (session creation)
-        now = time.time()
-        def _safe_ts(a: dict) -> float:
-            """Safely extract timestamp, defaulting to now for invalid values."""
-            try:
-                return float(a.get("last_seen", a.get("started", now)))
-            except (TypeError, ValueError):
-                return now
-        live = [a for a in agents if now - _safe_ts(a) < AGENT_TTL_SEC]
+        live = [a for a in agents if now - _agent_ts(a, now) < AGENT_TTL_SEC]
         if len(live) < len(agents):
             expired = len(agents) - len(live)
             print(f"[i] TTL expired {expired} agent(s)")
@@ -259,10 +748,157 @@ def read_agent_state() -> tuple[list, bool]:
             # Only sync daemon should write (atomic via tempfile+os.replace).
             # Display side is read-only to avoid race conditions.
         return live, main_active
-    except (json.JSONDecodeError, OSError, UnicodeDecodeError, TypeError, ValueError):
+    except (AttributeError, TypeError, ValueError):
         return [], False
 
 
+def next_agent_expiry(agents: list, now: float) -> float | None:
+    """Seconds until the first live agent hits AGENT_TTL_SEC (None without agents)."""
+    if not agents:
+        return None
+    return max(0.0, min(_agent_ts(a, now) + AGENT_TTL_SEC - now for a in agents))
+
+
+def read_agent_state() -> tuple[list, bool]:
+    """Returns (agents_list, main_active_flag)."""
+    return agent_state_from(parse_state_file(STATE_FILE), time.time())
+
+
+# inotify(7) — Linux only, through libc so no extra dependency
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows)
+
+
+def _inotify_watch(dirs: list, mask: int) -> tuple[int, list[int]]:
+    """inotify fd with a watch on each directory — wd per dir, -1 where the watch failed.
+
+    Raises OSError when inotify itself is unavailable or no watch could be added.
+    """
+    fd = _libc().inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    wds = [_inotify_add(fd, d, mask) for d in dirs]
+    if all(wd < 0 for wd in wds):
+        err = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(err, f"inotify_add_watch({', '.join(map(str, dirs))}) failed")
+    return fd, wds
+
+
+def _inotify_add(fd: int, path, mask: int) -> int:
+    """Add one more watch to an existing inotify fd — wd, or -1 if it failed."""
+    return _libc().inotify_add_watch(fd, os.fsencode(path), mask)
+
+
+def _libc():
+    if not hasattr(_libc, "_handle"):
+        _libc._handle = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    return _libc._handle
+
+
+def _inotify_events(fd: int):
+    """Drain pending inotify events: yields (wd, mask, name)."""
+    while True:
+        try:
+            buf = os.read(fd, 4096)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos + _INOTIFY_EVENT.size <= len(buf):
+            wd, mask, _, length = _INOTIFY_EVENT.unpack_from(buf, pos)
+            pos += _INOTIFY_EVENT.size
+            yield wd, mask, buf[pos:pos + length].rstrip(b"\0")
+            pos += length
+
+
+class StateWatcher:
+    """Change notification for STATE_FILE.
+
+    Watches the parent directory with inotify: writers os.replace() a temp
+    file over the state file, so IN_MOVED_TO is the event that matters
+    (IN_CLOSE_WRITE covers in-place writers like pixoo-agent-ctl).  Without
+    inotify it stat-polls every STATE_STAT_POLL_SEC.  Either way the JSON is
+    only re-parsed when the (inode, size, mtime) signature changed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.mode = "stat"
+        self._fd = -1
+        self._changed = asyncio.Event()
+        self._sig: tuple | None = None
+        self._data: dict = {}
+        self._loaded = False
+
+    def start(self) -> None:
+        """Set up inotify on the running loop; stays in stat mode if that is not possible."""
+        try:
+            fd, _ = _inotify_watch([self.path.parent], _IN_MOVED_TO | _IN_CLOSE_WRITE | _IN_DELETE)
+            asyncio.get_running_loop().add_reader(fd, self._on_readable)
+        except (OSError, AttributeError, TypeError, NotImplementedError) as e:
+            print(f"[!] inotify unavailable ({e}) — polling {self.path} every {STATE_STAT_POLL_SEC}s")
+            return
+        self._fd = fd
+        self.mode = "inotify"
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            try:
+                asyncio.get_running_loop().remove_reader(self._fd)
+            except RuntimeError:
+                pass  # loop already gone
+            os.close(self._fd)
+            self._fd = -1
+
+    def _on_readable(self) -> None:
+        name = os.fsencode(self.path.name)
+        for _, mask, event_name in _inotify_events(self._fd):
+            if mask & _IN_Q_OVERFLOW or event_name == name:
+                self._changed.set()
+
+    def _signature(self) -> tuple | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    async def wait(self, timeout: float | None) -> None:
+        """Return when the file (probably) changed, or after timeout seconds."""
+        if self.mode == "inotify":
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._signature() == self._sig:
+            step = STATE_STAT_POLL_SEC
+            if deadline is not None:
+                step = min(step, deadline - time.monotonic())
+                if step <= 0:
+                    return
+            await asyncio.sleep(step)
+
+    def load(self) -> tuple[dict, bool]:
+        """(parsed state, changed since last load) — re-parses only when the file changed."""
+        sig = self._signature()
+        if self._loaded and sig == self._sig:
+            return self._data, False
+        self._sig = sig
+        self._data = parse_state_file(self.path) if sig is not None else {}
+        self._loaded = True
+        return self._data, True
+
+
 def draw_outlined_text(draw, xy, text, font, fill):
     x, y = xy
     for ox in [-1, 0, 1]:
@@ -341,11 +977,11 @@ def get_latest_task_text(agents: list) -> str | None:
     return None
 
 
-def get_top_priority_task() -> str:
-    """Read todo-priority.md and return the first priority section title."""
+def get_top_priority_task() -> str | None:
+    """Read todo-priority.md and return the first priority section title (None if there is none)."""
     try:
         if not TODO_FILE.exists():
-            return FALLBACK_TICKER
+            return None
         text = TODO_FILE.read_text(encoding="utf-8")
         # Find first "### " line under "## 🔥" section
         in_priority = False
@@ -359,49 +995,343 @@ def get_top_priority_task() -> str:
                 return f"TOP: {task}"
             if in_priority and line.startswith("## ") and not line.startswith("## 🔥"):
                 break  # next section
-        return FALLBACK_TICKER
+        return None
     except Exception:
-        return FALLBACK_TICKER
+        return None
 
 
-def get_latest_git_commits() -> str:
-    """Scan all repos and return the most recent commit as ticker text.
+class GitCommit(NamedTuple):
+    ts: int          # committer time (git log %ct)
+    hash: str        # abbreviated (%h)
+    subject: str     # first paragraph, one line (%s)
 
-    Returns a string like: "🔧 [openclaw] 3a57c3a 記憶弱化修正 (2m ago)"
-    Scans all GIT_REPOS sorted by commit time, picks the freshest.
-    """
-    import subprocess
-    now = time.time()
-    best = None  # (timestamp, repo_name, hash, message)
 
-    for repo in GIT_REPOS:
-        if not (repo / ".git").exists():
+def _git_dir(repo: Path) -> Path | None:
+    """repo/.git, following a "gitdir: ..." file (worktrees, submodules)."""
+    dot_git = repo / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    try:
+        line = dot_git.read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    path = Path(line[len("gitdir:"):].strip())
+    return path if path.is_absolute() else repo / path
+
+
+def _git_common_dir(git_dir: Path) -> Path:
+    """Where refs/objects live — a linked worktree's gitdir points there via "commondir"."""
+    try:
+        common = (git_dir / "commondir").read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError):
+        return git_dir
+    return (git_dir / common).resolve()
+
+
+def resolve_git_head(git_dir: Path) -> str | None:
+    """HEAD's commit id: detached, loose ref or packed-refs."""
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not head.startswith("ref:"):
+        return head or None
+    ref = head[len("ref:"):].strip()
+    common = _git_common_dir(git_dir)
+    for base in (git_dir, common):
+        try:
+            sha = (base / ref).read_text(encoding="utf-8").strip()
+        except (OSError, UnicodeDecodeError):
             continue
+        if sha:
+            return sha
+    try:
+        packed = (common / "packed-refs").read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+    for line in packed.splitlines():
+        sha, _, name = line.partition(" ")
+        if name == ref:
+            return sha
+    return None  # unborn branch
+
+
+def read_loose_commit(git_dir: Path, sha: str) -> GitCommit | None:
+    """Parse a loose commit object (None when it is packed)."""
+    path = _git_common_dir(git_dir) / "objects" / sha[:2] / sha[2:]
+    try:
+        raw = zlib.decompress(path.read_bytes())
+    except (OSError, zlib.error):
+        return None
+    header, _, body = raw.partition(b"\0")
+    if not header.startswith(b"commit "):
+        return None
+    headers, _, message = body.partition(b"\n\n")
+    ts = None
+    for line in headers.split(b"\n"):
+        if line.startswith(b"committer "):
+            try:
+                ts = int(line.rsplit(b" ", 2)[1])
+            except (IndexError, ValueError):
+                return None
+    if ts is None:
+        return None
+    # %s: the first paragraph, lines joined with a space
+    paragraph = message.decode("utf-8", errors="replace").strip("\n").split("\n\n", 1)[0]
+    subject = " ".join(line.strip() for line in paragraph.splitlines())
+    return GitCommit(ts, sha[:7], subject)
+
+
+def _reflog_commit(git_dir: Path, sha: str) -> GitCommit | None:
+    """HEAD's subject from its reflog entry — only "commit...: <subject>" entries carry one."""
+    try:
+        lines = (git_dir / "logs" / "HEAD").read_bytes().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines[-16:]):
+        meta, _, message = line.decode("utf-8", errors="replace").partition("\t")
+        fields = meta.split(" ")
+        if len(fields) < 5 or fields[1] != sha:
+            continue
+        action, sep, subject = message.partition(": ")
+        if not sep or not action.startswith("commit"):
+            return None
         try:
-            result = subprocess.run(
-                ["git", "-C", str(repo), "log", "-1",
-                 "--format=%ct\t%h\t%s"],
-                capture_output=True, text=True, timeout=5,
+            return GitCommit(int(fields[-2]), sha[:7], subject)
+        except ValueError:
+            return None
+    return None
+
+
+def _git_log_commit(repo: Path) -> GitCommit | None:
+    """Last resort (HEAD packed and not committed here, e.g. after clone/pull + gc): ask git."""
+    import subprocess
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(repo), "log", "-1", "--format=%ct\t%h\t%s"],
+            capture_output=True, text=True, timeout=5,
+        )
+        ts, commit_hash, subject = result.stdout.strip().split("\t", 2)
+        return GitCommit(int(ts), commit_hash, subject)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+class GitHeadReader:
+    """Latest commit of one repo, read straight from .git instead of running git log.
+
+    Cached on the stat signature of .git/logs/HEAD (every HEAD move appends
+    to it), plus HEAD, packed-refs and refs/heads for repos without a
+    reflog — so an unchanged repo costs a few stat() calls per refresh.
+    """
+
+    def __init__(self, repo: Path):
+        self.repo = repo
+        self._sig: tuple | None = None
+        self._commit: GitCommit | None = None
+
+    def _signature(self, git_dir: Path) -> tuple:
+        sig = []
+        common = _git_common_dir(git_dir)
+        # refs/heads: a loose ref update renames into it, bumping the directory mtime
+        for path in (git_dir / "logs" / "HEAD", git_dir / "HEAD", common / "packed-refs", common / "refs" / "heads"):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def read(self) -> GitCommit | None:
+        git_dir = _git_dir(self.repo)
+        if git_dir is None:
+            return None
+        sig = self._signature(git_dir)
+        if sig == self._sig:
+            return self._commit
+        sha = resolve_git_head(git_dir)
+        commit = None
+        if sha:
+            commit = (
+                read_loose_commit(git_dir, sha)
+                or _reflog_commit(git_dir, sha)
+                or _git_log_commit(self.repo)
             )
-            if result.returncode != 0:
+        self._sig = sig
+        self._commit = commit
+        return commit
+
+    @property
+    def last(self) -> GitCommit | None:
+        """Result of the previous read(), without touching the filesystem."""
+        return self._commit
+
+
+def _watch_ref_dirs(fd: int, top: Path) -> list[tuple[int, Path]]:
+    """Blocking: watch a refs/heads directory and every subdirectory under it — (wd, dir) per watch."""
+    watches = []
+    for d, _, _ in os.walk(top):
+        wd = _inotify_add(fd, d, _IN_MOVED_TO | _IN_CLOSE_WRITE | _IN_CREATE)
+        if wd >= 0:
+            watches.append((wd, Path(d)))
+    return watches
+
+
+class GitHeadWatcher:
+    """Reports which repos' HEAD just moved — inotify on .git, .git/logs and refs/heads.
+
+    Only HEAD / packed-refs / logs/HEAD / branch renames count, so the index
+    churn of `git status` is ignored.  refs/heads is watched recursively
+    (branch names with "/" live in subdirectories), and directories created
+    later get a watch as soon as they appear.  Repos that cannot be watched (or
+    DrvFS paths that never see Windows-side writes) are still picked up by
+    the GIT_POLL_SEC full rescan.
+    """
+
+    def __init__(self, repos: list):
+        self.repos = list(repos)
+        self.mode = "poll"
+        self.watched = 0
+        self._fd = -1
+        self._wds: dict[int, tuple[Path, frozenset | None]] = {}  # wd → (repo, names that count; None = any)
+        self._ref_dirs: dict[int, Path] = {}  # wd → refs/heads (sub)directory
+        self._changed: set[Path] = set()
+        self._event = asyncio.Event()
+
+    async def start(self) -> None:
+        """Set up the watches on a worker thread — .git probes and the refs/heads walk can stall on /mnt/c."""
+        loop = asyncio.get_running_loop()
+        try:
+            built = await loop.run_in_executor(None, self._build)
+        except (OSError, AttributeError, TypeError) as e:
+            print(f"[!] Git watch unavailable ({e}) — rescanning repos every {GIT_POLL_SEC}s")
+            return
+        if built is None:
+            return
+        fd, wds, ref_dirs = built
+        try:
+            loop.add_reader(fd, self._on_readable)
+        except NotImplementedError as e:
+            os.close(fd)
+            print(f"[!] Git watch unavailable ({e}) — rescanning repos every {GIT_POLL_SEC}s")
+            return
+        self._fd, self._wds, self._ref_dirs = fd, wds, ref_dirs
+        self.watched = len({repo for repo, _ in self._wds.values()})
+        self.mode = "inotify"
+
+    def _build(self) -> tuple[int, dict, dict] | None:
+        """Blocking: inotify fd plus wd → owner / wd → refs dir maps (None when nothing is watchable)."""
+        dirs, owners, refs = [], [], {}
+        for repo in self.repos:
+            git_dir = _git_dir(repo)
+            if git_dir is None or not git_dir.is_dir():
                 continue
-            line = result.stdout.strip()
-            if not line:
+            common = _git_common_dir(git_dir)
+            for d, names in (
+                (git_dir, frozenset({b"HEAD"})),
+                (git_dir / "logs", frozenset({b"HEAD"})),
+                (common, frozenset({b"packed-refs"})),
+            ):
+                if d.is_dir() and d not in dirs:
+                    dirs.append(d)
+                    owners.append((repo, names))
+                elif d in dirs:
+                    i = dirs.index(d)  # .git is both gitdir and common dir
+                    owners[i] = (repo, owners[i][1] | names)
+            refs.setdefault(common / "refs" / "heads", repo)  # worktrees share one refs/heads
+        if not dirs:
+            return None
+        fd, wds = _inotify_watch(dirs, _IN_MOVED_TO | _IN_CLOSE_WRITE)
+        owner_by_wd = {wd: owner for wd, owner in zip(wds, owners) if wd >= 0}
+        ref_dirs: dict[int, Path] = {}
+        for heads, repo in refs.items():
+            for wd, d in _watch_ref_dirs(fd, heads):
+                owner_by_wd[wd] = (repo, None)
+                ref_dirs[wd] = d
+        return fd, owner_by_wd, ref_dirs
+
+    def _refs_added(self, repo: Path, job: asyncio.Future) -> None:
+        """Register watches _watch_ref_dirs added for a new branch namespace (back on the loop)."""
+        if job.cancelled() or job.exception() is not None or self._fd < 0:
+            return
+        for wd, d in job.result():
+            self._wds[wd] = (repo, None)
+            self._ref_dirs[wd] = d
+        self._changed.add(repo)  # its ref may have been written before the watch existed
+        self._event.set()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            try:
+                asyncio.get_running_loop().remove_reader(self._fd)
+            except RuntimeError:
+                pass  # loop already gone
+            os.close(self._fd)
+            self._fd = -1
+
+    def _on_readable(self) -> None:
+        for wd, mask, name in _inotify_events(self._fd):
+            if mask & _IN_Q_OVERFLOW:
+                self._changed.update(repo for repo, _ in self._wds.values())
                 continue
-            parts = line.split("\t", 2)
-            if len(parts) < 3:
+            owner = self._wds.get(wd)
+            if owner is None:
                 continue
-            ts = int(parts[0])
-            commit_hash = parts[1]
-            message = strip_emoji(parts[2])
-            repo_name = repo.name
-            if best is None or ts > best[0]:
-                best = (ts, repo_name, commit_hash, message)
-        except Exception:
+            repo, names = owner
+            if mask & _IN_ISDIR:
+                if wd in self._ref_dirs and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    # new branch namespace (feature/...) — walked off the loop like start()
+                    job = asyncio.get_running_loop().run_in_executor(
+                        None, _watch_ref_dirs, self._fd, self._ref_dirs[wd] / os.fsdecode(name),
+                    )
+                    job.add_done_callback(partial(self._refs_added, repo))
+            elif mask & _IN_CREATE:
+                continue  # new ref files only count once written (IN_CLOSE_WRITE / IN_MOVED_TO)
+            elif (name in names) if names is not None else not name.endswith(b".lock"):
+                self._changed.add(repo)
+        if self._changed:
+            self._event.set()
+
+    async def wait(self, timeout: float | None) -> set[Path]:
+        """Repos whose HEAD moved — empty when timeout passes first."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return set()
+        await asyncio.sleep(GIT_SETTLE_SEC)  # one commit writes the ref, reflog and HEAD — read once
+        self._event.clear()
+        changed, self._changed = self._changed, set()
+        return changed
+
+
+_git_readers: dict[Path, GitHeadReader] = {}
+
+
+def get_latest_git_commits(changed: set | None = None) -> str | None:
+    """Scan all repos and return the most recent commit as ticker text (None without any commit).
+
+    Returns a string like: "🔧 [openclaw] 3a57c3a 記憶弱化修正 (2m ago)"
+    Scans all GIT_REPOS sorted by commit time, picks the freshest.
+    Reads .git directly (GitHeadReader) — unchanged repos are only stat'ed.
+    With `changed` (from GitHeadWatcher) only those repos are read at all.
+    """
+    now = time.time()
+    best = None  # (timestamp, repo_name, hash, message)
+
+    for repo in GIT_REPOS:
+        reader = _git_readers.get(repo)
+        if reader is None:
+            reader = _git_readers[repo] = GitHeadReader(repo)
+        commit = reader.read() if changed is None or repo in changed else reader.last
+        if commit is None:
             continue
+        if best is None or commit.ts > best[0]:
+            best = (commit.ts, repo.name, commit.hash, strip_emoji(commit.subject))
 
     if not best:
-        return FALLBACK_TICKER
+        return None
 
     ts, repo_name, commit_hash, message = best
     age = now - ts
@@ -423,6 +1353,135 @@ def get_latest_git_commits() -> str:
     return f"🔧 [{repo_name}] {commit_hash} {message} ({age_str}前)"
 
 
+class TickerSource:
+    """One background provider of idle ticker text.
+
+    fetch() runs on a worker thread — every `interval` seconds, or earlier
+    when wait() returns a trigger.  A fetch slower than `timeout` is left to
+    finish on its own (no second one is started meanwhile) and the previous
+    text keeps serving until `ttl` after the last good fetch.  The lowest
+    `priority` with text wins; None from fetch() means "nothing to show".
+    """
+
+    name = "?"
+    priority = 0
+
+    def __init__(self, interval: float, ttl: float = TICKER_TTL_SEC, timeout: float = TICKER_FETCH_TIMEOUT_SEC):
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self.text: str | None = None
+        self.expires = 0.0
+        self._job: asyncio.Future | None = None
+
+    def fetch(self, trigger) -> str | None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def wait(self, timeout: float):
+        """Sleep until the next refresh is due; returns what triggered it early (None = timer)."""
+        await asyncio.sleep(timeout)
+        return None
+
+    def current(self, now: float) -> str | None:
+        return self.text if now < self.expires else None
+
+    async def refresh(self, trigger=None) -> None:
+        if self._job is not None and not self._job.done():
+            return  # the last fetch is still stuck — don't pile up threads behind it
+        self._job = asyncio.get_running_loop().run_in_executor(None, self.fetch, trigger)
+        try:
+            text = await asyncio.wait_for(asyncio.shield(self._job), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"[!] Ticker source {self.name}: no answer in {self.timeout}s, keeping the last text")
+            return
+        except Exception as e:
+            print(f"[!] Ticker source {self.name} failed: {e}")
+            return
+        self.text = text
+        self.expires = time.monotonic() + self.ttl
+
+
+class GitTickerSource(TickerSource):
+    """Latest commit across GIT_REPOS — re-read when a watched HEAD moves, full rescan every GIT_POLL_SEC."""
+
+    name = "git"
+    priority = 0
+
+    def __init__(self):
+        super().__init__(GIT_POLL_SEC)
+        self._watcher = GitHeadWatcher(GIT_REPOS)
+
+    async def start(self) -> None:
+        await self._watcher.start()
+        print(f"[i] Git ticker: {self._watcher.watched}/{len(GIT_REPOS)} repos watched ({self._watcher.mode})")
+
+    def close(self) -> None:
+        self._watcher.close()
+
+    async def wait(self, timeout: float):
+        return await self._watcher.wait(timeout) or None  # None = full rescan
+
+    def fetch(self, changed) -> str | None:
+        return get_latest_git_commits(changed)
+
+
+class TodoTickerSource(TickerSource):
+    """Top item of TODO_FILE — fills in when no repo has a commit to show."""
+
+    name = "todo"
+    priority = 1
+
+    def __init__(self):
+        super().__init__(TODO_POLL_SEC)
+
+    def fetch(self, trigger) -> str | None:
+        return get_top_priority_task()
+
+
+class TickerBoard:
+    """The idle ticker: best text among the sources, each refreshed by its own task.
+
+    The display only reads current(); `changed` is set whenever that
+    answer may have moved.
+    """
+
+    def __init__(self, sources: list, fallback: str):
+        self.sources = sorted(sources, key=lambda source: source.priority)
+        self.fallback = fallback
+        self.changed = asyncio.Event()
+
+    def current(self) -> str:
+        now = time.monotonic()
+        for source in self.sources:
+            text = source.current(now)
+            if text:
+                return text
+        return self.fallback
+
+    async def run(self, awake: asyncio.Event) -> None:
+        await asyncio.gather(*(self._follow(source, awake) for source in self.sources))
+
+    async def _follow(self, source: TickerSource, awake: asyncio.Event) -> None:
+        trigger = None
+        try:
+            await source.start()
+            while True:
+                await awake.wait()  # nobody reads the ticker in deep idle
+                before = self.current()
+                await source.refresh(trigger)
+                if self.current() != before:
+                    self.changed.set()
+                trigger = await source.wait(source.interval)
+        finally:
+            source.close()
+
+
 class ScrollTextCache:
     """Pre-render scroll text as a horizontal strip to avoid Pilmoji per-frame."""
 
@@ -435,8 +1494,15 @@ class ScrollTextCache:
     def get_strip(self, text: str, font: ImageFont.ImageFont) -> Image.Image:
         if text == self._text and self._strip is not None:
             return self._strip
+        # Offline emoji only: anything the local set can't draw is stripped
+        has_emoji = _EMOJI_RE.search(text) is not None
+        if has_emoji:
+            load_pilmoji()  # the emoji split must match what Pilmoji draws
+        use_pilmoji = has_emoji and _emoji_source.covers(text)
+        render_text = text if use_pilmoji or not has_emoji else strip_emoji(text)
+        # Plain text needs no Pilmoji — ImageDraw draws it the same (and Pillow ≥10 measures it by bbox anyway)
         # Measure width
-        w = measure_pilmoji_width(text, font)
+        w = measure_pilmoji_width(render_text, font) if use_pilmoji else text_bbox_size(font, render_text)[0]
         # Use descender-heavy chars to get true max height
         probe = Image.new("RGB", (1, 1))
         d = ImageDraw.Draw(probe)
@@ -446,14 +1512,14 @@ class ScrollTextCache:
         w += 4
         # Render once onto a transparent strip
         strip = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        with Pilmoji(strip) as pm:
+        with Pilmoji(strip, source=_emoji_source) if use_pilmoji else nullcontext(ImageDraw.Draw(strip)) as pm:
             # Black outline (8 directions)
             for ox in [-1, 0, 1]:
                 for oy in [-1, 0, 1]:
                     if ox == 0 and oy == 0:
                         continue
-                    pm.text((2 + ox, 2 + oy), text, font=font, fill=(0, 0, 0, 255))
-            pm.text((2, 2), text, font=font, fill=(255, 255, 255, 255))
+                    pm.text((2 + ox, 2 + oy), render_text, font=font, fill=(0, 0, 0, 255))
+            pm.text((2, 2), render_text, font=font, fill=(255, 255, 255, 255))
         self._text = text
         self._strip = strip
         self._strip_w = w
@@ -472,32 +1538,149 @@ class ScrollTextCache:
 _scroll_cache = ScrollTextCache()
 
 
+class NameStrip(NamedTuple):
+    image: Image.Image  # RGBA, outline included
+    x0: int             # strip origin relative to the text draw position
+    y0: int
+    text_w: int         # ink width (same as text_bbox_size) — drives scroll clamping
+
+
+def worker_name_color(role: str) -> Tuple[int, int, int]:
+    return ROLE_COLORS.get(role, (200, 200, 200))
+
+
+class WorkerNameCache:
+    """Pre-render the outlined row-1 worker name once per (agent id, text, color).
+
+    Row 1 scrolls 1px per tick; instead of 9 outline passes at a new x on
+    every frame, compose_frame crops the visible window out of this strip
+    (same approach as ScrollTextCache for the bottom ticker).  A few
+    entries are kept so character rotation doesn't re-render each swap.
+    """
+
+    def __init__(self, max_entries: int = WORKER_NAME_CACHE_MAX):
+        self._max = max_entries
+        self._entries: dict[tuple, NameStrip] = {}
+
+    def get(self, agent_id: str, text: str, color: Tuple[int, int, int],
+            font: ImageFont.ImageFont) -> NameStrip:
+        key = (agent_id, text, color)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            glyphs = glyph_atlas(font)
+            mask, x0, y0 = glyphs.layout(text)
+            w, h = mask.size if mask is not None else (0, 0)
+            strip = Image.new("RGBA", (w + 2, h + 2), (0, 0, 0, 0))
+            # ink lands at (1, 1): room for the 1px outline on every side
+            glyphs.draw_outlined(ImageDraw.Draw(strip), (1 - x0, 1 - y0), text, fill=color)
+            entry = NameStrip(strip, x0 - 1, y0 - 1, w)
+        self._entries[key] = entry
+        if len(self._entries) > self._max:
+            del self._entries[next(iter(self._entries))]
+        return entry
+
+
+_worker_name_cache = WorkerNameCache()
+
+
+def role_label_color(role: str, status: str) -> Tuple[int, int, int]:
+    """Row-2 label color: the role color, red on error, dimmed when not active/waiting."""
+    color = ROLE_COLORS.get(role, (128, 128, 128))
+    if status == "error":
+        color = (255, 0, 0)
+    elif status == "waiting":
+        pass  # full brightness
+    elif status not in ("active",):
+        color = (color[0] * 2 // 3, color[1] * 2 // 3, color[2] * 2 // 3)
+    return color
+
+
+class AgentView(NamedTuple):
+    """One agent as drawn — built once per state change, read-only for every frame after that."""
+    id: str
+    char: str                          # sprite name (unknown characters already mapped to opus)
+    started: float | None
+    name: str                          # row-1 worker name, emoji stripped
+    name_color: Tuple[int, int, int]
+    name_w: int                        # row-1 ink width (0 = no name)
+    label: str                         # row-2 role label
+    label_color: Tuple[int, int, int]
+
+
+def agent_view(agent: dict, char_names, name_w: int = 0) -> AgentView:
+    """Normalize one raw state-file agent (name_w is filled in by FrameRenderer.agent_views)."""
+    role = agent.get("role", "DEV")
+    char = agent.get("char", "sonnet")
+    if char not in char_names:
+        char = "opus"
+    return AgentView(
+        id=agent.get("id", ""),
+        char=char,
+        started=agent.get("started"),
+        name=strip_emoji(agent.get("task", agent.get("id", ""))),
+        name_color=worker_name_color(role),
+        name_w=name_w,
+        label=ROLE_LABELS.get(role, role),
+        label_color=role_label_color(role, agent.get("status", "active")),
+    )
+
+
+def _timer_glyphs() -> GlyphAtlas:
+    if not hasattr(_timer_glyphs, "_font"):
+        _timer_glyphs._font = load_font(size=TIMER_FONT_SIZE)
+    return glyph_atlas(_timer_glyphs._font)
+
+
+def draw_timer(img: Image.Image, elapsed_sec: float, color_tick: int, top: int = 0) -> None:
+    """Draw the m:ss timer at the right of icon-bar row 2, outlined.
+
+    img row 0 is display row `top`, so a band cut out of a frame can be
+    patched without recomposing the rest of it.
+    """
+    glyphs = _timer_glyphs()
+    minutes = int(elapsed_sec) // 60
+    seconds = int(elapsed_sec) % 60
+    timer_str = f"{minutes}:{seconds:02d}"
+    tw, _ = glyphs.measure(timer_str)
+    timer_x = DISPLAY_SIZE - (tw + 4) + 2  # reserve space with gap
+    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+    glyphs.draw_outlined(
+        ImageDraw.Draw(overlay), (timer_x, TIMER_Y - top), timer_str,
+        fill=TIMER_COLORS[color_tick % len(TIMER_COLORS)],
+    )
+    img.paste(overlay, (0, 0), overlay)
+
+
+def timer_band() -> tuple[int, int]:
+    """Display rows [top, bottom) that any timer string can touch, outline included."""
+    mask, _, y0 = _timer_glyphs().layout("0123456789:")
+    return TIMER_Y + y0 - 1, TIMER_Y + y0 + mask.height + 1
+
+
 def compose_frame(
-    bg_frame: Image.Image,
+    bg_frame: memoryview,
     scroll_font: ImageFont.ImageFont,
     ui_font: ImageFont.ImageFont,
     scroll_text: str,
     scroll_x: int,
-    agents: list,
+    agents: Sequence,
     main_active: bool,
     elapsed_sec: float | None,
     color_tick: int,
     is_main: bool,
     scroll_text_h: int,
-    current_agent: dict | None = None,
+    current_agent: AgentView | None = None,
     worker_scroll_offset: int = 0,
 ) -> Image.Image:
     """Compose a single display frame with icon bar, character, and scroll text.
 
     Phase 5.3: Sprite is drawn full-size. Icon bar text is rendered on a
-    transparent RGBA overlay with draw_outlined_text for contrast, then
+    transparent RGBA overlay with an 8-direction outline for contrast, then
     composited on top of the sprite via alpha mask (same technique as
-    the scroll text strip).
+    the scroll text strip).  Text comes from the glyph atlas, not FreeType.
     """
-    img = Image.new("RGB", (DISPLAY_SIZE, DISPLAY_SIZE), (0, 0, 0))
-
-    # --- Character: full-size sprite (only 4px top margin crop) ---
-    img.paste(bg_frame.crop((0, 4, DISPLAY_SIZE, DISPLAY_SIZE)), (0, 0))
+    # --- Character: full-size sprite canvas (top margin already cropped by SpriteStore) ---
+    img = Image.frombytes("RGB", (DISPLAY_SIZE, DISPLAY_SIZE), bg_frame)
 
     # --- Scroll text position ---
     marquee_y = DISPLAY_SIZE - scroll_text_h - 5
@@ -511,61 +1694,38 @@ def compose_frame(
         compose_frame._row1_font = load_font(size=ICON_BAR_ROW1_FONT_SIZE)
     if not hasattr(compose_frame, "_row2_font"):
         compose_frame._row2_font = load_font(size=ICON_BAR_ROW2_FONT_SIZE)
-    if not hasattr(compose_frame, "_timer_font"):
-        compose_frame._timer_font = load_font(size=7)
     row1_font = compose_frame._row1_font
-    row2_font = compose_frame._row2_font
-    timer_font = compose_frame._timer_font
-
-    # Timer string (subagents only, rendered in row 2 right side)
-    timer_str = None
-    timer_w = 0
-    if not is_main and elapsed_sec is not None:
-        minutes = int(elapsed_sec) // 60
-        seconds = int(elapsed_sec) % 60
-        timer_str = f"{minutes}:{seconds:02d}"
-        tw, _ = text_bbox_size(timer_font, timer_str)
-        timer_w = tw + 4  # reserve space with gap
+    row2_glyphs = glyph_atlas(compose_frame._row2_font)
+    ui_glyphs = glyph_atlas(ui_font)
 
     ix = 1
     row1_y = 0   # worker name row
     row2_y = 12  # role label row (Issue #2: shifted down from 9 to match 11px row1 font)
 
     if current_agent is not None:
-        role = current_agent.get("role", "DEV")
-        status = current_agent.get("status", "active")
-        label = ROLE_LABELS.get(role, role)
-
         # Row 1: Worker name — scroll horizontally when too wide to fit
-        worker_name = strip_emoji(current_agent.get("task", current_agent.get("id", "")))
-        if worker_name:
+        if current_agent.name:
             max_w = DISPLAY_SIZE - 2
-            wn_w, _ = text_bbox_size(row1_font, worker_name)
-            wn_color = ROLE_COLORS.get(role, (200, 200, 200))
+            name = _worker_name_cache.get(
+                current_agent.id, current_agent.name, current_agent.name_color, row1_font,
+            )
             # Clamp draw offset so text never overscrolls past showing the end
-            effective_offset = min(max(0, worker_scroll_offset), max(0, wn_w - max_w))
-            draw_outlined_text(odraw, (ix - effective_offset, row1_y), worker_name, row1_font, fill=wn_color)
+            effective_offset = min(max(0, worker_scroll_offset), max(0, name.text_w - max_w))
+            # Crop only the visible window out of the pre-rendered strip
+            strip_x = ix - effective_offset + name.x0
+            src_x = max(0, -strip_x)
+            dst_x = max(0, strip_x)
+            visible_w = min(DISPLAY_SIZE - dst_x, name.image.width - src_x)
+            if visible_w > 0:
+                window = name.image.crop((src_x, 0, src_x + visible_w, name.image.height))
+                overlay.paste(window, (dst_x, row1_y + name.y0))
 
         # Row 2: Role label
-        color = ROLE_COLORS.get(role, (128, 128, 128))
-        if status == "error":
-            color = (255, 0, 0)
-        elif status == "waiting":
-            pass  # full brightness
-        elif status not in ("active",):
-            color = (color[0] * 2 // 3, color[1] * 2 // 3, color[2] * 2 // 3)
-
-        draw_outlined_text(odraw, (ix, row2_y), label, row2_font, fill=color)
+        row2_glyphs.draw_outlined(odraw, (ix, row2_y), current_agent.label, fill=current_agent.label_color)
     elif is_main and main_active:
         label = ROLE_LABELS.get("DIR", "DIR")
         color = ROLE_COLORS.get("DIR", (180, 0, 255))
-        draw_outlined_text(odraw, (ix, row2_y), label, row2_font, fill=color)
-
-    # Timer in row 2 right side
-    if timer_str:
-        timer_color = TIMER_COLORS[color_tick % len(TIMER_COLORS)]
-        timer_x = DISPLAY_SIZE - timer_w + 2
-        draw_outlined_text(odraw, (timer_x, row2_y + 1), timer_str, timer_font, fill=timer_color)
+        row2_glyphs.draw_outlined(odraw, (ix, row2_y), label, fill=color)
 
     # --- Top-right count: xN (agent count) in row 1 ---
     agent_count = len(agents)
@@ -573,18 +1733,22 @@ def compose_frame(
         count_str = str(agent_count)
         x_label = "x"
         count_color = get_count_color(agent_count)
-        x_w, _ = text_bbox_size(ui_font, x_label)
-        n_w, _ = text_bbox_size(ui_font, count_str)
+        x_w, _ = ui_glyphs.measure(x_label)
+        n_w, _ = ui_glyphs.measure(count_str)
         gap = 1
         total_w = x_w + gap + n_w
         x0 = DISPLAY_SIZE - total_w - 1
         y0 = 1
-        draw_outlined_text(odraw, (x0, y0), x_label, ui_font, fill=(140, 140, 140))
-        draw_outlined_text(odraw, (x0 + x_w + gap, y0), count_str, ui_font, fill=count_color)
+        ui_glyphs.draw_outlined(odraw, (x0, y0), x_label, fill=(140, 140, 140))
+        ui_glyphs.draw_outlined(odraw, (x0 + x_w + gap, y0), count_str, fill=count_color)
 
     # Composite transparent overlay onto sprite
     img.paste(overlay, (0, 0), overlay)
 
+    # Timer (subagents only) — separate overlay so the replay path can patch it alone
+    if not is_main and elapsed_sec is not None:
+        draw_timer(img, elapsed_sec, color_tick)
+
     # --- Scroll text: paste pre-rendered strip (fast!) ---
     strip = _scroll_cache.get_strip(scroll_text, scroll_font)
     src_x = max(0, -scroll_x)
@@ -597,29 +1761,1135 @@ def compose_frame(
     return img
 
 
+class FrameDedup:
+    """Content-hash dedup: the device only sees a frame whose pixels changed.
+
+    Hashes the composed RGB buffer (12KB) rather than a key of inputs, so
+    visually identical frames are skipped even when color_tick or the
+    animation index moved, and changes no key covered still get pushed.
+    """
+
+    def __init__(self):
+        self._last: bytes | None = None
+        self.pushed = 0
+        self.skipped = 0
+
+    def is_new(self, digest: bytes) -> bool:
+        if digest == self._last:
+            self.skipped += 1
+            return False
+        return True
+
+    def mark_pushed(self, digest: bytes) -> None:
+        self._last = digest
+        self.pushed += 1
+
+    def invalidate(self) -> None:
+        """Forget the device state (send failed / reconnect) so the next frame is pushed."""
+        self._last = None
+
+    def stats(self) -> str:
+        total = self.pushed + self.skipped
+        pct = 100.0 * self.skipped / total if total else 0.0
+        return f"pushed={self.pushed} skipped={self.skipped} ({pct:.0f}% deduped)"
+
+
+class FrameSpec(NamedTuple):
+    """Everything that determines a frame's pixels within one RenderState generation."""
+    generation: int
+    sprite: str
+    anim_idx: int
+    agent_idx: int           # index into RenderState.agents for the icon bar, -1 = none
+    is_main: bool
+    worker_offset: int       # row-1 scroll offset, already clamped as compose_frame draws it
+    text_x: int
+    elapsed_s: int | None    # timer seconds, None = no timer
+    timer_color: int         # TIMER_COLORS index (0 when there is no timer)
+
+    def untimed(self) -> FrameSpec:
+        """Cache key: the frame minus its timer (patched in per push by FrameRenderer.with_timer)."""
+        return self._replace(elapsed_s=None, timer_color=0)
+
+
+class RenderState(NamedTuple):
+    """Snapshot of the last state poll — immutable, shared with the render-ahead worker."""
+    generation: int
+    agents: tuple            # AgentView per live agent, in state-file order
+    main_active: bool
+    display_list: tuple      # DisplayEntry per rotation slot
+    ticker: str
+    ticker_w: int
+    is_sleeping: bool
+
+
+class FrameClock:
+    """Drift-free periodic deadlines: tick n is due at start + n * period.
+
+    Deadlines are computed, never accumulated, so float error can't creep
+    in.  After a stall (push outage, suspended VM) at most max_catch_up
+    missed ticks are replayed; the rest are dropped and the clock jumps to
+    the next future deadline — no burst of scroll steps, no animation jump.
+    """
+
+    __slots__ = ("start", "period", "n", "max_catch_up")
+
+    def __init__(self, start: float, period: float, max_catch_up: int = 0):
+        self.start = start
+        self.period = period
+        self.n = 0
+        self.max_catch_up = max_catch_up
+
+    @property
+    def next_t(self) -> float:
+        return self.start + self.n * self.period
+
+    def copy(self) -> FrameClock:
+        clone = FrameClock(self.start, self.period, self.max_catch_up)
+        clone.n = self.n
+        return clone
+
+    def take(self, now: float) -> tuple[int, int, float]:
+        """(ticks to apply, ticks dropped, lateness in s) for now; (0, 0, 0.0) if nothing is due."""
+        if now < self.next_t:
+            return 0, 0, 0.0
+        lateness = now - self.next_t
+        due = int(lateness // self.period) + 1
+        self.n += due
+        apply = min(due, 1 + self.max_catch_up)
+        return apply, due - apply, lateness
+
+
+class TickStats:
+    """Lateness histogram for one clock — how far past its deadline each tick ran."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0] * (len(LATENESS_BUCKETS_MS) + 1)  # last bucket: beyond the largest bound
+        self.ticks = 0
+        self.late = 0
+        self.dropped = 0
+        self.worst_ms = 0.0
+
+    def record(self, lateness: float, dropped: int) -> None:
+        ms = lateness * 1000.0
+        self.ticks += 1
+        self.dropped += dropped
+        self.late += ms > TICK_LATE_MS
+        self.worst_ms = max(self.worst_ms, ms)
+        for i, bound in enumerate(LATENESS_BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def stats(self) -> str:
+        hist = " ".join(
+            f"≤{bound}:{n}" for bound, n in zip(LATENESS_BUCKETS_MS, self.counts) if n
+        )
+        if self.counts[-1]:
+            hist += f" >{LATENESS_BUCKETS_MS[-1]}:{self.counts[-1]}"
+        pct = 100.0 * self.late / self.ticks if self.ticks else 0.0
+        return (
+            f"{self.name} ticks={self.ticks} late={self.late} ({pct:.1f}% >{TICK_LATE_MS}ms) "
+            f"dropped={self.dropped} worst={self.worst_ms:.0f}ms [{hist}]"
+        )
+
+
+class RenderCursor:
+    """Per-tick playback state — deterministic between state polls.
+
+    run() advances it in real time; RenderAhead advances a copy into the
+    future to predict the upcoming FrameSpecs.
+    """
+
+    def __init__(self, start: float):
+        self.display_idx = 0
+        self.anim_frame_idx = 0
+        self.color_tick = 0
+        self.text_x = DISPLAY_SIZE
+        self.worker_scroll_offset = 0         # current scroll offset for worker name (px)
+        self.worker_w = 0                     # cached pixel width of current worker name
+        self.worker_key: tuple | None = None  # (display_idx, agent_id, text) — detect agent changes
+        self.frame_clock = FrameClock(start, FRAME_INTERVAL_MS / 1000.0)
+        self.scroll_clock = FrameClock(start, SCROLL_SPEED_MS / 1000.0)
+        self.last_char_swap_t = start
+
+    def copy(self) -> RenderCursor:
+        clone = RenderCursor.__new__(RenderCursor)
+        clone.__dict__.update(self.__dict__)
+        clone.frame_clock = self.frame_clock.copy()
+        clone.scroll_clock = self.scroll_clock.copy()
+        return clone
+
+    def restart(self, now: float) -> None:
+        """Restart both clocks at now (leaving deep idle) — the pause is not lateness."""
+        self.frame_clock = FrameClock(now, self.frame_clock.period, self.frame_clock.max_catch_up)
+        self.scroll_clock = FrameClock(now, self.scroll_clock.period, self.scroll_clock.max_catch_up)
+
+    @property
+    def next_frame_t(self) -> float:
+        return self.frame_clock.next_t
+
+    @property
+    def next_scroll_t(self) -> float:
+        return self.scroll_clock.next_t
+
+    def next_event(self) -> float:
+        return min(self.next_frame_t, self.next_scroll_t)
+
+    def phase(self, now: float, rotating: bool) -> tuple:
+        """Everything that decides future frames (timer aside), relative to now — equal phases loop."""
+        return (
+            self.display_idx, self.anim_frame_idx, self.text_x,
+            self.worker_scroll_offset, self.worker_key,
+            round((now - self.last_char_swap_t) * 1000) if rotating else None,
+            round((self.next_frame_t - now) * 1000),
+            round((self.next_scroll_t - now) * 1000),
+        )
+
+    def rotate(self, now: float, n_entries: int) -> bool:
+        """Character rotation: True if display_idx moved to the next entry."""
+        if now - self.last_char_swap_t < CHARACTER_SWAP_SEC:
+            return False
+        self.last_char_swap_t = now
+        if n_entries <= 1:
+            return False  # single agent: just reset timer, no rotation
+        self.display_idx = (self.display_idx + 1) % n_entries
+        self.anim_frame_idx = 0
+        return True
+
+    def sync_worker(self, key: tuple, width: int) -> None:
+        """Reset the row-1 scroll when the displayed agent (or its name) changes."""
+        if key != self.worker_key:
+            self.worker_key = key
+            self.worker_scroll_offset = 0
+            self.worker_w = width
+
+    def advance_frames(self, now: float, anim_frames: int, stats: TickStats | None = None) -> bool:
+        """Apply the sprite-animation tick due by now (stale ones dropped); True if any."""
+        ticks, dropped, lateness = self.frame_clock.take(now)
+        if not ticks:
+            return False
+        if stats is not None:
+            stats.record(lateness, dropped)
+        self.anim_frame_idx = (self.anim_frame_idx + ticks) % anim_frames
+        self.color_tick += ticks
+        return True
+
+    def advance_scroll(self, now: float, ticker_w: int, stats: TickStats | None = None) -> bool:
+        """Apply the ticker/worker-name scroll tick due by now (stale ones dropped); True if any."""
+        ticks, dropped, lateness = self.scroll_clock.take(now)
+        if not ticks:
+            return False
+        if stats is not None:
+            stats.record(lateness, dropped)
+        for _ in range(ticks):
+            self.text_x -= TEXT_STEP_PX
+            if self.text_x + ticker_w < 0:
+                self.text_x = DISPLAY_SIZE
+            self.worker_scroll_offset = advance_worker_scroll(
+                self.worker_scroll_offset, self.worker_w, DISPLAY_SIZE - 2,
+            )
+        return True
+
+    def advance(self, now: float, anim_frames: int, ticker_w: int) -> bool:
+        """Apply every frame/scroll tick due by now; True if anything moved."""
+        frames = self.advance_frames(now, anim_frames)
+        return self.advance_scroll(now, ticker_w) or frames
+
+
+class DisplayEntry(NamedTuple):
+    """One slot of the character rotation."""
+    char: str
+    started: float | None
+    is_main: bool
+
+
+_MAIN_ENTRY = DisplayEntry("opus", None, True)
+
+
+class FrameRenderer:
+    """Turns (RenderState, FrameSpec) into the base64 payload Draw/SendHttpGif expects.
+
+    Owns the fonts and sprite store; the lock serializes the shared text
+    caches so the render-ahead thread and the run loop can both render.
+    """
+
+    def __init__(self, sprites: SpriteStore, sleep_sprite: str, scroll_font, ui_font, row1_font):
+        self.sprites = sprites
+        self.sleep_sprite = sleep_sprite
+        self._scroll_font = scroll_font
+        self._ui_font = ui_font
+        self._row1_font = row1_font
+        # Use descender-heavy chars for accurate height measurement
+        bbox = ImageDraw.Draw(Image.new("RGB", (1, 1))).textbbox((0, 0), "あgyj漢", font=scroll_font)
+        self._scroll_text_h = bbox[3] - bbox[1]
+        self._lock = threading.Lock()
+        self._timer_band = timer_band()
+
+    def ticker_width(self, ticker: str) -> int:
+        with self._lock:
+            _scroll_cache.get_strip(ticker, self._scroll_font)
+            return _scroll_cache.width
+
+    def agent_views(self, agents: list, char_names) -> tuple[AgentView, ...]:
+        """Ingest raw state-file agents: strip, resolve and measure everything the frames need."""
+        views = []
+        for agent in agents:
+            view = agent_view(agent, char_names)
+            if view.name:
+                with self._lock:
+                    strip = _worker_name_cache.get(view.id, view.name, view.name_color, self._row1_font)
+                view = view._replace(name_w=strip.text_w)
+            views.append(view)
+        return tuple(views)
+
+    @staticmethod
+    def worker_name(agents: tuple, idx: int) -> tuple[tuple, int]:
+        """(key, width) of the row-1 name for agents[idx] — feeds RenderCursor.sync_worker."""
+        if idx >= len(agents):
+            return (idx, "", ""), 0
+        view = agents[idx]
+        return (idx, view.id, view.name), view.name_w
+
+    def sprite_for(self, state: RenderState, display_idx: int) -> str:
+        if state.is_sleeping:
+            return self.sleep_sprite
+        return state.display_list[display_idx].char if state.display_list else "opus"
+
+    def spec(self, state: RenderState, cursor: RenderCursor, wall_now: float) -> FrameSpec:
+        idx = cursor.display_idx
+        if state.is_sleeping:
+            is_main, elapsed = True, None
+        else:
+            entry = state.display_list[idx] if state.display_list else _MAIN_ENTRY
+            is_main = entry.is_main
+            elapsed = None
+            if not is_main and entry.started:
+                elapsed = wall_now - entry.started
+        # Phase 5-A: icon bar agent matched by display_idx position in the agent list
+        agent_idx = idx if (not state.is_sleeping and not is_main and idx < len(state.agents)) else -1
+        worker_offset = 0
+        if agent_idx >= 0:
+            worker_offset = min(max(0, cursor.worker_scroll_offset), max(0, cursor.worker_w - (DISPLAY_SIZE - 2)))
+        elapsed_s = int(elapsed) if elapsed is not None else None
+        return FrameSpec(
+            generation=state.generation,
+            sprite=self.sprite_for(state, idx),
+            anim_idx=cursor.anim_frame_idx,
+            agent_idx=agent_idx,
+            is_main=is_main,
+            worker_offset=worker_offset,
+            text_x=cursor.text_x,
+            elapsed_s=elapsed_s,
+            timer_color=cursor.color_tick % len(TIMER_COLORS) if elapsed_s is not None else 0,
+        )
+
+    def render(self, spec: FrameSpec, state: RenderState) -> bytes:
+        """Compose the untimed frame and return it base64-encoded."""
+        with self._lock:
+            composed = compose_frame(
+                bg_frame=self.sprites.frame(spec.sprite, spec.anim_idx),
+                scroll_font=self._scroll_font,
+                ui_font=self._ui_font,
+                scroll_text=state.ticker,
+                scroll_x=spec.text_x,
+                agents=state.agents,
+                main_active=state.main_active,
+                elapsed_sec=None,
+                color_tick=0,
+                is_main=spec.is_main,
+                scroll_text_h=self._scroll_text_h,
+                current_agent=state.agents[spec.agent_idx] if spec.agent_idx >= 0 else None,
+                worker_scroll_offset=spec.worker_offset,
+            )
+        return base64.b64encode(composed.tobytes())
+
+    def with_timer(self, payload: bytes, spec: FrameSpec) -> bytes:
+        """Patch the timer into an untimed payload — only the timer band is decoded/re-encoded.
+
+        An RGB pixel is 3 bytes = exactly 4 base64 chars, so display rows map
+        to fixed slices of the payload.
+        """
+        if spec.elapsed_s is None:
+            return payload
+        top, bottom = self._timer_band
+        a, b = top * DISPLAY_SIZE * 4, bottom * DISPLAY_SIZE * 4
+        band = Image.frombytes("RGB", (DISPLAY_SIZE, bottom - top), base64.b64decode(payload[a:b]))
+        with self._lock:
+            draw_timer(band, spec.elapsed_s, spec.timer_color, top=top)
+        return payload[:a] + base64.b64encode(band.tobytes()) + payload[b:]
+
+    def flush_caches(self) -> None:
+        with self._lock:
+            flush_glyph_atlases()
+
+    def warm_up(self) -> None:
+        """Start-up work the first frame doesn't need — run in the background after it is pushed."""
+        load_pilmoji()
+        # Glyph atlas warm-up: ASCII is rasterized once (or loaded from the disk cache)
+        for size in (UI_FONT_SIZE, ICON_BAR_ROW1_FONT_SIZE, ICON_BAR_ROW2_FONT_SIZE, TIMER_FONT_SIZE):
+            font = load_font(size=size)
+            with self._lock:
+                glyph_atlas(font).warm(GLYPH_WARM_CHARS)
+        with self._lock:
+            flush_glyph_atlases()
+            # Offline emoji: pre-load the ticker/character emoji so Pilmoji never goes to the network
+            found = _emoji_source.warm(EMOJI_PREWARM)
+        if found == 0:
+            print(f"[!] No offline emoji images in {EMOJI_DIR} — emoji will be stripped from tickers")
+
+
+def predict_specs(
+    renderer: FrameRenderer,
+    state: RenderState,
+    cursor: RenderCursor,
+    count: int,
+    wall_offset: float,
+    until_repeat: bool = False,
+) -> list[FrameSpec]:
+    """Replay the run loop's tick logic on a cursor copy to list the next `count` frames.
+
+    wall_offset converts the monotonic event time to wall time for timers.
+    With until_repeat, stop early once the cursor is back in a phase it has
+    already been in — the returned specs are then one full display loop.
+    State polls are not predicted — a changed state bumps the generation.
+    """
+    c = cursor.copy()
+    specs: list[FrameSpec] = []
+    seen: set[tuple] = set()
+    rotating = bool(state.agents) and len(state.display_list) > 1
+    while len(specs) < count:
+        t = c.next_event()
+        if until_repeat:
+            phase = c.phase(t, rotating)
+            if phase in seen:
+                break
+            seen.add(phase)
+        if state.agents:
+            c.rotate(t, len(state.display_list))
+        c.sync_worker(*renderer.worker_name(state.agents, c.display_idx))
+        anim_frames = renderer.sprites.frame_count(renderer.sprite_for(state, c.display_idx))
+        if c.advance(t, anim_frames, state.ticker_w):
+            specs.append(renderer.spec(state, c, t + wall_offset))
+    return specs
+
+
+class RenderAhead:
+    """Encoded untimed frames for the current state, composed on a worker thread.
+
+    Normally the worker renders the next RENDER_AHEAD_FRAMES frames.  Once
+    the state has been stable for LOOP_STABLE_SEC it precomputes the whole
+    rotation × scroll loop (up to LOOP_CACHE_MAX frames), after which the
+    run loop just replays payloads from memory until the state changes.
+    On a miss (state changed, prediction off) the caller composes inline.
+    """
+
+    def __init__(self, renderer: FrameRenderer, depth: int = RENDER_AHEAD_FRAMES):
+        self._renderer = renderer
+        self._depth = depth
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render-ahead")
+        self._frames: dict[FrameSpec, bytes] = {}
+        self._lock = threading.Lock()
+        self._job: Future | None = None
+        self._latest_generation = -1
+        self._stable_since = 0.0
+        self._loop_generation = -1    # generation whose whole loop was attempted
+        self._loop_closed = False     # ... and fit in LOOP_CACHE_MAX
+        self.hits = 0
+        self.misses = 0
+
+    def take(self, spec: FrameSpec) -> bytes | None:
+        with self._lock:
+            payload = self._frames.get(spec.untimed())
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    def put(self, spec: FrameSpec, payload: bytes) -> None:
+        """Keep a frame the caller had to compose inline — loops that drifted from the prediction converge."""
+        with self._lock:
+            self._frames[spec.untimed()] = payload
+            while len(self._frames) > LOOP_CACHE_MAX:
+                del self._frames[next(iter(self._frames))]
+
+    def render_all(self, specs: list[FrameSpec], state: RenderState) -> Future:
+        """Render (or reuse) the given untimed frames on the worker; the future yields their payloads."""
+        return self._executor.submit(self._render_all, specs, state)
+
+    def _render_all(self, specs: list[FrameSpec], state: RenderState) -> list[bytes]:
+        payloads = []
+        for spec in specs:
+            key = spec.untimed()
+            with self._lock:
+                payload = self._frames.get(key)
+            if payload is None:
+                payload = self._renderer.render(key, state)
+                self.put(key, payload)
+            payloads.append(payload)
+        return payloads
+
+    def refill(self, state: RenderState, cursor: RenderCursor, now: float, wall_now: float) -> None:
+        """Kick the worker to render frames following the cursor's current position."""
+        if state.generation != self._latest_generation:
+            self._latest_generation = state.generation
+            self._stable_since = now
+        if self._job is not None and not self._job.done():
+            return
+        whole_loop = False
+        if self._loop_generation == state.generation:
+            if self._loop_closed:
+                return  # every frame of this state is already cached
+        elif now - self._stable_since >= LOOP_STABLE_SEC:
+            self._loop_generation = state.generation
+            self._loop_closed = False
+            whole_loop = True
+        self._job = self._executor.submit(self._fill, state, cursor.copy(), wall_now - now, whole_loop)
+
+    def _fill(self, state: RenderState, cursor: RenderCursor, wall_offset: float, whole_loop: bool) -> None:
+        try:
+            with self._lock:
+                for key in [k for k in self._frames if k.generation != state.generation]:
+                    del self._frames[key]
+            # A loop revisits the same frames many times (e.g. 4 sprite frames × ticker
+            # positions), so scan well past LOOP_CACHE_MAX ticks before giving up.
+            count = LOOP_SCAN_TICKS if whole_loop else self._depth
+            specs = predict_specs(self._renderer, state, cursor, count, wall_offset, until_repeat=whole_loop)
+            keys = list(dict.fromkeys(spec.untimed() for spec in specs))
+            if whole_loop and (len(specs) >= count or len(keys) > LOOP_CACHE_MAX):
+                print(f"[i] Frame loop longer than {LOOP_CACHE_MAX} frames — rendering ahead instead")
+                whole_loop = False
+                keys = keys[:self._depth]
+            for key in keys:
+                if state.generation != self._latest_generation:
+                    return  # state moved on — don't burn CPU on dead frames
+                with self._lock:
+                    if key in self._frames:
+                        continue
+                payload = self._renderer.render(key, state)
+                with self._lock:
+                    self._frames[key] = payload
+                    while len(self._frames) > LOOP_CACHE_MAX:
+                        del self._frames[next(iter(self._frames))]
+            if whole_loop:
+                self._loop_closed = True
+                kib = sum(len(self._frames[k]) for k in keys) // 1024
+                print(f"[i] Frame loop: {len(specs)} ticks, {len(keys)} frames cached ({kib} KiB) — replaying")
+        except Exception as e:  # never let the worker die silently mid-run
+            print(f"[!] Render-ahead failed: {e}")
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        pct = 100.0 * self.hits / total if total else 0.0
+        return f"render-ahead hits={self.hits} misses={self.misses} ({pct:.0f}% hit)"
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FrameSender:
+    """Posts pre-encoded frames to the Pixoo over one keep-alive HTTP connection.
+
+    Speaks the same Draw/SendHttpGif protocol as pixoo.Pixoo.push(), but
+    takes the base64 payload as-is: no per-pixel buffer copy, no re-encode,
+    no JSON serialization of the 16 KiB string.
+    """
+
+    def __init__(self, ip: str, timeout: float = PIXOO_HTTP_TIMEOUT_SEC):
+        self._ip = ip
+        self._timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+        self._pic_id = 0
+
+    def _open(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self._ip, 80, timeout=self._timeout)
+
+    def _post(self, body: bytes) -> dict:
+        while True:
+            reused = self._conn is not None
+            if not reused:
+                self._conn = self._open()
+            try:
+                self._conn.request("POST", "/post", body=body, headers={"Content-Type": "application/json"})
+                data = json.loads(self._conn.getresponse().read())
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.close()
+                if reused:
+                    continue  # idle keep-alive socket dropped by the device — one retry on a fresh one
+                raise
+            except (OSError, http.client.HTTPException, ValueError):
+                self.close()  # next request reconnects
+                raise
+            break
+        if data.get("error_code", 0) != 0:
+            raise RuntimeError(f"Pixoo error: {data}")
+        return data
+
+    def connect(self) -> None:
+        """Load the device's GIF id (also validates the connection); reset it if past the limit."""
+        self._pic_id = int(self._post(b'{"Command": "Draw/GetHttpGifId"}').get("PicId", 0))
+        if self._pic_id >= GIF_ID_RESET_AT:
+            self._reset_pic_id()
+
+    def _reset_pic_id(self) -> None:
+        self._post(b'{"Command": "Draw/ResetHttpGifId"}')
+        self._pic_id = 0
+
+    def _next_pic_id(self) -> int:
+        self._pic_id += 1
+        if self._pic_id >= GIF_ID_RESET_AT:
+            self._reset_pic_id()
+            self._pic_id = 1
+        return self._pic_id
+
+    def _send_gif_frame(self, pic_id: int, payload: bytes, count: int, offset: int, speed_ms: int) -> None:
+        head = (
+            '{"Command": "Draw/SendHttpGif", "PicNum": %d, "PicWidth": %d, "PicOffset": %d, '
+            '"PicID": %d, "PicSpeed": %d, "PicData": "' % (count, DISPLAY_SIZE, offset, pic_id, speed_ms)
+        )
+        self._post(head.encode() + payload + b'"}')
+
+    def send(self, payload: bytes) -> None:
+        """Show one frame; payload is the base64 RGB buffer from FrameRenderer."""
+        self._send_gif_frame(self._next_pic_id(), payload, 1, 0, 1000)
+
+    def send_animation(self, payloads: list[bytes], speed_ms: int) -> None:
+        """Upload a looping animation — the device keeps playing it with no further requests."""
+        pic_id = self._next_pic_id()
+        for offset, payload in enumerate(payloads):
+            self._send_gif_frame(pic_id, payload, len(payloads), offset, speed_ms)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class StartupProfile:
+    """Start-up milestones since STARTUP_T0, logged once the first frame reaches the device."""
+
+    def __init__(self, t0: float = STARTUP_T0):
+        self._t0 = t0
+        self._last = t0
+        self.steps: list[tuple[str, float]] = []
+
+    def mark(self, step: str) -> None:
+        now = time.monotonic()
+        self.steps.append((step, now - self._last))
+        self._last = now
+
+    def elapsed(self) -> float:
+        return self._last - self._t0
+
+    def stats(self) -> str:
+        return ", ".join(f"{step} {dt * 1000:.0f}ms" for step, dt in self.steps)
+
+
+async def _sleep_until(deadline: float) -> None:
+    """Sleep until a time.monotonic() deadline (the asyncio loop clock is the same clock)."""
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+class DisplayLoop:
+    """run()'s scheduler: one asyncio task per concern, all on time.monotonic().
+
+    Frame ticks and scroll ticks only move the cursor and mark the display
+    dirty; the push task turns the latest cursor into one frame and sends it
+    on the I/O thread, so a slow device coalesces ticks instead of queueing
+    them.  State polls and git scans run on their own cadence.  Every task
+    sleeps until its next deadline — nothing polls.
+    """
+
+    def __init__(
+        self,
+        renderer: FrameRenderer,
+        ahead: RenderAhead,
+        sender: FrameSender,
+        char_names: list,
+        default_ticker: str,
+        profile: StartupProfile | None = None,
+        ticker_sources: list | None = None,
+    ):
+        self.renderer = renderer
+        self.ahead = ahead
+        self.sender = sender
+        self.char_names = char_names
+        self.default_ticker = default_ticker
+        # Idle ticker (no agent task to show): resolved in the background, only read by apply_state
+        self.tickers = TickerBoard(
+            ticker_sources if ticker_sources is not None else [GitTickerSource(), TodoTickerSource()],
+            fallback=default_ticker,
+        )
+        self.dedup = FrameDedup()  # skip pushes whose pixels match the last pushed frame
+        self.frame_stats = TickStats("frame")
+        self.scroll_stats = TickStats("scroll")
+        self.profile = profile or StartupProfile(time.monotonic())
+        self.first_pixel_s: float | None = None  # seconds from STARTUP_T0 to the first frame on the device
+        self._warm_job: asyncio.Future | None = None
+        # Everything drawn comes from `state` (changes on polls) + `cursor` (changes on ticks)
+        self.state = RenderState(
+            generation=0, agents=(), main_active=False, display_list=(),
+            ticker=default_ticker, ticker_w=renderer.ticker_width(default_ticker), is_sleeping=False,
+        )
+        self.start = time.monotonic()
+        self.cursor = RenderCursor(self.start)
+        self.current_display_char: str | None = None  # Track by name, not index
+        self.agent_count = 0
+        self.is_sleeping = False
+        self.last_active_time = self.start
+        self._dirty = asyncio.Event()
+        self._awake = asyncio.Event()  # cleared in deep idle
+        self._awake.set()
+        self._idle_failed = False
+        self._pending: tuple[list, bool] | None = None  # ingested state waiting for the next frame tick
+        self._agents: list = []  # raw agents of the applied state (last_seen drives the TTL deadline)
+        self._watcher: StateWatcher | None = None
+        # Notify mode: a notification owns the device, pushes pause.  Cached — never queried per frame
+        self.notify_mode = False
+        self._notify_sources = {"file": False, "legacy": False}
+        self._notify_watcher: StateWatcher | None = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pixoo-io")
+
+    async def run(self, duration_sec: float | None = None) -> None:
+        self._watcher = StateWatcher(STATE_FILE)
+        self._watcher.start()
+        print(f"[i] State: watching {STATE_FILE} ({self._watcher.mode})")
+        # The initial state lands before the first tick
+        data, _ = self._watcher.load()
+        self.apply_state(*agent_state_from(data, time.time()), time.monotonic())
+        self._notify_watcher = StateWatcher(NOTIFY_MODE_FILE)
+        self._notify_watcher.start()
+        self._notify_watcher.load()
+        await self._set_notify_mode("file", NOTIFY_MODE_FILE.exists())
+        await self._sync_deep_idle()
+        coros = [
+            self._ingest_state(),
+            self._watch_notify_mode(),
+            self.tickers.run(self._awake),
+            self._follow_tickers(),
+            self._frame_ticks(),
+            self._scroll_ticks(),
+            self._push_frames(),
+            self._log_stats(),
+        ]
+        if is_notify_mode is not None:
+            coros.append(self._poll_legacy_notify_mode())
+        tasks = [asyncio.create_task(coro) for coro in coros]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=duration_sec, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()  # re-raise whatever stopped the loop
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._watcher.close()
+            self._notify_watcher.close()
+            self._io.shutdown(wait=False)
+
+    # --- state ingestion ---
+
+    async def _ingest_state(self) -> None:
+        """Re-read STATE_FILE when it changes — or when an agent TTL or the sleep timer runs out."""
+        while True:
+            timeout = self._state_timeout()
+            started = time.monotonic()
+            await self._watcher.wait(timeout)
+            data, changed = self._watcher.load()
+            if not changed and (timeout is None or time.monotonic() - started < timeout):
+                continue  # another file in the directory, or an identical rewrite
+            agents, main_active = agent_state_from(data, time.time())
+            if self._awake.is_set():
+                self._pending = (agents, main_active)  # applied by the next frame tick
+            else:
+                # Deep idle: no ticks are running — apply (and wake) right away
+                self.apply_state(agents, main_active, time.monotonic())
+                await self._sync_deep_idle()
+
+    def _state_timeout(self) -> float | None:
+        """Seconds until the shown state changes on its own (agent TTL / sleep), None = only on file change."""
+        deadlines = []
+        expiry = next_agent_expiry(self._agents, time.time())
+        if expiry is not None:
+            deadlines.append(expiry + 0.01)  # just past the TTL so the agent is really gone
+        if not self.is_sleeping and self.agent_count == 0 and not self.state.main_active:
+            deadlines.append(max(0.0, self.last_active_time + SLEEP_AFTER_SEC - time.monotonic()))
+        return min(deadlines) if deadlines else None
+
+    async def _apply_pending(self) -> None:
+        if self._pending is not None:
+            agents, main_active = self._pending
+            self._pending = None
+            self.apply_state(agents, main_active, time.monotonic())
+            await self._sync_deep_idle()
+
+    async def _follow_tickers(self) -> None:
+        """Pick up a new idle ticker on the next frame tick."""
+        while True:
+            await self.tickers.changed.wait()
+            self.tickers.changed.clear()
+            ticker = self.tickers.current()
+            if ticker != self.default_ticker:
+                self.default_ticker = ticker
+                if self._pending is None:
+                    self._pending = (self._agents, self.state.main_active)  # re-pick the ticker on the next frame tick
+
+    def _first_pixel(self) -> None:
+        """Log time-to-first-pixel once, then start the deferred warm-up."""
+        if self.first_pixel_s is not None:
+            return
+        self.profile.mark("first frame")
+        self.first_pixel_s = self.profile.elapsed()
+        print(f"[i] Time to first pixel: {self.first_pixel_s * 1000:.0f}ms ({self.profile.stats()})")
+        self._warm_job = asyncio.get_running_loop().run_in_executor(None, self.renderer.warm_up)
+        self._warm_job.add_done_callback(self._warm_up_done)
+
+    @staticmethod
+    def _warm_up_done(job: asyncio.Future) -> None:
+        if not job.cancelled() and job.exception() is not None:
+            print(f"[!] Warm-up failed: {job.exception()}")
+
+    # --- notify mode ---
+
+    async def _watch_notify_mode(self) -> None:
+        """Follow NOTIFY_MODE_FILE: created → notify mode on, removed → off (inotify, so instant)."""
+        while True:
+            await self._notify_watcher.wait(None)
+            if self._notify_watcher.load()[1]:
+                await self._set_notify_mode("file", NOTIFY_MODE_FILE.exists())
+
+    async def _poll_legacy_notify_mode(self) -> None:
+        """pixoo-follow-notify's is_notify_mode(), for notifiers that don't write NOTIFY_MODE_FILE yet.
+
+        Parked in deep idle like the ticker sources — no timer wakeups while
+        the device loops the sleep animation.  A legacy notification shown
+        during deep idle is therefore only noticed on wake-up; notifiers
+        that write NOTIFY_MODE_FILE are followed by inotify either way.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._awake.wait()
+            active = await loop.run_in_executor(None, is_notify_mode)
+            await self._set_notify_mode("legacy", bool(active))
+            await asyncio.sleep(NOTIFY_LEGACY_POLL_SEC)
+
+    async def _set_notify_mode(self, source: str, active: bool) -> None:
+        self._notify_sources[source] = active
+        notify_mode = any(self._notify_sources.values())
+        if notify_mode == self.notify_mode:
+            return
+        self.notify_mode = notify_mode
+        if notify_mode:
+            print(f"[notify] mode on ({source}) — pausing pushes")
+            return
+        print(f"[notify] mode off ({source}) — taking the display back")
+        # The device shows the notification, not our last frame: repaint now
+        self.dedup.invalidate()
+        if not self._awake.is_set():
+            self._awake.set()  # deep idle: re-upload the sleep animation
+        await self._sync_deep_idle()
+        self._dirty.set()
+
+    # --- deep idle ---
+
+    async def _sync_deep_idle(self) -> None:
+        """Enter deep idle when sleep starts, leave it the moment the state wakes up.
+
+        Deep idle: the sleep animation is uploaded once as a multi-frame GIF
+        that the device loops on its own; tick, push and git tasks then park
+        on self._awake, so nothing renders or talks HTTP until a state change.
+        """
+        if self.is_sleeping and self._awake.is_set() and not self._idle_failed and not self.notify_mode:
+            self._awake.clear()
+            try:
+                # composed on the render-ahead worker — the clock and state ingestion keep running
+                frames = await asyncio.wrap_future(self.ahead.render_all(self._sleep_specs(), self.state))
+                if self._awake.is_set():
+                    return  # woke up while the frames were being composed
+                await asyncio.get_running_loop().run_in_executor(
+                    self._io, self.sender.send_animation, frames, FRAME_INTERVAL_MS,
+                )
+            except Exception as e:
+                print(f"[!] Sleep animation upload failed, animating from here instead: {e}")
+                self._idle_failed = True  # don't retry every poll — the device may be down
+                self._awake.set()
+            else:
+                print("[i] Deep idle: sleep animation uploaded, rendering paused")
+                self._first_pixel()
+            self.dedup.invalidate()
+        elif not self.is_sleeping:
+            self._idle_failed = False
+            if not self._awake.is_set():
+                print("[i] Deep idle: resumed rendering")
+                self.cursor.restart(time.monotonic())
+                self._awake.set()
+
+    def _sleep_specs(self) -> list[FrameSpec]:
+        """Sleep sprite frames with the sleep ticker parked where it is readable (no scrolling)."""
+        state = self.state
+        sprite = self.renderer.sleep_sprite
+        return [
+            FrameSpec(
+                generation=state.generation, sprite=sprite, anim_idx=i, agent_idx=-1, is_main=True,
+                worker_offset=0, text_x=max(0, (DISPLAY_SIZE - state.ticker_w) // 2),
+                elapsed_s=None, timer_color=0,
+            )
+            for i in range(self.renderer.sprites.frame_count(sprite))
+        ]
+
+    def apply_state(self, agents: list, main_active: bool, now: float) -> None:
+        cursor = self.cursor
+        state = self.state
+        new_count = len(agents)
+        was_active = self.agent_count > 0 or state.main_active
+
+        # Ingest: everything frames read about an agent is resolved here, once per state change
+        views = self.renderer.agent_views(agents, self.char_names)
+        self._agents = agents
+
+        # サブエージェント活動中 → サブエージェントだけ表示（ロブ🦞なし）
+        # アイドル時 → ロブ🦞のみ表示
+        if views:
+            new_display_list = [DisplayEntry(v.char, v.started, False) for v in views]
+        else:
+            new_display_list = [_MAIN_ENTRY]
+
+        if new_count != self.agent_count:
+            old_count = self.agent_count
+            new_chars = [d.char for d in new_display_list]
+            print(f"[i] Subagents: {new_count} chars={new_chars} display_idx={cursor.display_idx}")
+            # Reset swap timer on 0→N transition to prevent immediate swap
+            if old_count == 0 and new_count > 0:
+                cursor.last_char_swap_t = now
+                print(f"[rot] reset-timer: agents 0→{new_count}, swap timer reset")
+            # All agents gone
+            if old_count > 0 and new_count == 0:
+                print(f"[rot] reset: agents gone, fallback to idx 0 (opus)")
+            # Single agent: log only on 0→1 transition (P1-C fix)
+            if new_count == 1 and old_count == 0:
+                print(f"[rot] single-agent: {new_chars[0]} (no rotation needed)")
+            self.agent_count = new_count
+
+        if new_count > 0 or main_active:
+            self.last_active_time = now
+            if self.is_sleeping:
+                self.is_sleeping = False
+                wake_reason = "subagents" if new_count > 0 else "main session"
+                print(f"[i] Woke up! ({wake_reason})")
+        elif was_active:
+            self.last_active_time = now  # active right up to this change — no periodic poll refreshes it
+
+        # Sleep check — only sleep if both subagents AND main are idle
+        if new_count == 0 and not main_active and (now - self.last_active_time) >= SLEEP_AFTER_SEC:
+            if not self.is_sleeping:
+                self.is_sleeping = True
+                print("[i] Sleep mode")
+
+        # Update scroll text dynamically (after the sleep check, so the sleep animation gets SLEEP_TICKER)
+        task_text = get_latest_task_text(agents)
+        if task_text:
+            new_ticker = task_text
+        elif self.is_sleeping:
+            new_ticker = SLEEP_TICKER
+        else:
+            new_ticker = self.default_ticker
+
+        if new_ticker != state.ticker:
+            cursor.text_x = DISPLAY_SIZE  # reset scroll position
+            print(f"[i] Ticker: {new_ticker}")
+
+        # Preserve current character across list rebuilds to prevent
+        # mid-rotation jumps (fixes Grok early-disappear bug).
+        display_list = state.display_list
+        display_idx = cursor.display_idx
+        old_chars = [d.char for d in display_list]
+        old_char = self.current_display_char
+        old_is_main = display_list[display_idx].is_main if display_list and display_idx < len(display_list) else True
+        old_display_idx = display_idx
+        display_list = new_display_list
+        new_chars_rebuild = [d.char for d in display_list]
+
+        if old_char and display_list:
+            found_idx = None
+            # Try to find exact match (same char + same is_main flag)
+            for i, entry in enumerate(display_list):
+                if entry.char == old_char and entry.is_main == old_is_main:
+                    found_idx = i
+                    break
+            if found_idx is None:
+                # Fallback: match by char name only
+                for i, entry in enumerate(display_list):
+                    if entry.char == old_char:
+                        found_idx = i
+                        break
+            if found_idx is not None:
+                display_idx = found_idx
+                self.current_display_char = display_list[display_idx].char  # P1-A fix: sync char name
+                if old_chars != new_chars_rebuild:
+                    print(f"[rot] list-rebuild: {old_chars} → {new_chars_rebuild} (preserved: {old_char}@{display_idx})")
+            else:
+                # Character gone: clamp to nearest valid position instead of resetting to 0
+                display_idx = min(old_display_idx, len(display_list) - 1) if display_list else 0
+                self.current_display_char = display_list[display_idx].char if display_list else "opus"
+                print(f"[rot] list-rebuild: {old_chars} → {new_chars_rebuild} (gone: {old_char}, fallback idx {display_idx} → {self.current_display_char})")
+        elif display_idx >= len(display_list):
+            display_idx = 0
+        cursor.display_idx = display_idx
+        if self.agent_count == 0:
+            cursor.display_idx = 0
+            self.current_display_char = "opus"
+
+        # New generation only when something visible changed — keeps render-ahead frames valid
+        new_state = state._replace(
+            agents=views,
+            main_active=main_active,
+            display_list=tuple(display_list),
+            ticker=new_ticker,
+            is_sleeping=self.is_sleeping,
+        )
+        if new_state[1:] != state[1:]:
+            self.state = new_state._replace(
+                generation=state.generation + 1,
+                ticker_w=self.renderer.ticker_width(new_ticker),
+            )
+            self._dirty.set()
+        # Persist glyphs rasterized for new worker names (no-op otherwise)
+        self.renderer.flush_caches()
+
+    # --- ticks ---
+
+    def _prepare_tick(self, now: float) -> None:
+        """Rotation + worker-name sync, run before every frame or scroll tick (as predict_specs does)."""
+        cursor = self.cursor
+        state = self.state
+        if self.agent_count > 0:
+            old_idx = cursor.display_idx
+            if cursor.rotate(now, len(state.display_list)):
+                old_char_name = state.display_list[old_idx].char if old_idx < len(state.display_list) else "?"
+                self.current_display_char = state.display_list[cursor.display_idx].char
+                print(f"[rot] swap: {old_char_name} → {self.current_display_char} (idx {old_idx}→{cursor.display_idx}/{len(state.display_list)}, interval={CHARACTER_SWAP_SEC}s)")
+        # Worker name scroll: recompute width + reset offset when displayed agent changes
+        cursor.sync_worker(*self.renderer.worker_name(state.agents, cursor.display_idx))
+
+    async def _frame_ticks(self) -> None:
+        while True:
+            await self._awake.wait()
+            await _sleep_until(self.cursor.next_frame_t)
+            if not self._awake.is_set():
+                continue
+            await self._apply_pending()
+            if not self._awake.is_set():
+                continue  # that state sent us to sleep
+            now = time.monotonic()
+            self._prepare_tick(now)
+            anim_frames = self.renderer.sprites.frame_count(
+                self.renderer.sprite_for(self.state, self.cursor.display_idx)
+            )
+            if self.cursor.advance_frames(now, anim_frames, self.frame_stats):
+                self._dirty.set()
+
+    async def _scroll_ticks(self) -> None:
+        while True:
+            await self._awake.wait()
+            await _sleep_until(self.cursor.next_scroll_t)
+            if not self._awake.is_set():
+                continue
+            now = time.monotonic()
+            self._prepare_tick(now)
+            if self.cursor.advance_scroll(now, self.state.ticker_w, self.scroll_stats):
+                self._dirty.set()
+
+    # --- device I/O ---
+
+    async def _push_frames(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            if not self._awake.is_set():
+                continue  # deep idle: the device is playing the uploaded sleep animation
+            if self.notify_mode:
+                continue  # Phase 6: a notification owns the device (the flag is cached, see _set_notify_mode)
+            now = time.monotonic()
+            wall_now = time.time()
+            state, cursor = self.state, self.cursor
+            spec = self.renderer.spec(state, cursor, wall_now)
+            # Rendered ahead on the worker thread when predicted; compose inline otherwise
+            payload = self.ahead.take(spec)
+            if payload is None:
+                payload = self.renderer.render(spec, state)
+                self.ahead.put(spec, payload)
+            self.ahead.refill(state, cursor, now, wall_now)  # overlaps the send below
+            # Timer digits change every second — patched into the cached payload per push
+            payload = self.renderer.with_timer(payload, spec)
+            # Dirty-frame detection by content hash — skip push if the pixels are unchanged
+            digest = frame_digest(payload)
+            if not self.dedup.is_new(digest):
+                continue
+            try:
+                logger.debug("[push] frame=%s agent=%s", spec.anim_idx, spec.sprite)
+                await loop.run_in_executor(self._io, self.sender.send, payload)
+                logger.debug("[push] OK")
+                self.dedup.mark_pushed(digest)
+                self._first_pixel()
+            except Exception as e:
+                print(f"[!] Pixoo send failed: {e}")
+                self.dedup.invalidate()  # force retry next frame
+                await asyncio.sleep(5)  # Back off before retry
+                try:
+                    await loop.run_in_executor(self._io, self.sender.connect)
+                    print("[i] Pixoo reconnect attempted")
+                except Exception:
+                    print("[!] Pixoo reconnect failed, will retry next frame")
+
+    async def _log_stats(self) -> None:
+        while True:
+            await asyncio.sleep(DEDUP_STATS_SEC)
+            await self._awake.wait()  # counters don't move in deep idle
+            print(f"[i] Frames: {self.stats()}")
+            print(f"[i] Timing: {self.timing_stats()}")
+
+    def stats(self) -> str:
+        return f"{self.dedup.stats()}, {self.ahead.stats()}"
+
+    def timing_stats(self) -> str:
+        return f"{self.frame_stats.stats()}; {self.scroll_stats.stats()}"
+
+
 def run(duration_sec: float | None = None) -> None:
-    opus_frames = load_frames(CHARACTER_FRAMES["opus"])
-    if not opus_frames:
+    # Fast start: only what the first frame needs happens before it is pushed.  Glyph/emoji
+    # warm-up and Pilmoji load after it (FrameRenderer.warm_up), the git ticker scan on its task.
+    profile = StartupProfile()
+    profile.mark("imports")
+    sprites = load_sprite_store()
+    if "opus" not in sprites:
         raise RuntimeError("Opus frames not found!")
 
-    sleep_frames = load_frames(SLEEP_FRAMES)
-    if not sleep_frames:
+    sleep_sprite = SLEEP_SPRITE
+    if SLEEP_SPRITE not in sprites:
         print("[!] Sleep frames not found, using opus")
-        sleep_frames = opus_frames
+        sleep_sprite = "opus"
+
+    profile.mark("sprites")
 
     scroll_font = load_font(size=SCROLL_FONT_SIZE)
     ui_font = load_font(size=UI_FONT_SIZE)
     row1_font_for_scroll = load_font(size=ICON_BAR_ROW1_FONT_SIZE)
-    # Use descender-heavy chars for accurate height measurement
-    _probe = Image.new("RGB", (1, 1))
-    _bbox = ImageDraw.Draw(_probe).textbbox((0, 0), "あgyj漢", font=scroll_font)
-    scroll_text_h = _bbox[3] - _bbox[1]
+    renderer = FrameRenderer(sprites, sleep_sprite, scroll_font, ui_font, row1_font_for_scroll)
+    ahead = RenderAhead(renderer)
+    profile.mark("fonts")
 
-    pixoo = None
+    sender = FrameSender(PIXOO_IP)
+    connected = False
     try:
         for _attempt in range(3):
             try:
-                pixoo = Pixoo(PIXOO_IP)
+                sender.connect()
+                connected = True
                 break
             except Exception as e:
                 print(f"[!] Pixoo init failed (attempt {_attempt + 1}/3): {e}")
@@ -627,299 +2897,49 @@ def run(duration_sec: float | None = None) -> None:
                     time.sleep(5)
     except KeyboardInterrupt:
         print("\n[i] Interrupted during init")
+        ahead.close()
         return
-    if pixoo is None:
+    if not connected:
+        ahead.close()
         raise RuntimeError(f"Cannot connect to Pixoo at {PIXOO_IP} after 3 attempts")
-    char_frame_cache: dict[str, List[Image.Image]] = {"opus": opus_frames}
-
-    for name, paths in CHARACTER_FRAMES.items():
-        if name not in char_frame_cache:
-            loaded = load_frames(paths)
-            if loaded:
-                char_frame_cache[name] = loaded
-                print(f"[i] Loaded: {name}")
-
-    # Scroll text state — Git commit ticker (primary), todo fallback
-    default_ticker = get_latest_git_commits()
-    current_ticker = default_ticker
-    _scroll_cache.get_strip(current_ticker, scroll_font)
-    current_ticker_w = _scroll_cache.width
-    last_todo_check_t = time.monotonic()
-
-    anim_frame_idx = 0
-    text_x = DISPLAY_SIZE
-    color_tick = 0
-    display_list: list = []
-    display_idx = 0
-    current_display_char: str | None = None  # Track by name, not index
-    agent_count = 0
-    current_agents: list = []       # Phase 2: full agent list for icon bar
-    current_main_active: bool = False
-    is_sleeping = False
-    last_active_time = time.monotonic()
-    last_pushed_key: tuple | None = None  # Phase 5-C: skip redundant pushes
-
-    worker_scroll_offset = 0   # current scroll offset for worker name (px)
-    current_wn_w = 0           # cached pixel width of current worker name
-    prev_worker_key: tuple | None = None  # (display_idx, agent_id) — detect agent changes
-
-    start = time.monotonic()
-    next_frame_t = start
-    next_scroll_t = start
-    last_char_swap_t = start
-    last_state_check_t = 0.0
+    profile.mark("connect")
+    char_names = [name for name in CHARACTER_FRAMES if name in sprites]
+    for name in char_names:
+        if name != "opus":
+            print(f"[i] Loaded: {name}")
+    print(f"[i] Sprite store: {len(sprites.names())} sets, {sprites.nbytes // 1024} KiB packed ({sprites.source})")
+
+    # Scroll text state — ticker sources (git, then todo) replace the fallback once they have text
+    display = DisplayLoop(renderer, ahead, sender, char_names, default_ticker=FALLBACK_TICKER, profile=profile)
 
     print(f"[i] Connected to Pixoo at {PIXOO_IP}")
-    print(f"[i] Characters: {', '.join(char_frame_cache.keys())}")
+    print(f"[i] Characters: {', '.join(char_names)}")
     print(f"[i] Sleep: after {SLEEP_AFTER_SEC}s idle")
     print(f"[i] Dynamic scroll text: enabled")
+    print(f"[i] Render-ahead: {RENDER_AHEAD_FRAMES} frames")
     print("[i] Press Ctrl+C to stop" if duration_sec is None else f"[i] Running for {duration_sec:.1f}s")
 
     try:
-        while True:
-            # Phase 6: notify mode — skip display updates
-            if is_notify_mode():
-                logger.debug("[notify] mode active — skipping frame")
-                time.sleep(1)
-                continue
-            logger.debug("[notify] mode inactive, proceeding")
-
-            now = time.monotonic()
-            wall_now = time.time()
-
-            if duration_sec is not None and (now - start) >= duration_sec:
-                break
-
-            # Poll state file
-            if now - last_state_check_t >= STATE_POLL_SEC:
-                agents, main_active = read_agent_state()
-                current_agents = agents
-                current_main_active = main_active
-                new_count = len(agents)
-
-                # サブエージェント活動中 → サブエージェントだけ表示（ロブ🦞なし）
-                # アイドル時 → ロブ🦞のみ表示
-                if agents:
-                    new_display_list = []
-                    for a in agents:
-                        char_name = a.get("char", "sonnet")
-                        if char_name not in char_frame_cache:
-                            char_name = "opus"
-                        new_display_list.append({
-                            "char": char_name,
-                            "started": a.get("started"),
-                            "is_main": False,
-                        })
-                else:
-                    new_display_list = [{"char": "opus", "started": None, "is_main": True}]
-
-                if new_count != agent_count:
-                    old_count = agent_count
-                    new_chars = [d["char"] for d in new_display_list]
-                    print(f"[i] Subagents: {new_count} chars={new_chars} display_idx={display_idx}")
-                    # Reset swap timer on 0→N transition to prevent immediate swap
-                    if old_count == 0 and new_count > 0:
-                        last_char_swap_t = now
-                        print(f"[rot] reset-timer: agents 0→{new_count}, swap timer reset")
-                    # All agents gone
-                    if old_count > 0 and new_count == 0:
-                        print(f"[rot] reset: agents gone, fallback to idx 0 (opus)")
-                    # Single agent: log only on 0→1 transition (P1-C fix)
-                    if new_count == 1 and old_count == 0:
-                        print(f"[rot] single-agent: {new_chars[0]} (no rotation needed)")
-                    agent_count = new_count
-
-                # Re-scan git repos periodically for latest commit
-                if now - last_todo_check_t >= GIT_POLL_SEC:
-                    default_ticker = get_latest_git_commits()
-                    last_todo_check_t = now
-
-                # Update scroll text dynamically
-                task_text = get_latest_task_text(agents)
-                if task_text:
-                    new_ticker = task_text
-                elif is_sleeping:
-                    new_ticker = SLEEP_TICKER
-                else:
-                    new_ticker = default_ticker
-
-                if new_ticker != current_ticker:
-                    current_ticker = new_ticker
-                    _scroll_cache.get_strip(current_ticker, scroll_font)
-                    current_ticker_w = _scroll_cache.width
-                    text_x = DISPLAY_SIZE  # reset scroll position
-                    print(f"[i] Ticker: {current_ticker}")
-
-                if new_count > 0 or main_active:
-                    last_active_time = now
-                    if is_sleeping:
-                        is_sleeping = False
-                        wake_reason = "subagents" if new_count > 0 else "main session"
-                        print(f"[i] Woke up! ({wake_reason})")
-
-                # Sleep check — only sleep if both subagents AND main are idle
-                if new_count == 0 and not main_active and (now - last_active_time) >= SLEEP_AFTER_SEC:
-                    if not is_sleeping:
-                        is_sleeping = True
-                        print("[i] Sleep mode")
-
-                # Preserve current character across list rebuilds to prevent
-                # mid-rotation jumps (fixes Grok early-disappear bug).
-                old_chars = [d["char"] for d in display_list]
-                old_char = current_display_char
-                old_is_main = display_list[display_idx]["is_main"] if display_list and display_idx < len(display_list) else True
-                old_display_idx = display_idx
-                display_list = new_display_list
-                new_chars_rebuild = [d["char"] for d in display_list]
-
-                if old_char and display_list:
-                    found_idx = None
-                    # Try to find exact match (same char + same is_main flag)
-                    for i, entry in enumerate(display_list):
-                        if entry["char"] == old_char and entry["is_main"] == old_is_main:
-                            found_idx = i
-                            break
-                    if found_idx is None:
-                        # Fallback: match by char name only
-                        for i, entry in enumerate(display_list):
-                            if entry["char"] == old_char:
-                                found_idx = i
-                                break
-                    if found_idx is not None:
-                        display_idx = found_idx
-                        current_display_char = display_list[display_idx]["char"]  # P1-A fix: sync char name
-                        if old_chars != new_chars_rebuild:
-                            print(f"[rot] list-rebuild: {old_chars} → {new_chars_rebuild} (preserved: {old_char}@{display_idx})")
-                    else:
-                        # Character gone: clamp to nearest valid position instead of resetting to 0
-                        display_idx = min(old_display_idx, len(display_list) - 1) if display_list else 0
-                        current_display_char = display_list[display_idx]["char"] if display_list else "opus"
-                        print(f"[rot] list-rebuild: {old_chars} → {new_chars_rebuild} (gone: {old_char}, fallback idx {display_idx} → {current_display_char})")
-                elif display_idx >= len(display_list):
-                    display_idx = 0
-                last_state_check_t = now
-
-            if agent_count == 0:
-                display_idx = 0
-                current_display_char = "opus"
-
-            if agent_count > 0 and now - last_char_swap_t >= CHARACTER_SWAP_SEC:
-                if len(display_list) <= 1:
-                    # Single agent: just reset timer, no rotation
-                    last_char_swap_t = now
-                else:
-                    old_idx = display_idx
-                    old_char_name = display_list[old_idx]["char"] if old_idx < len(display_list) else "?"
-                    display_idx = (display_idx + 1) % len(display_list)
-                    anim_frame_idx = 0
-                    last_char_swap_t = now
-                    cur = display_list[display_idx]
-                    current_display_char = cur["char"]
-                    print(f"[rot] swap: {old_char_name} → {current_display_char} (idx {old_idx}→{display_idx}/{len(display_list)}, interval={CHARACTER_SWAP_SEC}s)")
-
-            updated = False
-
-            # Worker name scroll: recompute width + reset offset when displayed agent changes
-            _wn_agent = current_agents[display_idx] if (current_agents and display_idx < len(current_agents)) else None
-            _wn_text = strip_emoji(_wn_agent.get("task", _wn_agent.get("id", "")) if _wn_agent else "")
-            _wn_key = (display_idx, _wn_agent.get("id", "") if _wn_agent else "", _wn_text)
-            if _wn_key != prev_worker_key:
-                prev_worker_key = _wn_key
-                worker_scroll_offset = 0
-                current_wn_w = text_bbox_size(row1_font_for_scroll, _wn_text)[0] if _wn_text else 0
-
-            while now >= next_frame_t:
-                if is_sleeping:
-                    anim_frame_idx = (anim_frame_idx + 1) % len(sleep_frames)
-                else:
-                    cur_char = display_list[display_idx]["char"] if display_list else "opus"
-                    frames = char_frame_cache.get(cur_char, opus_frames)
-                    anim_frame_idx = (anim_frame_idx + 1) % len(frames)
-                color_tick += 1
-                next_frame_t += FRAME_INTERVAL_MS / 1000.0
-                updated = True
-
-            while now >= next_scroll_t:
-                text_x -= TEXT_STEP_PX
-                if text_x + current_ticker_w < 0:
-                    text_x = DISPLAY_SIZE
-                worker_scroll_offset = advance_worker_scroll(worker_scroll_offset, current_wn_w, DISPLAY_SIZE - 2)
-                next_scroll_t += SCROLL_SPEED_MS / 1000.0
-                updated = True
-
-            if updated:
-                if is_sleeping:
-                    bg = sleep_frames[anim_frame_idx % len(sleep_frames)]
-                    is_main_flag = True
-                    elapsed = None
-                else:
-                    cur_entry = display_list[display_idx] if display_list else {"char": "opus", "started": None, "is_main": True}
-                    cur_char = cur_entry["char"]
-                    frames = char_frame_cache.get(cur_char, opus_frames)
-                    bg = frames[anim_frame_idx % len(frames)]
-                    is_main_flag = cur_entry["is_main"]
-                    elapsed = None
-                    if not is_main_flag and cur_entry.get("started"):
-                        elapsed = wall_now - cur_entry["started"]
-
-                # Phase 5-A: find the current agent dict for icon bar
-                cur_agent = None
-                if not is_sleeping and not is_main_flag and current_agents:
-                    # Match by display_idx position in agent list
-                    if display_idx < len(current_agents):
-                        cur_agent = current_agents[display_idx]
-
-                # Phase 5-C: dirty-frame detection — skip push if visual state unchanged
-                # Key: (anim_frame, scroll_x, display_char, color_tick, timer_min, worker_offset)
-                timer_min = int(elapsed) // 60 if elapsed is not None else -1
-                cur_char_name = display_list[display_idx]["char"] if (not is_sleeping and display_list) else "_sleep"
-                push_key = (anim_frame_idx, text_x, cur_char_name, color_tick, timer_min, is_sleeping, worker_scroll_offset)
-                if push_key == last_pushed_key:
-                    pass  # skip redundant push
-                else:
-                    composed = compose_frame(
-                        bg_frame=bg,
-                        scroll_font=scroll_font,
-                        ui_font=ui_font,
-                        scroll_text=current_ticker,
-                        scroll_x=text_x,
-                        agents=current_agents,
-                        main_active=current_main_active,
-                        elapsed_sec=elapsed,
-                        color_tick=color_tick,
-                        is_main=is_main_flag,
-                        scroll_text_h=scroll_text_h,
-                        current_agent=cur_agent,
-                        worker_scroll_offset=worker_scroll_offset,
-                    )
-                    try:
-                        logger.debug("[push] frame=%s agent=%s", anim_frame_idx, cur_char_name)
-                        pixoo.draw_image(composed)
-                        pixoo.push()
-                        logger.debug("[push] OK")
-                        last_pushed_key = push_key
-                    except Exception as e:
-                        print(f"[!] Pixoo send failed: {e}")
-                        last_pushed_key = None  # force retry next frame
-                        time.sleep(5)  # Back off before retry
-                        try:
-                            pixoo = Pixoo(PIXOO_IP)
-                            print("[i] Pixoo reconnect attempted")
-                        except Exception:
-                            print("[!] Pixoo reconnect failed, will retry next frame")
-
-            # Sleep until next event (frame or scroll)
-            # Phase 5-C: cap at 50ms (was 20ms) — reduces busy-loop overhead
-            next_event = min(next_frame_t, next_scroll_t)
-            wait = max(0.001, next_event - time.monotonic())
-            time.sleep(min(wait, 0.050))
-
+        asyncio.run(display.run(duration_sec))
     except KeyboardInterrupt:
         print("\n[i] Stopped")
+    finally:
+        ahead.close()
+        sender.close()
+    print(f"[i] Frames: {display.stats()}")
+    print(f"[i] Timing: {display.timing_stats()}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Pixoo-64 lobster status display v6")
     parser.add_argument("--duration", type=float, default=None)
+    parser.add_argument(
+        "--build-sprite-atlas", metavar="SRC_DIR", nargs="?", type=Path, const=SPRITE_SOURCE_DIR,
+        help=f"pack sprites from SRC_DIR into {SPRITE_ATLAS_FILE} and exit",
+    )
     args = parser.parse_args()
+    if args.build_sprite_atlas is not None:
+        store = build_sprite_atlas(args.build_sprite_atlas)
+        print(f"[i] Sprite atlas: {', '.join(store.names())} → {SPRITE_ATLAS_FILE} ({store.nbytes // 1024} KiB)")
+        sys.exit(0)
     run(duration_sec=args.duration)
@@ -9,36 +9,57 @@ Pixoo-64 ディスプレイ用の JSON ファイルに書き出す。
 追加キー: role, status, scroll_text
 
 Phase 3: capture-pane で出力取得 + ANSI除去 + diff判定 (active/waiting/error)
+list-panes 1回で全 pane の activity を取得し、変化した pane だけ capture-pane する
+control mode (tmux -C): %output / %window-* 通知を購読し、イベント時だけ JSON を更新
+（control mode が使えない環境では上記ポーリングにフォールバック）
 
 Usage: python3 pixoo_tmux_sync.py  (runs as daemon)
 """
 
+import codecs
+import hashlib
 import json
 import os
 import re
+import select
 import subprocess
 import tempfile
 import time
+import unicodedata
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import NamedTuple
 
 # --- Config ---
 TMUX_SESSION = "shared"
 STATE_FILE = Path("/tmp/pixoo-agents.json")
 CONFIG_FILE = Path("/tmp/pixoo-tmux-config.json")
-POLL_SEC = 3.0
+POLL_SEC = 3.0  # tmux 不在時の再試行間隔 / 新しい window の初回間隔
+POLL_FAST_SEC = 1.0  # 出力が動いている window の polling 間隔
+POLL_MAX_SEC = 15.0  # idle / waiting window はここまで指数的に capture 間隔を延ばす
+POLL_PROBE_SEC = 2.0  # list-panes（全 window で1回）の最大間隔 — 新しい window / activity はこれ以内に拾う
+CAPTURE_DEADLINE_SEC = 2.0  # polling fallback: capture-pane phase waits at most this long per cycle
+CAPTURE_WORKERS = 8  # parallel capture-pane subprocesses
 WAITING_THRESHOLD_SEC = 30.0  # output unchanged for this long → "waiting"
-
-# ANSI escape sequence pattern (covers CSI, OSC, and other common sequences)
-ANSI_ESCAPE_RE = re.compile(
-    r"\x1b\[[0-9;]*[a-zA-Z]"    # CSI sequences: \e[...m, \e[...H, etc.
-    r"|\x1b\][^\x07]*\x07"      # OSC sequences: \e]...\a
-    r"|\x1b\[[\d;]*[@-~]"       # remaining CSI
-    r"|\x1b[()][A-Z0-9]"        # character set selection
-)
-# Control characters except \n (0x0a) and \t (0x09) — keep those for structure
-CONTROL_CHAR_RE = re.compile(r"[\x00-\x08\x0b-\x1f]")
+CAPTURE_TAIL_ROWS = 20  # capture-pane は カーソル行の N 行上〜画面下端 だけ取得
+DIFF_TAIL_LINES = 5  # diff 状態として digest と一緒に残す末尾行数
+CONTROL_MODE = True  # tmux -C で push 型更新（False = capture-pane ポーリングのみ）
+CONTROL_PUBLISH_MIN_SEC = 0.5  # %output が連続しても JSON 書き込みはこの間隔まで
+CONTROL_HEARTBEAT_SEC = 60.0  # 変化がなくても last_seen を更新（display の AGENT_TTL_SEC より十分短く）
+CONTROL_RETRY_MAX_SEC = 300.0  # attach 失敗時は POLL_SEC から倍々で再試行、上限この間隔（その間は polling）
+CONTROL_FLAGS_MIN_TMUX = (3, 2)  # attach-session -f read-only,ignore-size はこれ以降（それ以前は -r）
+PANE_TAIL_LINES = 20  # control mode で画面外に流れた行を pane ごとに保持する数
+INPUT_BOX_FOOTER_LINES = 3  # TUI 入力欄の下に許すヒント行数（extract_scroll_text）
+
+# Control characters except \n (0x0a) and \t (0x09) — plain text has none of these
+CONTROL_CHAR_RE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+# tmux control mode escapes bytes < 0x20 and backslash in %output as \\ooo
+CONTROL_OCTAL_RE = re.compile(rb"\\([0-7]{3})")
 # Error detection in captured output
 ERROR_PATTERN_RE = re.compile(r"\b(error|Error|ERROR|FAILED|Traceback)\b")
+ERROR_DECAY_SEC = 60.0  # 新しいエラー行が出ないまま この秒数で error を解除
 
 # Role → char mapping (for Pixoo display sprite selection)
 # Available sprites: opus, sonnet, haiku, gemini, kusomegane, codex, grok
@@ -55,25 +76,403 @@ ROLE_TO_CHAR: dict[str, str] = {
 IDLE_PATTERN = re.compile(r"^worker-\d+$")
 
 
+# --- Terminal screen model ---
+
+# C0 controls + ESC + DEL: everything else in pane output is printable text
+TERM_CONTROL_RE = re.compile(r"[\x00-\x1f\x7f]")
+TERM_CSI_RE = re.compile(r"\[([0-?]*)[ -/]*([@-~])")
+TERM_CSI_PARTIAL_RE = re.compile(r"\[[0-?]*[ -/]*")
+# 全角文字（CJK・絵文字など）と結合文字 — これを含む run だけ 1 文字ずつ幅を見る
+TERM_WIDE_RE = re.compile(
+    "[\u0300-\u036f\u1100-\u115f\u2e80-\u303e\u3041-\ua4cf\uac00-\ud7a3"
+    "\uf900-\ufaff\ufe10-\ufe6f\uff00-\uff60\uffe0-\uffe6\U0001f000-\U0001faff"
+    "\U00020000-\U0003fffd]"
+)
+# 罫線・ブロック要素・点字スピナーだけの行はスクロール表示に使わない
+DECORATION_CHARS = " \t─-▟⠀-⣿"
+DECORATION_EDGE_RE = re.compile(f"^[{DECORATION_CHARS}]+|[{DECORATION_CHARS}]+$")
+
+
+def _cells(run: str) -> list[str]:
+    """Screen cells for a run of printable text — wide (CJK) chars take two."""
+    if run.isascii() or not TERM_WIDE_RE.search(run):
+        return list(run)  # 罫線・記号だけの行はここで済む
+    cells: list[str] = []
+    for ch in run:
+        if unicodedata.combining(ch) and cells:
+            cells[-1] += ch
+            continue
+        cells.append(ch)
+        if unicodedata.east_asian_width(ch) in ("W", "F"):
+            cells.append("")  # 右半分（join で消える）
+    return cells
+
+
+class TermScreen:
+    """Minimal VT100/xterm screen fed incrementally with pane output.
+
+    Keeps the visible grid plus the last `history` lines scrolled off the
+    top, which is what cursor-movement redraws (Claude Code / Codex TUIs)
+    need to come out as the lines actually on screen.  Text between control
+    characters is written in bulk, so plain output costs one regex search
+    per run.  Colours and modes that do not move text are ignored.
+
+    cooked=True is for text that is already a rendered screen (capture-pane
+    output): "\\n" also returns the carriage and tabs are kept as-is.
+    """
+
+    def __init__(self, width: int = 80, height: int = 24,
+                 history: int = PANE_TAIL_LINES, cooked: bool = False):
+        self.width = max(1, width)
+        self.height = max(1, height)
+        self.cooked = cooked
+        self.rows = [self._blank() for _ in range(self.height)]
+        self.history: deque[str] = deque(maxlen=history)
+        self.x = 0  # == width: 右端に書いた直後（次の文字で折り返す）
+        self.y = 0
+        self.top, self.bottom = 0, self.height - 1  # scroll region (DECSTBM)
+        self._saved = (0, 0)
+        self._main: tuple | None = None  # alt-screen 中は main screen の退避先
+        self._pending = ""  # chunk 境界で切れた escape sequence
+        self._text: str | None = None  # text() cache
+
+    def _blank(self) -> list[str]:
+        return [" "] * self.width
+
+    # --- input ---
+
+    def feed(self, text: str) -> None:
+        if self._pending:
+            text, self._pending = self._pending + text, ""
+        self._text = None
+        i, n = 0, len(text)
+        while i < n:
+            m = TERM_CONTROL_RE.search(text, i)
+            j = m.start() if m else n
+            if j > i:
+                self._put(text[i:j])
+            if m is None:
+                break
+            if text[j] == "\x1b":
+                end = self._escape(text, j)
+                if end < 0:
+                    self._pending = text[j:j + 256]  # 異常に長い未完了列は捨てる
+                    break
+                i = end
+            else:
+                self._control(text[j])
+                i = j + 1
+
+    def _put(self, run: str) -> None:
+        cells = _cells(run)
+        while cells:
+            if self.x >= self.width:
+                if self.cooked:
+                    self._grow_width(self.x + len(cells))
+                else:
+                    self.x = 0
+                    self._linefeed()
+            part = cells[:self.width - self.x]
+            self.rows[self.y][self.x:self.x + len(part)] = part
+            self.x += len(part)
+            cells = cells[len(part):]
+
+    def _grow_width(self, width: int) -> None:
+        for row in self.rows:
+            row.extend(" " * (width - self.width))
+        self.width = width
+
+    def _control(self, ch: str) -> None:
+        if ch == "\r":
+            self.x = 0
+        elif ch in "\n\v\f":
+            if self.cooked:
+                self.x = 0
+            self._linefeed()
+        elif ch == "\b":
+            self.x = max(0, min(self.x, self.width - 1) - 1)
+        elif ch == "\t":
+            if self.cooked:
+                self._put("\t")
+            else:
+                self.x = min(self.width - 1, (self.x // 8 + 1) * 8)
+        # BEL / SO / SI / DEL などは画面を変えない
+
+    def _escape(self, text: str, j: int) -> int:
+        """Handle the sequence at text[j] (ESC); index after it, -1 if incomplete."""
+        if j + 1 >= len(text):
+            return -1
+        kind = text[j + 1]
+        if kind == "[":
+            m = TERM_CSI_RE.match(text, j + 1)
+            if m is None:
+                if TERM_CSI_PARTIAL_RE.fullmatch(text, j + 1):
+                    return -1
+                return j + 2  # 壊れた CSI は ESC [ だけ捨てる
+            self._csi(m.group(1), m.group(2))
+            return m.end()
+        if kind in "]PX^_":
+            # OSC / DCS / SOS / PM / APC — BEL or ST (ESC \) まで読み飛ばす
+            ends = [k for k in (text.find("\x07", j + 2), text.find("\x1b\\", j + 2)) if k >= 0]
+            if not ends:
+                return -1
+            end = min(ends)
+            return end + (1 if text[end] == "\x07" else 2)
+        if kind in "()*+#%":
+            return j + 3 if j + 2 < len(text) else -1
+        if kind == "7":
+            self._saved = (self.x, self.y)
+        elif kind == "8":
+            self.x, self.y = self._saved
+        elif kind == "D":
+            self._linefeed()
+        elif kind == "E":
+            self.x = 0
+            self._linefeed()
+        elif kind == "M":
+            self._reverse_index()
+        elif kind == "c":
+            self._erase_rows(0, self.height)
+            self.x = self.y = 0
+            self.top, self.bottom = 0, self.height - 1
+        return j + 2
+
+    def _csi(self, params: str, final: str) -> None:
+        private = params.startswith("?")
+        args = [int(p) if p.isdigit() else 0 for p in params.lstrip("?<=>").split(";")]
+        n = max(1, args[0])
+        x = min(self.x, self.width - 1)
+        if private:
+            if final in "hl" and args[0] in (47, 1047, 1049):
+                self._alt_screen(final == "h")
+            return
+        if final == "A":
+            self.x, self.y = x, max(0, self.y - n)
+        elif final in "Be":
+            self.x, self.y = x, min(self.height - 1, self.y + n)
+        elif final in "Ca":
+            self.x = min(self.width - 1, x + n)
+        elif final == "D":
+            self.x = max(0, x - n)
+        elif final == "E":
+            self.x, self.y = 0, min(self.height - 1, self.y + n)
+        elif final == "F":
+            self.x, self.y = 0, max(0, self.y - n)
+        elif final in "G`":
+            self.x = min(self.width - 1, n - 1)
+        elif final in "Hf":
+            self.y = min(self.height - 1, n - 1)
+            self.x = min(self.width - 1, max(1, args[1] if len(args) > 1 else 1) - 1)
+        elif final == "d":
+            self.x, self.y = x, min(self.height - 1, n - 1)
+        elif final == "J":
+            if args[0] == 0:
+                self.rows[self.y][x:] = [" "] * (self.width - x)
+                self._erase_rows(self.y + 1, self.height)
+            elif args[0] == 1:
+                self.rows[self.y][:x + 1] = [" "] * (x + 1)
+                self._erase_rows(0, self.y)
+            else:
+                self._erase_rows(0, self.height)
+                if args[0] == 3:
+                    self.history.clear()
+        elif final == "K":
+            row = self.rows[self.y]
+            if args[0] == 0:
+                row[x:] = [" "] * (self.width - x)
+            elif args[0] == 1:
+                row[:x + 1] = [" "] * (x + 1)
+            else:
+                row[:] = self._blank()
+        elif final == "L":
+            if self.top <= self.y <= self.bottom:
+                self._scroll_down(self.y, n)
+        elif final == "M":
+            if self.top <= self.y <= self.bottom:
+                self._scroll_up(self.y, n, keep=False)
+        elif final == "@":
+            row = self.rows[self.y]
+            n = min(n, self.width - x)  # ESC[999999999@ で巨大リストを作らない
+            row[x:x] = [" "] * n
+            del row[self.width:]
+        elif final == "P":
+            row = self.rows[self.y]
+            del row[x:x + n]
+            row.extend(" " * (self.width - len(row)))
+        elif final == "X":
+            end = min(self.width, x + n)
+            self.rows[self.y][x:end] = [" "] * (end - x)
+        elif final == "S":
+            self._scroll_up(self.top, n, keep=True)
+        elif final == "T":
+            self._scroll_down(self.top, n)
+        elif final == "r":
+            top = max(1, args[0]) - 1
+            bottom = (args[1] if len(args) > 1 and args[1] else self.height) - 1
+            if top < bottom < self.height:
+                self.top, self.bottom = top, bottom
+                self.x = self.y = 0
+        elif final == "s":
+            self._saved = (self.x, self.y)
+        elif final == "u":
+            self.x, self.y = self._saved
+        # m (SGR) などは表示文字に影響しない
+
+    # --- scrolling ---
+
+    def _linefeed(self) -> None:
+        if self.cooked and self.y == self.height - 1:
+            self.rows.append(self._blank())  # 展開済みテキストは行数ぶん伸ばす
+            self.height += 1
+            self.bottom = self.height - 1
+            self.y += 1
+        elif self.y == self.bottom:
+            self._scroll_up(self.top, 1, keep=True)
+        elif self.y < self.height - 1:
+            self.y += 1
+
+    def _reverse_index(self) -> None:
+        if self.y == self.top:
+            self._scroll_down(self.top, 1)
+        elif self.y > 0:
+            self.y -= 1
+
+    def _scroll_up(self, start: int, n: int, keep: bool) -> None:
+        """Lines start..bottom move up n; the top ones go to history when they leave the screen."""
+        n = min(n, self.bottom - start + 1)
+        gone = self.rows[start:start + n]
+        del self.rows[start:start + n]
+        self.rows[self.bottom - n + 1:self.bottom - n + 1] = [self._blank() for _ in range(n)]
+        if keep and start == 0 and self._main is None:
+            self.history.extend("".join(row).rstrip() for row in gone)
+
+    def _scroll_down(self, start: int, n: int) -> None:
+        n = min(n, self.bottom - start + 1)
+        del self.rows[self.bottom - n + 1:self.bottom + 1]
+        self.rows[start:start] = [self._blank() for _ in range(n)]
+
+    def _erase_rows(self, start: int, end: int) -> None:
+        for i in range(start, end):
+            self.rows[i] = self._blank()
+
+    def _alt_screen(self, enter: bool) -> None:
+        if enter and self._main is None:
+            self._main = (self.rows, self.x, self.y)
+            self.rows = [self._blank() for _ in range(self.height)]
+        elif not enter and self._main is not None:
+            rows, self.x, self.y = self._main
+            self._main = None
+            self.rows = rows
+
+    # --- output ---
+
+    def resize(self, width: int, height: int) -> None:
+        """Follow a pane resize — rows that no longer fit go to history.
+
+        During alt-screen the saved main screen is resized too, so leaving
+        the alt screen restores rows of the current size.
+        """
+        self._text = None
+        width, height = max(1, width), max(1, height)
+        if self._main is not None:
+            self._main = self._fit(*self._main, width, height, keep=True)
+        self.rows, self.x, self.y = self._fit(self.rows, self.x, self.y, width, height,
+                                              keep=self._main is None)
+        self.width, self.height = width, height
+        self.top, self.bottom = 0, height - 1
+        self._saved = (min(self._saved[0], width), min(self._saved[1], height - 1))
+
+    def _fit(self, rows: list, x: int, y: int, width: int, height: int,
+             keep: bool) -> tuple[list, int, int]:
+        """rows cut/padded to width × height; rows dropped above the cursor go to history if keep."""
+        rows = [(row + [" "] * width)[:width] for row in rows]
+        while len(rows) > height:
+            if y > 0:
+                gone = rows.pop(0)
+                if keep:
+                    self.history.append("".join(gone).rstrip())
+                y -= 1
+            else:
+                rows.pop()
+        rows.extend([" "] * width for _ in range(height - len(rows)))
+        return rows, min(x, width), min(y, height - 1)
+
+    def load(self, captured: str, cursor: tuple[int, int]) -> None:
+        """Start from a capture-pane snapshot of the visible screen, cursor at (x, y)."""
+        self._text = None
+        for i, line in enumerate(captured.split("\n")[:self.height]):
+            self.rows[i] = (_cells(line) + self._blank())[:self.width]
+        self.x = min(cursor[0], self.width)
+        self.y = min(cursor[1], self.height - 1)
+
+    def lines(self) -> list[str]:
+        """History + visible rows, right-trimmed, trailing blank rows dropped."""
+        rows = ["".join(row).rstrip() for row in self.rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return [*self.history, *rows]
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self.lines())
+        return self._text
+
+    @classmethod
+    def render(cls, raw: str) -> str:
+        """Apply the control sequences in already-rendered text (cooked mode)."""
+        screen = cls(width=1, height=1, history=0, cooked=True)
+        screen.feed(raw)
+        return "\n".join("".join(row).rstrip(" ") for row in screen.rows)
+
+
+def meaningful_line(line: str) -> str:
+    """Line without box-drawing / spinner decoration; "" if nothing readable is left."""
+    text = DECORATION_EDGE_RE.sub("", line)
+    return text if any(ch.isalnum() for ch in text) else ""
+
+
 def sanitize_output(raw: str) -> str:
     """Remove ANSI escape sequences and control characters from tmux output.
 
-    Preserves newlines for line-based processing.
+    Preserves newlines and tabs for line-based processing.  Plain
+    capture-pane text (the common case) is returned after a single scan;
+    anything else goes through TermScreen so \\r and cursor moves land
+    where a terminal would put them.
+    """
+    if not CONTROL_CHAR_RE.search(raw):
+        return raw
+    return TermScreen.render(raw)
+
+
+def capture_range(cursor: str | None) -> list[str]:
+    """capture-pane -S/-E args: CAPTURE_TAIL_ROWS above the cursor to the bottom.
+
+    Output lands at (or just above) the cursor; rows further up are history
+    the status no longer depends on.  Without a cursor ("x,y" from
+    list-panes) the whole visible pane is captured.
     """
-    text = ANSI_ESCAPE_RE.sub("", raw)
-    text = CONTROL_CHAR_RE.sub("", text)
-    return text
+    try:
+        cursor_y = int(cursor.split(",")[1])
+    except (AttributeError, IndexError, ValueError):
+        return []
+    return ["-S", str(cursor_y - CAPTURE_TAIL_ROWS), "-E", "-"]
 
 
-def capture_pane(window_index: int) -> str | None:
+def capture_pane(
+    window_index: int, pane_id: str | None = None, cursor: str | None = None,
+) -> str | None:
     """Capture tmux pane 0 output for a given window.
 
+    pane_id (e.g. "%3", from get_tmux_windows) targets the pane directly;
+    without it the window's active pane is captured.  cursor bounds the
+    captured rows (see capture_range).
+
     Returns sanitized text, or None on failure / alt-screen (empty).
     """
+    target = pane_id or f"{TMUX_SESSION}:{window_index}"
     try:
         result = subprocess.run(
-            ["tmux", "capture-pane", "-t",
-             f"{TMUX_SESSION}:{window_index}", "-p"],
+            ["tmux", "capture-pane", "-t", target, "-p", *capture_range(cursor)],
             capture_output=True,
             text=True,
             timeout=5,
@@ -88,25 +487,147 @@ def capture_pane(window_index: int) -> str | None:
         return None
 
 
+# capture-pane を並列実行（1つの tmux 呼び出しが固まってもサイクル全体は止めない）
+_capture_pool = ThreadPoolExecutor(max_workers=CAPTURE_WORKERS, thread_name_prefix="capture")
+
+
+def drop_input_box(lines: list[str]) -> list[str]:
+    """Cut a TUI input box (╭…╰ at the bottom) and the hint lines below it.
+
+    Claude Code style prompts end the screen with an empty input frame and
+    "? for shortcuts"-like hints; the status worth scrolling is above it.
+    """
+    for b in range(len(lines) - 1, max(-1, len(lines) - 2 - INPUT_BOX_FOOTER_LINES), -1):
+        if lines[b].lstrip().startswith("╰"):
+            for t in range(b - 1, -1, -1):
+                if lines[t].lstrip().startswith("╭"):
+                    return lines[:t]
+            break
+    return lines
+
+
 def extract_scroll_text(captured: str | None) -> str:
-    """Extract the last meaningful line from captured output for scroll display."""
+    """Extract the last meaningful line from captured output for scroll display.
+
+    Frame / spinner-only lines and a bottom input box are skipped; if nothing
+    readable is left the last non-empty line is used as before.
+    """
     if not captured:
         return ""
     lines = [line for line in captured.split("\n") if line.strip()]
     if not lines:
         return ""
-    last_line = lines[-1].strip()
+    candidates = (meaningful_line(line) for line in reversed(drop_input_box(lines)))
+    last_line = next((line for line in candidates if line), lines[-1]).strip()
     if len(last_line) > 80:
         last_line = last_line[:77] + "..."
     return last_line
 
 
+class ErrorRules(NamedTuple):
+    """How error status is detected — built from config by error_rules()."""
+
+    matcher: re.Pattern  # all patterns alternated into one regex
+    decay: float  # seconds an error stays without a new error line
+
+
+DEFAULT_ERROR_RULES = ErrorRules(ERROR_PATTERN_RE, ERROR_DECAY_SEC)
+
+
+@lru_cache(maxsize=8)
+def compile_error_patterns(extra: tuple[str, ...]) -> re.Pattern:
+    """ERROR_PATTERN_RE plus config patterns as one compiled alternation."""
+    patterns = [ERROR_PATTERN_RE.pattern]
+    for pattern in extra:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            print(f"[!] Ignoring error_patterns entry {pattern!r}: {e}")
+            continue
+        patterns.append(pattern)
+    if len(patterns) == 1:
+        return ERROR_PATTERN_RE
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+def error_rules(config: dict) -> ErrorRules:
+    """ErrorRules from the optional error_patterns / error_decay_sec config keys."""
+    extra = config.get("error_patterns")
+    if not isinstance(extra, list):
+        extra = []
+    decay = config.get("error_decay_sec", ERROR_DECAY_SEC)
+    if isinstance(decay, bool) or not isinstance(decay, (int, float)) or decay <= 0:
+        decay = ERROR_DECAY_SEC
+    return ErrorRules(
+        compile_error_patterns(tuple(str(p) for p in extra)),
+        float(decay),
+    )
+
+
+class OutputDigest(NamedTuple):
+    """Per-window diff state — constant size however large the capture."""
+
+    digest: bytes  # blake2b of the whole capture (change detection stays exact)
+    tail: tuple[str, ...]  # last DIFF_TAIL_LINES non-empty lines
+    error_at: float | None = None  # when an error line last appeared in new output
+    error_line: str = ""  # that line — error clears as soon as it leaves the screen
+
+
+def output_digest(captured: str) -> OutputDigest:
+    lines = [line for line in captured.split("\n") if line.strip()]
+    return OutputDigest(
+        hashlib.blake2b(captured.encode("utf-8", "replace"), digest_size=16).digest(),
+        tuple(lines[-DIFF_TAIL_LINES:]),
+    )
+
+
+def new_lines(prev_tail: tuple[str, ...], lines: list[str]) -> list[str]:
+    """Lines below where the previous tail ends in `lines` (all of them if not found).
+
+    The whole previous tail is matched as a block from the bottom; if the
+    last lines were rewritten in place (spinner, prompt) it is shortened
+    from the end until it matches.
+    """
+    for keep in range(len(prev_tail), 0, -1):
+        anchor = list(prev_tail[:keep])
+        for end in range(len(lines), keep - 1, -1):
+            if lines[end - keep:end] == anchor:
+                return lines[end:]
+    return lines
+
+
+def observe_output(
+    captured: str,
+    prev: OutputDigest | None,
+    now: float,
+    rules: ErrorRules = DEFAULT_ERROR_RULES,
+) -> OutputDigest:
+    """Diff state for `captured`; only lines new since `prev` are searched for errors."""
+    current = output_digest(captured)
+    if prev is not None and current.digest == prev.digest:
+        return prev
+    lines = [line for line in captured.split("\n") if line.strip()]
+    error_at, error_line = (prev.error_at, prev.error_line) if prev else (None, "")
+    if error_line and error_line not in lines:
+        error_at, error_line = None, ""  # エラー行が画面から消えた
+    for line in reversed(new_lines(prev.tail if prev else (), lines)):
+        if rules.matcher.search(line):
+            error_at, error_line = now, line
+            break
+    return current._replace(error_at=error_at, error_line=error_line)
+
+
+def has_error(state: OutputDigest | None, now: float, rules: ErrorRules = DEFAULT_ERROR_RULES) -> bool:
+    return state is not None and state.error_at is not None and now - state.error_at < rules.decay
+
+
 def determine_status(
     captured: str | None,
     window_name: str,
-    last_outputs: dict[str, str],
+    last_outputs: dict[str, OutputDigest],
     last_change_times: dict[str, float],
     now: float,
+    rules: ErrorRules = DEFAULT_ERROR_RULES,
 ) -> str:
     """Determine agent status by comparing capture-pane output with previous.
 
@@ -116,6 +637,9 @@ def determine_status(
     last_change_times reflects actual output changes, not mere re-detection
     of a static error message.  This prevents the flicker cycle:
     waiting → error → active → waiting.
+
+    Errors are searched only in lines new since the last observation; an
+    error lasts rules.decay seconds, or until its line leaves the screen.
     """
     if captured is None:
         # Alt-screen or capture failed → waiting
@@ -123,13 +647,14 @@ def determine_status(
 
     # --- Diff tracking (always, before error check) ---
     prev = last_outputs.get(window_name)
-    output_changed = prev is None or captured != prev
+    current = observe_output(captured, prev, now, rules)
+    output_changed = prev is None or current.digest != prev.digest
     if output_changed:
-        last_outputs[window_name] = captured
+        last_outputs[window_name] = current
         last_change_times[window_name] = now
 
     # --- Error detection ---
-    if ERROR_PATTERN_RE.search(captured):
+    if has_error(current, now, rules):
         return "error"
 
     # --- First observation ---
@@ -153,6 +678,8 @@ def load_config() -> dict:
 
     Supports:
         {"pl_window": "ebay-ph4-lead"}  — force a specific window as PL
+        {"error_patterns": ["panic:", "npm ERR!"]}  — extra error regexes
+        {"error_decay_sec": 120}  — how long an error stays without a new one
 
     Security: skips the file if it is not owned by the current user,
     preventing a local privilege escalation via /tmp symlink attacks.
@@ -224,18 +751,37 @@ def classify_window(window_name: str) -> tuple[str, bool]:
     return "DEV", False
 
 
+# list-panes の出力フォーマット（tab区切り）
+# window_activity は秒単位の最終出力時刻、history_size はスクロールバック行数。
+# どちらも tmux 側で更新されるので、capture-pane せずに「変化したか」が分かる。
+PANE_FORMAT = "\t".join([
+    "#{window_index}",
+    "#{window_name}",
+    "#{pane_pid}",
+    "#{pane_index}",
+    "#{pane_id}",
+    "#{window_activity}",
+    "#{history_size}",
+    "#{cursor_x},#{cursor_y}",
+])
+
+
 def get_tmux_windows() -> list[dict] | None:
-    """Get tmux window list from the shared session.
+    """Get tmux window list (with pane 0 activity) from the shared session.
+
+    One `list-panes -s` call covers every window; only the lowest-index
+    pane of each window is kept (design doc: 多ペインは pane 0 のみ対象).
 
     Returns:
-        List of dicts with keys: window_index, window_name, pane_pid.
+        List of dicts with keys: window_index, window_name, pane_pid,
+        pane_id, activity, history_size, cursor.
         None if tmux or the session is unavailable.
     """
     try:
         result = subprocess.run(
             [
-                "tmux", "list-windows", "-t", TMUX_SESSION,
-                "-F", "#{window_index}\t#{window_name}\t#{pane_pid}",
+                "tmux", "list-panes", "-s", "-t", TMUX_SESSION,
+                "-F", PANE_FORMAT,
             ],
             capture_output=True,
             text=True,
@@ -244,29 +790,230 @@ def get_tmux_windows() -> list[dict] | None:
         if result.returncode != 0:
             return None
 
-        windows: list[dict] = []
+        windows: dict[int, tuple[int, dict]] = {}
         for line in result.stdout.strip().split("\n"):
             line = line.strip()
             if not line:
                 continue
             parts = line.split("\t")
-            if len(parts) < 3:
+            if len(parts) < 8:
                 continue
             try:
                 idx = int(parts[0])
                 pid = int(parts[2])
+                pane_index = int(parts[3])
+                activity = int(parts[5] or 0)
+                history_size = int(parts[6] or 0)
             except ValueError:
                 continue
-            windows.append({
+            if idx in windows and windows[idx][0] <= pane_index:
+                continue
+            windows[idx] = (pane_index, {
                 "window_index": idx,
                 "window_name": parts[1],
                 "pane_pid": pid,
+                "pane_id": parts[4],
+                "activity": activity,
+                "history_size": history_size,
+                "cursor": parts[7],
             })
-        return windows
+        return [w for _, w in sorted(windows.values(), key=lambda e: e[1]["window_index"])]
     except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
         return None
 
 
+def pane_signature(window: dict) -> tuple:
+    """What list-panes tells us about a pane's content without capturing it."""
+    return (
+        window.get("pane_id"),
+        window.get("activity"),
+        window.get("history_size"),
+        window.get("cursor"),
+    )
+
+
+def pane_changed(window: dict, last_capture: dict | None) -> bool:
+    """True if the pane may show something new since `last_capture`.
+
+    last_capture is the entry enrich_with_capture keeps per window
+    (signature / at / text / status / pending).
+    """
+    if last_capture is None:
+        return True
+    if not window.get("activity"):
+        return True  # tmux が activity を返さない → 毎回 capture（旧挙動）
+    if pane_signature(window) != last_capture["signature"]:
+        return True
+    # window_activity は秒精度: capture と同じ秒に出た出力は signature に現れない
+    return window["activity"] >= int(last_capture["at"])
+
+
+def capture_due(
+    window: dict,
+    last_capture: dict,
+    plan: tuple[float, float] | None,
+    now: float,
+) -> bool:
+    """Whether a pane that may have moved is captured this cycle under its cadence.
+
+    plan is the window's (interval, due) from plan_next_poll.  Due windows
+    are captured.  Before that, a signature change on a backed-off window is
+    tmux's activity signal and snaps it back right away; fast windows and
+    panes tmux reports no activity for wait for their turn.
+    """
+    if plan is None or now >= plan[1]:
+        return True
+    return (
+        plan[0] > POLL_FAST_SEC
+        and bool(window.get("activity"))
+        and pane_signature(window) != last_capture["signature"]
+    )
+
+
+def enrich_with_capture(
+    agents: list[dict],
+    windows: list[dict],
+    captures: dict[str, dict],
+    last_outputs: dict[str, OutputDigest],
+    last_change_times: dict[str, float],
+    now: float,
+    deadline: float = CAPTURE_DEADLINE_SEC,
+    rules: ErrorRules = DEFAULT_ERROR_RULES,
+    cadence: dict[str, tuple[float, float]] | None = None,
+) -> int:
+    """Fill in status / scroll_text, capturing only panes whose activity moved.
+
+    With `cadence` (see plan_next_poll) a moved pane is also only captured
+    when capture_due() says so.
+    Captures run in parallel on _capture_pool and the whole phase waits at
+    most `deadline` seconds.  A window whose capture misses it keeps the
+    status it had last cycle (a hung capture is not re-issued until it
+    returns).  Unchanged panes reuse their previous capture so
+    determine_status still sees "no diff" and can age them into waiting.
+    Returns the number of captures that made it in time.
+    """
+    by_idx = {w["window_index"]: w for w in windows}
+
+    # --- Fan out: one capture-pane per moved pane, all at once ---
+    jobs: dict[str, tuple[dict, Future]] = {}
+    for agent in agents:
+        idx = agent.get("window_index")
+        if idx is None:
+            continue
+        # Use window_index as diff key (unique, avoids same-name collision)
+        diff_key = str(idx)
+        window = by_idx.get(idx, {})
+        entry = captures.get(diff_key)
+        if entry is not None and entry["pending"] is not None:
+            if not entry["pending"].done():
+                continue  # 前サイクルの capture がまだ戻らない — 二重に投げない
+            entry["pending"] = None
+        if not pane_changed(window, entry):
+            continue
+        if cadence is not None and entry is not None and not capture_due(
+            window, entry, cadence.get(diff_key), now,
+        ):
+            continue
+        jobs[diff_key] = (window, _capture_pool.submit(
+            capture_pane, idx, window.get("pane_id"), window.get("cursor"),
+        ))
+    if jobs:
+        wait([job for _, job in jobs.values()], timeout=deadline)
+
+    # --- Collect ---
+    captured_count = 0
+    for agent in agents:
+        idx = agent.get("window_index")
+        if idx is None:
+            continue
+        diff_key = str(idx)
+        entry = captures.get(diff_key)
+        if diff_key in jobs:
+            window, job = jobs[diff_key]
+            if job.done():
+                entry = captures[diff_key] = {
+                    "signature": pane_signature(window),
+                    "at": now,
+                    "text": job.result(),
+                    "status": None,
+                    "pending": None,
+                }
+                captured_count += 1
+            else:
+                if entry is None:
+                    entry = captures[diff_key] = {
+                        "signature": None, "at": 0.0, "text": None, "status": None, "pending": None,
+                    }
+                entry["pending"] = job
+        if entry is None:
+            continue
+        if entry["pending"] is not None:
+            # Missed the deadline — keep showing last cycle's result
+            if entry["status"] is not None:
+                agent["status"] = entry["status"]
+                agent["scroll_text"] = extract_scroll_text(entry["text"])
+            continue
+        agent["scroll_text"] = extract_scroll_text(entry["text"])
+        agent["status"] = entry["status"] = determine_status(
+            entry["text"], diff_key,
+            last_outputs, last_change_times, now, rules,
+        )
+
+    # Prune diff tracking for removed windows
+    current_idxs = {str(a["window_index"]) for a in agents if "window_index" in a}
+    for table in (captures, last_outputs, last_change_times):
+        for stale in [k for k in table if k not in current_idxs]:
+            del table[stale]
+    return captured_count
+
+
+def plan_next_poll(
+    agents: list[dict],
+    last_outputs: dict[str, OutputDigest],
+    last_change_times: dict[str, float],
+    cadence: dict[str, tuple[float, float]],
+    now: float,
+    decay: float = ERROR_DECAY_SEC,
+) -> float:
+    """Per-window adaptive cadence — seconds until the next list-panes cycle.
+
+    cadence maps window key → (interval, due); enrich_with_capture only
+    captures a window once it is due (see capture_due).  A window whose
+    output changed this cycle snaps back to POLL_FAST_SEC; one that was due
+    and stayed quiet doubles its interval, and a waiting one jumps straight
+    to POLL_MAX_SEC.  The loop wakes for the soonest due window (or the
+    moment a status would turn waiting / an error would decay), and at
+    least every POLL_PROBE_SEC for the list-panes that spots new windows
+    and activity on backed-off ones.
+    """
+    wake_at = now + POLL_PROBE_SEC
+    for agent in agents:
+        key = str(agent["window_index"])
+        interval, due = cadence.get(key, (POLL_SEC, now + POLL_SEC))
+        if last_change_times.get(key) == now:
+            interval, due = POLL_FAST_SEC, now + POLL_FAST_SEC  # output moved → poll fast
+        elif now >= due:
+            if agent["status"] == "waiting":
+                interval = POLL_MAX_SEC
+            else:
+                interval = min(POLL_MAX_SEC, interval * 2)
+            due = now + interval
+        cadence[key] = (interval, due)
+
+        deadlines = [due]
+        if agent["status"] != "waiting" and key in last_change_times:
+            deadlines.append(last_change_times[key] + WAITING_THRESHOLD_SEC)
+        state = last_outputs.get(key)
+        if state is not None and state.error_at is not None:
+            deadlines.append(state.error_at + decay)
+        wake_at = min([wake_at] + [d for d in deadlines if d > now])
+
+    current = {str(a["window_index"]) for a in agents}
+    for stale in [k for k in cadence if k not in current]:
+        del cadence[stale]
+    return max(0.0, wake_at - now)
+
+
 def build_agents(
     windows: list[dict],
     config: dict,
@@ -380,70 +1127,459 @@ def write_state(agents: list[dict], main_active: bool) -> None:
         raise
 
 
+
+# --- tmux control mode ---
+
+# list-panes over the control channel — window_id は %window-* 通知のキー
+CONTROL_PANE_FORMAT = "\t".join([
+    "#{window_id}",
+    "#{window_index}",
+    "#{window_name}",
+    "#{pane_pid}",
+    "#{pane_index}",
+    "#{pane_id}",
+    "#{cursor_x}",
+    "#{cursor_y}",
+    "#{pane_width}",
+    "#{pane_height}",
+])
+
+
+def decode_control_output(data: bytes) -> bytes:
+    """Undo the \\ooo escaping tmux applies to %output payloads."""
+    return CONTROL_OCTAL_RE.sub(lambda m: bytes([int(m.group(1), 8) & 0xFF]), data)
+
+
+class PaneTail:
+    """Screen model and last output time of one pane, fed from %output."""
+
+    def __init__(self, now: float, size: tuple[int, int] = (80, 24)):
+        self.screen = TermScreen(*size)
+        self.last_output = now
+        self.seen: OutputDigest | None = None  # diff state at the last publish
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def seed(self, captured: str, cursor: tuple[int, int]) -> None:
+        """Start from a capture-pane snapshot; new output continues at cursor (x, y)."""
+        self.screen.load(captured, cursor)
+
+    def feed(self, data: bytes, now: float) -> None:
+        # UTF-8 sequences can be split across %output notifications
+        self.screen.feed(self._decoder.decode(data))
+        self.last_output = now
+
+    def text(self) -> str:
+        return self.screen.text()
+
+
+def tail_status(tail: PaneTail, now: float, rules: ErrorRules = DEFAULT_ERROR_RULES) -> str:
+    """active / waiting / error from pushed output (same rules as determine_status)."""
+    tail.seen = observe_output(tail.text(), tail.seen, now, rules)
+    if has_error(tail.seen, now, rules):
+        return "error"
+    if now - tail.last_output >= WAITING_THRESHOLD_SEC:
+        return "waiting"
+    return "active"
+
+
+_tmux_version: tuple[int, int] | None = None
+
+
+def tmux_version() -> tuple[int, int] | None:
+    """(major, minor) from `tmux -V`, checked once per process; None if tmux cannot run.
+
+    Builds without a number ("tmux master") count as new enough for everything.
+    """
+    global _tmux_version
+    if _tmux_version is None:
+        try:
+            result = subprocess.run(["tmux", "-V"], capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            return None  # 失敗はキャッシュしない（後から入る tmux もある）
+        if result.returncode != 0:
+            return None
+        m = re.search(r"(\d+)\.(\d+)", result.stdout)
+        _tmux_version = (int(m.group(1)), int(m.group(2))) if m else (999, 0)
+    return _tmux_version
+
+
+class ControlModeClient:
+    """Long-lived `tmux -C attach-session` — tmux pushes pane output and window changes.
+
+    Window list and initial pane contents are fetched as commands over the
+    same channel, so steady state needs no forks and no capture-pane.
+    """
+
+    def __init__(self, session: str = TMUX_SESSION):
+        self.session = session
+        self.proc: subprocess.Popen | None = None
+        self._stdin = None
+        self.windows: dict[str, dict] = {}  # window_id → get_tmux_windows 形式の dict
+        self.tails: dict[str, PaneTail] = {}  # pane_id (pane 0 only) → PaneTail
+        self.ready = False  # first window list received
+        self.changed = False  # something the JSON shows may differ
+        self._buf = b""
+        self._replies: deque = deque()  # callbacks of our commands, in send order
+        self._block: list[bytes] | None = None  # lines of the %begin block being read
+        self._block_ours = False
+
+    def start(self) -> bool:
+        version = tmux_version()
+        if version is None:
+            return False
+        # 古い tmux は -f を受け付けず attach ごと失敗する — read-only だけ -r で
+        flags = ["-f", "read-only,ignore-size"] if version >= CONTROL_FLAGS_MIN_TMUX else ["-r"]
+        try:
+            self.proc = subprocess.Popen(
+                ["tmux", "-C", "attach-session", "-t", self.session, *flags],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            return False
+        self._stdin = self.proc.stdin
+        self.refresh_windows()
+        return True
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def close(self) -> None:
+        if self.proc is None:
+            return
+        try:
+            self.proc.terminate()
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        except OSError:
+            pass
+
+    def command(self, cmd: str, on_reply) -> None:
+        """Send a tmux command; on_reply(lines, ok, now) runs when its %end/%error arrives."""
+        self._replies.append(on_reply)
+        self._stdin.write(cmd.encode("utf-8") + b"\n")
+        self._stdin.flush()
+
+    def refresh_windows(self) -> None:
+        self.command(
+            f'list-panes -s -t {self.session} -F "{CONTROL_PANE_FORMAT}"',
+            self._on_panes,
+        )
+
+    def window_list(self) -> list[dict]:
+        return sorted(self.windows.values(), key=lambda w: w["window_index"])
+
+    def pump(self, timeout: float) -> None:
+        """Wait up to timeout for tmux output and handle every complete line."""
+        fd = self.proc.stdout.fileno()
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if not readable:
+            return
+        data = os.read(fd, 65536)
+        if not data:
+            self.proc.wait()  # tmux exited (%exit, session closed, server gone)
+            return
+        self.feed(data, time.time())
+
+    def feed(self, data: bytes, now: float) -> None:
+        *lines, self._buf = (self._buf + data).split(b"\n")
+        for line in lines:
+            self._handle(line, now)
+
+    def _handle(self, line: bytes, now: float) -> None:
+        if self._block is not None:
+            if line.startswith((b"%end ", b"%error ")):
+                block, self._block = self._block, None
+                if self._block_ours and self._replies:
+                    self._replies.popleft()(block, line.startswith(b"%end "), now)
+            else:
+                self._block.append(line)
+            return
+
+        kind, _, rest = line.partition(b" ")
+        if kind == b"%begin":
+            self._block = []
+            self._block_ours = rest.split(b" ")[-1:] == [b"1"]  # flags=1: our command
+        elif kind == b"%output":
+            pane_id, _, payload = rest.partition(b" ")
+            tail = self.tails.get(pane_id.decode("ascii", "replace"))
+            if tail is not None:
+                tail.feed(decode_control_output(payload), now)
+                self.changed = True
+        elif kind == b"%window-renamed":
+            window_id, _, name = rest.partition(b" ")
+            window = self.windows.get(window_id.decode("ascii", "replace"))
+            if window is not None:
+                window["window_name"] = name.decode("utf-8", "replace")
+                self.changed = True
+        elif kind in (b"%window-add", b"%window-close",
+                      b"%unlinked-window-close", b"%layout-change"):
+            # pane 0 の入れ替わり（split / kill-pane）も layout-change で拾う
+            self.refresh_windows()
+
+    def _on_panes(self, lines: list[bytes], ok: bool, now: float) -> None:
+        if not ok:
+            return
+        windows: dict[str, tuple[int, dict]] = {}
+        for line in lines:
+            parts = line.decode("utf-8", "replace").split("\t")
+            if len(parts) < 10:
+                continue
+            try:
+                idx = int(parts[1])
+                pid = int(parts[3])
+                pane_index = int(parts[4])
+                cursor = (int(parts[6]), int(parts[7]))
+                size = (int(parts[8]), int(parts[9]))
+            except ValueError:
+                continue
+            if parts[0] in windows and windows[parts[0]][0] <= pane_index:
+                continue
+            windows[parts[0]] = (pane_index, {
+                "window_index": idx,
+                "window_name": parts[2],
+                "pane_pid": pid,
+                "pane_id": parts[5],
+                "cursor": cursor,
+                "size": size,
+            })
+        self.windows = {wid: w for wid, (_, w) in windows.items()}
+
+        pane_ids = {w["pane_id"] for w in self.windows.values()}
+        for pane_id in [p for p in self.tails if p not in pane_ids]:
+            del self.tails[pane_id]
+        for w in self.window_list():
+            pane_id = w["pane_id"]
+            tail = self.tails.get(pane_id)
+            if tail is not None:
+                if (tail.screen.width, tail.screen.height) != w["size"]:
+                    tail.screen.resize(*w["size"])
+                continue
+            self.tails[pane_id] = PaneTail(now, w["size"])
+            self.command(
+                f"capture-pane -p -t {pane_id}",
+                partial(self._on_capture, pane_id, w["cursor"]),
+            )
+        self.ready = True
+        self.changed = True
+
+    def _on_capture(
+        self, pane_id: str, cursor: tuple[int, int], lines: list[bytes], ok: bool, now: float,
+    ) -> None:
+        tail = self.tails.get(pane_id)
+        if ok and tail is not None:
+            tail.seed(b"\n".join(lines).decode("utf-8", "replace"), cursor)
+            self.changed = True
+
+    def next_transition(self, now: float, decay: float = ERROR_DECAY_SEC) -> float | None:
+        """When the next pane turns waiting or its error decays."""
+        deadlines = [t.last_output + WAITING_THRESHOLD_SEC for t in self.tails.values()]
+        deadlines += [
+            t.seen.error_at + decay
+            for t in self.tails.values()
+            if t.seen is not None and t.seen.error_at is not None
+        ]
+        deadlines = [d for d in deadlines if d > now]
+        return min(deadlines) if deadlines else None
+
+
+def control_mode_agents(
+    client: ControlModeClient,
+    config: dict,
+    first_seen: dict[str, float],
+    now: float,
+) -> tuple[list[dict], bool]:
+    """build_agents over the control-mode window list, enriched from PaneTail."""
+    windows = client.window_list()
+    agents, main_active = build_agents(windows, config, first_seen)
+    rules = error_rules(config)
+    panes = {w["window_index"]: w["pane_id"] for w in windows}
+    for agent in agents:
+        tail = client.tails.get(panes.get(agent["window_index"]))
+        if tail is None:
+            continue
+        agent["scroll_text"] = extract_scroll_text(tail.text())
+        agent["status"] = tail_status(tail, now, rules)
+    return agents, main_active
+
+
+def visible_state(agents: list[dict], main_active: bool) -> tuple:
+    """What the display shows — last_seen/started churn excluded."""
+    return main_active, tuple(
+        (a["id"], a["task"], a["role"], a["status"], a["scroll_text"]) for a in agents
+    )
+
+
+class AgentLog:
+    """Prints the agent summary only when the agent set or DIR state changes."""
+
+    def __init__(self):
+        self.last: tuple | None = None
+
+    def update(self, agents: list[dict], main_active: bool) -> None:
+        key = ({a["id"] for a in agents}, main_active)
+        if key == self.last:
+            return
+        dir_status = "active" if main_active else "idle"
+        if agents:
+            statuses = [f"{a['id']}({a['status']})" for a in agents]
+            print(f"[i] Agents: {len(agents)} — {', '.join(statuses)} (DIR: {dir_status})")
+        else:
+            print(f"[i] No agents (DIR: {dir_status})")
+        self.last = key
+
+
+def run_control_mode(
+    client: ControlModeClient,
+    first_seen: dict[str, float],
+    agent_log: AgentLog,
+) -> None:
+    """Publish STATE_FILE from control-mode events until the client exits.
+
+    Writes happen on tmux events (coalesced to CONTROL_PUBLISH_MIN_SEC), when
+    a pane crosses WAITING_THRESHOLD_SEC, and every CONTROL_HEARTBEAT_SEC so
+    the display's last_seen TTL never fires on a quiet but healthy team.
+    """
+    last_write = 0.0
+    last_visible: tuple | None = None
+    wake_at: float | None = None
+    while client.alive:
+        now = time.time()
+        due = [last_write + CONTROL_HEARTBEAT_SEC]
+        if client.changed:
+            due.append(last_write + CONTROL_PUBLISH_MIN_SEC)
+        if wake_at is not None:
+            due.append(wake_at)
+        if client.ready and now >= min(due):
+            config = load_config()
+            agents, main_active = control_mode_agents(client, config, first_seen, now)
+            visible = visible_state(agents, main_active)
+            if visible != last_visible or now >= last_write + CONTROL_HEARTBEAT_SEC:
+                write_state(agents, main_active)
+                agent_log.update(agents, main_active)
+                last_write, last_visible = now, visible
+            client.changed = False
+            wake_at = client.next_transition(now, error_rules(config).decay)
+            continue
+        client.pump(max(0.0, min(due) - now) if client.ready else CONTROL_PUBLISH_MIN_SEC)
+
+
+class ControlRetry:
+    """When to (re)try control mode — failed attaches back off, polling covers the gap.
+
+    A tmux server that is still starting or a rejected attach only delays the
+    next attempt (POLL_SEC, doubling up to CONTROL_RETRY_MAX_SEC); control
+    mode is never switched off for the rest of the process.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.backoff = POLL_SEC
+        self.next_at = 0.0
+
+    def due(self, now: float) -> bool:
+        return self.enabled and now >= self.next_at
+
+    def attached(self) -> None:
+        self.backoff = POLL_SEC
+        self.next_at = 0.0
+
+    def failed(self, now: float) -> float:
+        """Schedule the next attempt; returns the delay."""
+        delay = self.backoff
+        self.next_at = now + delay
+        self.backoff = min(self.backoff * 2, CONTROL_RETRY_MAX_SEC)
+        return delay
+
+    def cap(self, delay: float, now: float) -> float:
+        """Shorten a polling sleep so the next attempt is not overslept."""
+        if not self.enabled:
+            return delay
+        return max(0.0, min(delay, self.next_at - now))
+
+
+def attach_control_mode(first_seen: dict[str, float], agent_log: AgentLog) -> bool:
+    """Follow tmux in control mode until it detaches.
+
+    Returns False when the attach failed (rejected before the first window
+    list) so the caller can poll with capture-pane until the next retry.
+    """
+    client = ControlModeClient()
+    if not client.start():
+        return False
+    try:
+        run_control_mode(client, first_seen, agent_log)
+    finally:
+        client.close()
+    if not client.ready:
+        print("[!] tmux control mode unavailable — polling with capture-pane for now")
+        return False
+    print("[i] tmux control mode detached")
+    return True
+
+
 def main() -> None:
-    """Main polling loop — tmux → JSON every POLL_SEC seconds."""
+    """Main loop — tmux control mode, or tmux → JSON on an adaptive poll cadence."""
     print("[pixoo-tmux-sync] Started")
     print(f"[i] tmux session: {TMUX_SESSION}")
-    print(f"[i] Poll interval: {POLL_SEC}s")
+    print(f"[i] Poll interval: list-panes ≤{POLL_PROBE_SEC}s, capture {POLL_FAST_SEC}–{POLL_MAX_SEC}s per window (fallback mode)")
     print(f"[i] Output: {STATE_FILE}")
 
     first_seen: dict[str, float] = {}
     # Phase 3: capture-pane diff tracking
-    last_outputs: dict[str, str] = {}
+    last_outputs: dict[str, OutputDigest] = {}
     last_change_times: dict[str, float] = {}
-    last_agent_ids: set[str] | None = None
-    last_main_active: bool | None = None
+    captures: dict[str, dict] = {}
+    cadence: dict[str, tuple[float, float]] = {}
+    agent_log = AgentLog()
+    control = ControlRetry(CONTROL_MODE)
 
     while True:
         try:
             config = load_config()
             windows = get_tmux_windows()
+            delay = POLL_SEC
 
             if windows is None:
                 # tmux unavailable — write empty state so display shows fallback
                 agents: list[dict] = []
                 main_active = False
-                if last_agent_ids is not None:
+                if agent_log.last is not None:
                     print("[!] tmux session unavailable — writing empty state")
+            elif control.due(time.monotonic()):
+                print("[i] tmux control mode: following pane output")
+                if attach_control_mode(first_seen, agent_log):
+                    control.attached()
+                else:
+                    retry = control.failed(time.monotonic())
+                    print(f"[i] Retrying control mode in {retry:.0f}s")
+                time.sleep(POLL_SEC)
+                continue
             else:
                 agents, main_active = build_agents(windows, config, first_seen)
 
                 # Phase 3: enrich agents with capture-pane data
                 now = time.time()
-                for agent in agents:
-                    idx = agent.get("window_index")
-                    if idx is None:
-                        continue
-                    captured = capture_pane(idx)
-                    agent["scroll_text"] = extract_scroll_text(captured)
-                    # Use window_index as diff key (unique, avoids same-name collision)
-                    diff_key = str(idx)
-                    agent["status"] = determine_status(
-                        captured, diff_key,
-                        last_outputs, last_change_times, now,
-                    )
-
-                # Prune diff tracking for removed windows
-                current_idxs = {str(a["window_index"]) for a in agents if "window_index" in a}
-                for stale in [k for k in last_outputs if k not in current_idxs]:
-                    del last_outputs[stale]
-                    last_change_times.pop(stale, None)
+                rules = error_rules(config)
+                enrich_with_capture(
+                    agents, windows, captures,
+                    last_outputs, last_change_times, now,
+                    rules=rules, cadence=cadence,
+                )
+                delay = plan_next_poll(
+                    agents, last_outputs, last_change_times,
+                    cadence, now, rules.decay,
+                )
+                delay = control.cap(delay, time.monotonic())
 
             write_state(agents, main_active)
+            agent_log.update(agents, main_active)  # logs only on change
 
-            # Log only on change
-            agent_ids = {a["id"] for a in agents}
-            if agent_ids != last_agent_ids or main_active != last_main_active:
-                dir_status = "active" if main_active else "idle"
-                if agents:
-                    statuses = [f"{a['id']}({a['status']})" for a in agents]
-                    print(f"[i] Agents: {len(agents)} — {', '.join(statuses)} (DIR: {dir_status})")
-                else:
-                    print(f"[i] No agents (DIR: {dir_status})")
-                last_agent_ids = agent_ids
-                last_main_active = main_active
-
-            time.sleep(POLL_SEC)
+            time.sleep(delay)
 
         except KeyboardInterrupt:
             print("\n[i] Stopped")
@@ -0,0 +1,49 @@
+"""Shared loader for pixoo-display-test.py in tests.
+
+Imports the display module via importlib (dashes in filename) with mocked
+hardware dependencies so no Pixoo device or display is needed.  The module
+is registered as ``pixoo_display`` so every test file shares one instance.
+"""
+import sys
+import types
+import importlib.util
+from pathlib import Path
+
+
+def _mock_external_deps() -> None:
+    """Pre-populate sys.modules with stubs so the display script can be loaded."""
+    if "pilmoji" not in sys.modules:
+        m = types.ModuleType("pilmoji")
+
+        class _Pilmoji:
+            def __init__(self, *a, **k):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *a):
+                pass
+
+            def text(self, *a, **k):
+                pass
+
+            def getsize(self, text, font):
+                return (len(text) * 8, 12)
+
+        m.Pilmoji = _Pilmoji
+        sys.modules["pilmoji"] = m
+
+
+def load_display_module() -> types.ModuleType:
+    if "pixoo_display" in sys.modules:
+        return sys.modules["pixoo_display"]
+    _mock_external_deps()
+    spec = importlib.util.spec_from_file_location(
+        "pixoo_display",
+        Path(__file__).parent.parent / "pixoo-display-test.py",
+    )
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules["pixoo_display"] = mod
+    spec.loader.exec_module(mod)
+    return mod
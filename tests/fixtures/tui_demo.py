@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Claude Code / Codex 風の TUI 再描画を流すデモ — tui-synthetic-*.out 録画用.
+
+Usage: python3 tests/fixtures/tui_demo.py claude|codex [seconds]
+
+Run it inside a tmux pane while `tools/pixoo-tmux-bench.py record` is attached.
+It only emits the redraw patterns those TUIs use (erase-line + cursor-up
+frames, scroll regions with a pinned status area), not their content — the
+fixtures are synthetic, not captures of the real applications.
+"""
+
+import shutil
+import sys
+import time
+
+ESC = "\x1b"
+SPINNER = "·✢✳✶✻✽"
+TRANSCRIPT = [
+    ("⏺", "Read(pixoo_tmux_sync.py)", "⎿  Read 912 lines"),
+    ("⏺", "Bash(python -m pytest -q tests/test_tmux_sync.py)", "⎿  76 passed in 0.51s"),
+    ("⏺", "Update(pixoo_tmux_sync.py)", "⎿  Updated with 42 additions and 9 removals"),
+    ("⏺", "テストを実行して結果を確認します", "⎿  すべて成功しました"),
+    ("⏺", "Bash(git diff --stat)", "⎿  2 files changed, 51 insertions(+), 9 deletions(-)"),
+]
+
+
+def out(text: str) -> None:
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def claude(seconds: float) -> None:
+    """Ink (log-update) style: erase the live frame line by line, print, redraw."""
+    width = shutil.get_terminal_size().columns
+    box = "─" * (width - 2)
+    frame_lines = 0
+    start = time.monotonic()
+    tick = 0
+    while time.monotonic() - start < seconds:
+        elapsed = int(time.monotonic() - start)
+        # eraseLines(n): ESC[2K + ESC[1A per line, then ESC[G
+        out("".join(f"{ESC}[2K" + (f"{ESC}[1A" if i < frame_lines - 1 else "")
+                    for i in range(frame_lines)) + f"{ESC}[G")
+        if tick % 12 == 0:
+            mark, title, result = TRANSCRIPT[(tick // 12) % len(TRANSCRIPT)]
+            out(f"{ESC}[32m{mark}{ESC}[39m {ESC}[1m{title}{ESC}[22m\n"
+                f"  {ESC}[2m{result}{ESC}[22m\n\n")
+        spin = SPINNER[tick % len(SPINNER)]
+        frame = [
+            f"{ESC}[38;5;174m{spin} Thinking… {ESC}[39m{ESC}[2m({elapsed}s · ↑ {tick * 37} tokens · esc to interrupt){ESC}[22m",
+            "",
+            f"{ESC}[2m╭{box}╮{ESC}[22m",
+            f"{ESC}[2m│{ESC}[22m > " + " " * (width - 5) + f"{ESC}[2m│{ESC}[22m",
+            f"{ESC}[2m╰{box}╯{ESC}[22m",
+            f"  {ESC}[2m? for shortcuts{ESC}[22m",
+        ]
+        out("\n".join(frame))
+        frame_lines = len(frame)
+        tick += 1
+        time.sleep(0.1)
+    out("\n")
+
+
+def codex(seconds: float) -> None:
+    """Ratatui style: history scrolls inside a region, status + composer pinned below."""
+    width, height = shutil.get_terminal_size()
+    region_bottom = height - 5
+    box = "─" * (width - 2)
+    out(f"{ESC}[?25l{ESC}[2J{ESC}[1;{region_bottom}r")
+    start = time.monotonic()
+    tick = 0
+    while time.monotonic() - start < seconds:
+        elapsed = int(time.monotonic() - start)
+        if tick % 8 == 0:
+            mark, title, result = TRANSCRIPT[(tick // 8) % len(TRANSCRIPT)]
+            out(f"{ESC}[{region_bottom};1H\n{ESC}[35m•{ESC}[39m {title}"
+                f"{ESC}[{region_bottom};1H\n  {ESC}[2m└ {result}{ESC}[22m")
+        out(f"{ESC}[{height - 4};1H{ESC}[2K{ESC}[36m▌{ESC}[39m Working ({elapsed}s • Esc to interrupt)"
+            f"{ESC}[{height - 3};1H{ESC}[2K╭{box}╮"
+            f"{ESC}[{height - 2};1H{ESC}[2K│ ▌" + " " * (width - 5) + "│"
+            f"{ESC}[{height - 1};1H{ESC}[2K╰{box}╯"
+            f"{ESC}[{height};1H{ESC}[2K {ESC}[2m⏎ send   ⇧⏎ newline   ⌃C quit{ESC}[22m")
+        tick += 1
+        time.sleep(0.1)
+    out(f"{ESC}[r{ESC}[?25h")
+
+
+if __name__ == "__main__":
+    style = sys.argv[1] if len(sys.argv) > 1 else "claude"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 12.0
+    {"claude": claude, "codex": codex}[style](seconds)
@@ -0,0 +1,189 @@
+"""Tests for frame composition caches in pixoo-display-test.py."""
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw
+
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+SAMPLE_FRAME = Path(__file__).parent / "sample_frame.png"
+
+
+def _sample() -> Image.Image:
+    img = Image.open(SAMPLE_FRAME).convert("RGB")
+    return img.resize((display.DISPLAY_SIZE, display.DISPLAY_SIZE), Image.NEAREST)
+
+
+@pytest.fixture
+def bg() -> memoryview:
+    return memoryview(display.SpriteStore.pack_frame(_sample()))
+
+
+def _compose(bg, agent, offset):
+    return display.compose_frame(
+        bg_frame=bg,
+        scroll_font=display.load_font(size=display.SCROLL_FONT_SIZE),
+        ui_font=display.load_font(size=display.UI_FONT_SIZE),
+        scroll_text="",
+        scroll_x=display.DISPLAY_SIZE,
+        agents=[],
+        main_active=False,
+        elapsed_sec=None,
+        color_tick=0,
+        is_main=False,
+        scroll_text_h=10,
+        current_agent=display.agent_view(agent, ["opus"]),
+        worker_scroll_offset=offset,
+    )
+
+
+def _reference(bg, agent, offset):
+    """Row 1 drawn directly with the glyph atlas at the scrolled x (pre-cache path)."""
+    size = display.DISPLAY_SIZE
+    row1 = display.glyph_atlas(display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE))
+    row2 = display.glyph_atlas(display.load_font(size=display.ICON_BAR_ROW2_FONT_SIZE))
+    img = Image.new("RGB", (size, size), (0, 0, 0))
+    img.paste(_sample().crop((0, 4, size, size)), (0, 0))
+    overlay = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    odraw = ImageDraw.Draw(overlay)
+    name = agent["task"]
+    eff = min(max(0, offset), max(0, row1.measure(name)[0] - (size - 2)))
+    row1.draw_outlined(odraw, (1 - eff, 0), name, fill=display.ROLE_COLORS[agent["role"]])
+    row2.draw_outlined(odraw, (1, 12), agent["role"], fill=display.ROLE_COLORS[agent["role"]])
+    img.paste(overlay, (0, 0), overlay)
+    return img
+
+
+class TestSpriteStore:
+
+    def _write_set(self, tmp_path, name, count=4):
+        paths = []
+        for i in range(count):
+            path = tmp_path / f"{name}-frame{i + 1}.png"
+            Image.new("RGB", (64, 64), (i * 40, 10, 200)).save(path)
+            paths.append(str(path))
+        return paths
+
+    def test_pack_frame_matches_crop_and_paste(self):
+        src = _sample()
+        size = display.DISPLAY_SIZE
+        ref = Image.new("RGB", (size, size), (0, 0, 0))
+        ref.paste(src.crop((0, display.SPRITE_TOP_CROP, size, size)), (0, 0))
+        assert display.SpriteStore.pack_frame(src) == ref.tobytes()
+
+    def test_frames_are_contiguous_zero_copy_views(self, tmp_path):
+        store = display.SpriteStore.from_pngs({
+            "opus": self._write_set(tmp_path, "opus"),
+            "_sleep": self._write_set(tmp_path, "sleep"),
+        })
+        a = store.frame("opus", 0)
+        b = store.frame("_sleep", 3)
+        assert a.obj is b.obj  # same backing buffer
+        assert len(a) == display.SpriteStore.FRAME_BYTES
+        assert store.nbytes == 8 * display.SpriteStore.FRAME_BYTES
+        assert bytes(a[:3]) == bytes([0, 10, 200])
+
+    def test_index_wraps_and_missing_sets_are_skipped(self, tmp_path):
+        store = display.SpriteStore.from_pngs({
+            "opus": self._write_set(tmp_path, "opus"),
+            "grok": [str(tmp_path / "missing.png")],
+        })
+        assert "opus" in store and "grok" not in store
+        assert store.frame_count("opus") == 4
+        assert bytes(store.frame("opus", 5)) == bytes(store.frame("opus", 1))
+
+
+class TestWorkerNameCache:
+
+    def test_same_key_returns_cached_strip(self):
+        cache = display.WorkerNameCache()
+        font = display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE)
+        first = cache.get("3", "ebay-ph4-impl", (0, 200, 80), font)
+        assert cache.get("3", "ebay-ph4-impl", (0, 200, 80), font) is first
+
+    def test_color_change_rerenders(self):
+        cache = display.WorkerNameCache()
+        font = display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE)
+        green = cache.get("3", "impl", (0, 200, 80), font)
+        blue = cache.get("3", "impl", (0, 120, 255), font)
+        assert green is not blue
+        assert green.image.tobytes() != blue.image.tobytes()
+
+    def test_text_width_matches_bbox(self):
+        cache = display.WorkerNameCache()
+        font = display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE)
+        entry = cache.get("1", "codex-review", (255, 200, 0), font)
+        assert entry.text_w == display.text_bbox_size(font, "codex-review")[0]
+        assert entry.image.width == entry.text_w + 2
+
+    def test_bounded(self):
+        cache = display.WorkerNameCache(max_entries=2)
+        font = display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE)
+        first = cache.get("1", "a", (1, 1, 1), font)
+        cache.get("2", "b", (1, 1, 1), font)
+        cache.get("3", "c", (1, 1, 1), font)
+        assert cache.get("1", "a", (1, 1, 1), font) is not first
+
+
+class TestComposeWorkerName:
+
+    @pytest.mark.parametrize("offset", [-5, 0, 7, 30, 500])
+    def test_cropped_strip_matches_direct_draw(self, bg, offset):
+        agent = {"id": "4", "role": "DEV", "status": "active", "task": "ebay-ph4-impl-with-a-long-name"}
+        diff = ImageChops.difference(_compose(bg, agent, offset), _reference(bg, agent, offset))
+        assert diff.getbbox() is None
+
+    def test_short_name_ignores_offset(self, bg):
+        agent = {"id": "1", "role": "PL", "status": "active", "task": "lead"}
+        assert _compose(bg, agent, 0).tobytes() == _compose(bg, agent, 9).tobytes()
+
+
+class TestSpriteAtlasFile:
+
+    def _source_tree(self, tmp_path, names=("opus", "codex")):
+        src = tmp_path / "sprites"
+        src.mkdir()
+        for name in names:
+            for i in range(1, 5):
+                Image.new("RGB", (64, 64), (i * 50, 0, 0)).save(src / f"{name}-frame{i}.png")
+        for i in range(1, 5):
+            Image.new("RGB", (64, 64), (0, 0, i * 50)).save(src / f"sleep-frame{i}.png")
+        return src
+
+    def test_roundtrip_via_mmap(self, tmp_path):
+        out = tmp_path / "sprites.atlas"
+        built = display.build_sprite_atlas(self._source_tree(tmp_path), out)
+        mapped = display.SpriteStore.from_atlas(out)
+        assert mapped.names() == built.names()
+        assert mapped.source == str(out)
+        for name in built.names():
+            for i in range(built.frame_count(name)):
+                assert bytes(mapped.frame(name, i)) == bytes(built.frame(name, i))
+
+    def test_compiler_requires_opus(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            display.build_sprite_atlas(self._source_tree(tmp_path, names=("codex",)), tmp_path / "a")
+
+    def test_rejects_foreign_file(self, tmp_path):
+        bad = tmp_path / "sprites.atlas"
+        bad.write_bytes(b"GIF89a" + b"\0" * 64)
+        with pytest.raises(ValueError):
+            display.SpriteStore.from_atlas(bad)
+
+    def test_rejects_truncated_file(self, tmp_path):
+        out = tmp_path / "sprites.atlas"
+        display.build_sprite_atlas(self._source_tree(tmp_path), out)
+        out.write_bytes(out.read_bytes()[:-100])
+        with pytest.raises(ValueError):
+            display.SpriteStore.from_atlas(out)
+
+    def test_loader_falls_back_to_pngs(self, tmp_path, monkeypatch):
+        src = self._source_tree(tmp_path)
+        monkeypatch.setattr(display, "SPRITE_ATLAS_FILE", tmp_path / "missing.atlas")
+        monkeypatch.setattr(display, "CHARACTER_FRAMES", {"opus": display.sprite_source_sets(src)["opus"]})
+        monkeypatch.setattr(display, "SLEEP_FRAMES", display.sprite_source_sets(src)["_sleep"])
+        store = display.load_sprite_store()
+        assert store.source == "png"
+        assert "opus" in store and "_sleep" in store
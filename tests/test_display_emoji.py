@@ -0,0 +1,112 @@
+"""Tests for the offline Pilmoji emoji source in pixoo-display-test.py."""
+from PIL import Image, ImageFont
+
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+
+def _write_png(path):
+    Image.new("RGBA", (4, 4), (255, 0, 0, 255)).save(path)
+
+
+class TestLocalEmojiSource:
+
+    def test_loads_png_by_codepoint(self, tmp_path):
+        _write_png(tmp_path / "1f527.png")
+        src = display.LocalEmojiSource(tmp_path)
+        stream = src.get_emoji("🔧")
+        assert stream is not None
+        assert stream.read(8) == b"\x89PNG\r\n\x1a\n"
+
+    def test_missing_emoji_returns_none(self, tmp_path):
+        src = display.LocalEmojiSource(tmp_path)
+        assert src.get_emoji("🦞") is None
+        assert src.get_discord_emoji(1234) is None
+
+    def test_variation_selector_falls_back_to_bare_name(self, tmp_path):
+        _write_png(tmp_path / "26a1.png")
+        src = display.LocalEmojiSource(tmp_path)
+        assert src.get_emoji("⚡️") is not None
+
+    def test_returns_fresh_stream_each_call(self, tmp_path):
+        _write_png(tmp_path / "1f527.png")
+        src = display.LocalEmojiSource(tmp_path)
+        first = src.get_emoji("🔧")
+        first.close()
+        assert src.get_emoji("🔧").read(4) == b"\x89PNG"
+
+    def test_lru_serves_from_memory(self, tmp_path):
+        path = tmp_path / "1f527.png"
+        _write_png(path)
+        src = display.LocalEmojiSource(tmp_path)
+        src.warm("🔧")
+        path.unlink()
+        assert src.get_emoji("🔧") is not None
+
+    def test_lru_evicts_oldest(self, tmp_path):
+        for cp in ("1f527", "1f99e", "26a1"):
+            _write_png(tmp_path / f"{cp}.png")
+        src = display.LocalEmojiSource(tmp_path, max_entries=2)
+        src.warm("🔧🦞⚡")
+        (tmp_path / "1f527.png").unlink()
+        assert src.get_emoji("🔧") is None  # evicted, then re-read from disk
+        assert src.get_emoji("⚡") is not None
+
+    def test_covers(self, tmp_path):
+        _write_png(tmp_path / "1f527.png")
+        src = display.LocalEmojiSource(tmp_path)
+        assert src.covers("🔧 [repo] fix")
+        assert src.covers("plain text")
+        assert not src.covers("🔧🦞 both")
+
+
+class _RecordingPilmoji:
+    """Pilmoji stand-in that records every text it is asked to draw."""
+
+    rendered: list = []
+
+    def __init__(self, *a, **k):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        pass
+
+    def text(self, xy, text, *a, **k):
+        self.rendered.append(text)
+
+    def getsize(self, text, font):
+        return (len(text) * 8, 12)
+
+
+class TestScrollStripEmojiFallback:
+
+    def _render(self, text, emoji_dir, monkeypatch) -> list:
+        _RecordingPilmoji.rendered = []
+        monkeypatch.setattr(display, "Pilmoji", _RecordingPilmoji)
+        monkeypatch.setattr(display, "_emoji_source", display.LocalEmojiSource(emoji_dir))
+        display.ScrollTextCache().get_strip(text, ImageFont.load_default())
+        return _RecordingPilmoji.rendered
+
+    def test_uncovered_emoji_are_stripped(self, tmp_path, monkeypatch):
+        rendered = self._render("🔧 [pixoo] fix ticker", tmp_path, monkeypatch)
+        assert rendered == []  # nothing left for Pilmoji — drawn as plain text
+        font = ImageFont.load_default()
+        strip = display.ScrollTextCache().get_strip("🔧 [pixoo] fix ticker", font)
+        assert strip.width == display.text_bbox_size(font, "[pixoo] fix ticker")[0] + 4
+
+    def test_plain_text_skips_pilmoji(self, tmp_path, monkeypatch):
+        def boom():
+            raise AssertionError("pilmoji imported for a plain ticker")
+
+        monkeypatch.setattr(display, "load_pilmoji", boom)
+        strip = display.ScrollTextCache().get_strip("ロブ稼働中 [pixoo] fix", ImageFont.load_default())
+        assert strip.getbbox() is not None
+
+    def test_covered_emoji_are_kept(self, tmp_path, monkeypatch):
+        _write_png(tmp_path / "1f527.png")
+        rendered = self._render("🔧 fix", tmp_path, monkeypatch)
+        assert rendered and all(t == "🔧 fix" for t in rendered)
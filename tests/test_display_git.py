@@ -0,0 +1,177 @@
+"""Tests for the subprocess-free git commit ticker in pixoo-display-test.py."""
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _git_log(repo):
+    ts, commit_hash, subject = _git(repo, "log", "-1", "--format=%ct\t%h\t%s").split("\t", 2)
+    return display.GitCommit(int(ts), commit_hash, subject)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "-q", "-b", "main")
+    _git(path, "commit", "-q", "--allow-empty", "-m", "first commit")
+    return path
+
+
+def _commit(repo, message):
+    _git(repo, "commit", "-q", "--allow-empty", "-m", message)
+
+
+class TestGitHeadReader:
+
+    def test_loose_commit_matches_git_log(self, repo):
+        _commit(repo, "記憶弱化修正\nwrapped second line\n\nbody text")
+        assert display.GitHeadReader(repo).read() == _git_log(repo)
+
+    def test_packed_refs_and_objects(self, repo, monkeypatch):
+        _commit(repo, "packed away")
+        _git(repo, "gc", "-q")
+        assert not (repo / ".git" / "refs" / "heads" / "main").exists()
+        monkeypatch.setattr(display, "_git_log_commit", lambda repo: pytest.fail("fell back to git"))
+        # object is packed now — the reflog's "commit: <subject>" entry has it
+        assert display.GitHeadReader(repo).read() == _git_log(repo)
+
+    def test_detached_head(self, repo):
+        first = _git(repo, "rev-parse", "HEAD")
+        _commit(repo, "second")
+        _git(repo, "checkout", "-q", first)
+        assert display.GitHeadReader(repo).read() == _git_log(repo)
+
+    def test_cached_until_head_moves(self, repo, monkeypatch):
+        reader = display.GitHeadReader(repo)
+        first = reader.read()
+        monkeypatch.setattr(display, "resolve_git_head", lambda git_dir: pytest.fail("re-read"))
+        assert reader.read() is first
+        monkeypatch.undo()
+        _commit(repo, "next one")
+        assert reader.read().subject == "next one"
+
+    def test_not_a_repo(self, tmp_path):
+        assert display.GitHeadReader(tmp_path).read() is None
+
+
+class TestLatestGitCommits:
+
+    def test_freshest_repo_wins(self, tmp_path, monkeypatch):
+        repos = []
+        for name, when in (("old", "2020-01-01T00:00:00"), ("new", "2024-01-01T00:00:00")):
+            path = tmp_path / name
+            path.mkdir()
+            _git(path, "init", "-q")
+            subprocess.run(
+                ["git", "-C", str(path), "-c", "user.name=t", "-c", "user.email=t@example.com",
+                 "commit", "-q", "--allow-empty", "-m", f"{name} work"],
+                check=True, env=dict(os.environ, GIT_COMMITTER_DATE=when, GIT_AUTHOR_DATE=when),
+            )
+            repos.append(path)
+        monkeypatch.setattr(display, "GIT_REPOS", repos + [tmp_path / "missing"])
+        ticker = display.get_latest_git_commits()
+        assert ticker.startswith("🔧 [new] ") and "new work" in ticker
+
+    def test_only_changed_repos_are_read(self, repo, monkeypatch):
+        monkeypatch.setattr(display, "GIT_REPOS", [repo])
+        display.get_latest_git_commits()
+        monkeypatch.setattr(display, "_git_dir", lambda repo: pytest.fail("unchanged repo touched"))
+        assert "first commit" in display.get_latest_git_commits(changed=set())
+
+
+class TestGitHeadWatcher:
+
+    def _watch(self, repos, action, timeout=5.0):
+        async def scenario():
+            watcher = display.GitHeadWatcher(repos)
+            await watcher.start()
+            if watcher.mode != "inotify":
+                pytest.skip("inotify not available")
+            try:
+                loop = asyncio.get_running_loop()
+                loop.call_later(0.05, lambda: loop.run_in_executor(None, action))
+                return await watcher.wait(timeout)
+            finally:
+                watcher.close()
+
+        return asyncio.run(scenario())
+
+    def test_commit_is_reported(self, repo, tmp_path):
+        other = tmp_path / "other"
+        other.mkdir()
+        _git(other, "init", "-q")
+        started = time.monotonic()
+        assert self._watch([repo, other], lambda: _commit(repo, "watched")) == {repo}
+        assert time.monotonic() - started < 2.0
+
+    def test_branch_switch_is_reported(self, repo):
+        _git(repo, "branch", "side")
+        assert self._watch([repo], lambda: _git(repo, "checkout", "-q", "side")) == {repo}
+
+    def test_commit_on_slashed_branch_is_reported(self, repo):
+        _git(repo, "checkout", "-q", "-b", "feature/x")
+        _git(repo, "config", "core.logAllRefUpdates", "false")
+        shutil.rmtree(repo / ".git" / "logs")  # no reflog — only refs/heads/feature/x moves
+        assert self._watch([repo], lambda: _commit(repo, "nested")) == {repo}
+
+    def test_new_branch_directory_is_watched(self, repo):
+        _commit(repo, "second")
+        _git(repo, "config", "core.logAllRefUpdates", "false")
+        shutil.rmtree(repo / ".git" / "logs")
+
+        async def scenario():
+            watcher = display.GitHeadWatcher([repo])
+            await watcher.start()
+            if watcher.mode != "inotify":
+                pytest.skip("inotify not available")
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, lambda: _git(repo, "branch", "team/a", "HEAD~1"))
+                created = await watcher.wait(5.0)
+                await loop.run_in_executor(None, lambda: _git(repo, "update-ref", "refs/heads/team/a", "HEAD"))
+                return created, await watcher.wait(5.0)
+            finally:
+                watcher.close()
+
+        assert asyncio.run(scenario()) == ({repo}, {repo})
+
+    def test_watch_setup_runs_off_the_event_loop(self, repo, monkeypatch):
+        probed = []
+        git_dir = display._git_dir
+        walk = display.os.walk
+        monkeypatch.setattr(display, "_git_dir", lambda r: probed.append(threading.current_thread()) or git_dir(r))
+        monkeypatch.setattr(display.os, "walk",
+                            lambda top: probed.append(threading.current_thread()) or walk(top))
+
+        async def scenario():
+            watcher = display.GitHeadWatcher([repo])
+            await watcher.start()
+            watcher.close()
+            return watcher.mode
+
+        if asyncio.run(scenario()) != "inotify":
+            pytest.skip("inotify not available")
+        assert probed and threading.main_thread() not in probed
+
+    def test_index_churn_is_ignored(self, repo):
+        (repo / "file.txt").write_text("x")
+        assert self._watch([repo], lambda: _git(repo, "add", "file.txt"), timeout=0.5) == set()
@@ -0,0 +1,99 @@
+"""Tests for the bitmap GlyphAtlas in pixoo-display-test.py."""
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+pytestmark = pytest.mark.skipif(not Path(FONT_PATH).exists(), reason="DejaVu font not installed")
+
+
+def _font(size: int = 11) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(FONT_PATH, size=size)
+
+
+def _ink_bbox(img: Image.Image):
+    return img.getbbox()
+
+
+class TestGlyphAtlasLayout:
+
+    def test_measure_matches_freetype_bbox(self):
+        font = _font()
+        atlas = display.GlyphAtlas(font)
+        for text in ["DEV", "ebay-ph4-impl", "x7", "12:05"]:
+            w, h = atlas.measure(text)
+            ref_w, ref_h = display.text_bbox_size(font, text)
+            assert abs(w - ref_w) <= 1, text
+            assert h == ref_h, text
+
+    def test_draw_matches_freetype_placement(self):
+        font = _font()
+        atlas = display.GlyphAtlas(font)
+        ref = Image.new("L", (80, 20), 0)
+        ImageDraw.Draw(ref).text((3, 2), "codex-review", font=font, fill=255)
+        out = Image.new("L", (80, 20), 0)
+        atlas.draw(ImageDraw.Draw(out), (3, 2), "codex-review", fill=255)
+        ref_box, out_box = _ink_bbox(ref), _ink_bbox(out)
+        assert all(abs(a - b) <= 1 for a, b in zip(ref_box, out_box))
+
+    def test_whitespace_has_no_ink(self):
+        atlas = display.GlyphAtlas(_font())
+        assert atlas.layout("   ") == (None, 0, 0)
+        assert atlas.measure("") == (0, 0)
+
+    def test_layout_is_cached(self):
+        atlas = display.GlyphAtlas(_font())
+        assert atlas.layout("PL") is atlas.layout("PL")
+
+    def test_each_codepoint_rasterized_once(self, monkeypatch):
+        font = _font()
+        atlas = display.GlyphAtlas(font)
+        calls = []
+        real = font.getbbox
+        monkeypatch.setattr(font, "getbbox", lambda t, *a, **k: calls.append(t) or real(t, *a, **k))
+        atlas.layout("aaa")
+        atlas.layout("aab")
+        assert calls == ["a", "b"]
+
+    def test_atlas_grows_past_initial_height(self):
+        atlas = display.GlyphAtlas(_font(size=20))
+        atlas.warm("".join(chr(c) for c in range(0x21, 0x17F)))
+        mask, _, _ = atlas.layout("Zz")
+        assert mask is not None and mask.getbbox() is not None
+
+
+class TestGlyphAtlasPersistence:
+
+    def test_roundtrip_skips_rasterizing(self, tmp_path, monkeypatch):
+        first = display.GlyphAtlas(_font(), cache_dir=tmp_path)
+        first.warm("SEC-lead")
+        ref_mask, ref_x0, ref_y0 = first.layout("SEC-lead")
+        first.save()
+        assert list(tmp_path.glob("glyphs-*.json"))
+
+        font = _font()
+        monkeypatch.setattr(font, "getbbox", lambda *a, **k: pytest.fail("rasterized again"))
+        second = display.GlyphAtlas(font, cache_dir=tmp_path)
+        mask, x0, y0 = second.layout("SEC-lead")
+        assert (x0, y0) == (ref_x0, ref_y0)
+        assert mask.tobytes() == ref_mask.tobytes()
+
+    def test_corrupt_cache_is_ignored(self, tmp_path):
+        atlas = display.GlyphAtlas(_font(), cache_dir=tmp_path)
+        atlas.warm("A")
+        atlas.save()
+        for f in tmp_path.glob("glyphs-*.json"):
+            f.write_text("{not json")
+        fresh = display.GlyphAtlas(_font(), cache_dir=tmp_path)
+        assert fresh.measure("A")[0] > 0
+
+    def test_save_is_noop_when_clean(self, tmp_path):
+        atlas = display.GlyphAtlas(_font(), cache_dir=tmp_path)
+        atlas.save()
+        assert not list(tmp_path.iterdir())
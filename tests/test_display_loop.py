@@ -0,0 +1,348 @@
+"""Tests for the asyncio display scheduler (DisplayLoop) in pixoo-display-test.py."""
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+SAMPLE_FRAME = str(Path(__file__).parent / "sample_frame.png")
+
+AGENT = {"id": "1", "char": "codex", "task": "impl", "role": "DEV", "status": "active",
+         "started": 1000.0, "last_seen": 1000.0}
+
+
+class _FakeSender:
+    def __init__(self):
+        self.payloads = []
+        self.animations = []
+
+    def send(self, payload):
+        self.payloads.append(payload)
+
+    def send_animation(self, payloads, speed_ms):
+        self.animations.append((payloads, speed_ms))
+
+    def connect(self):
+        pass
+
+
+@pytest.fixture
+def loop_parts(monkeypatch):
+    monkeypatch.setattr(display, "get_latest_git_commits", lambda changed=None: "ticker")
+    monkeypatch.setattr(display, "flush_glyph_atlases", lambda: None)
+    sprites = display.SpriteStore.from_pngs({
+        "opus": [SAMPLE_FRAME] * 4,
+        "codex": [SAMPLE_FRAME] * 3,
+    })
+    renderer = display.FrameRenderer(
+        sprites, "opus",
+        display.load_font(size=display.SCROLL_FONT_SIZE),
+        display.load_font(size=display.UI_FONT_SIZE),
+        display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE),
+    )
+    ahead = display.RenderAhead(renderer)
+    yield renderer, ahead
+    ahead.close()
+
+
+def _loop(loop_parts, sender=None):
+    renderer, ahead = loop_parts
+    return display.DisplayLoop(renderer, ahead, sender or _FakeSender(), ["opus", "codex"], "ticker")
+
+
+class TestApplyState:
+
+    def test_generation_ignores_last_seen_churn(self, loop_parts):
+        dl = _loop(loop_parts)
+        dl.apply_state([AGENT], False, 0.0)
+        gen = dl.state.generation
+        dl.apply_state([dict(AGENT, last_seen=2000.0)], False, 3.0)
+        assert dl.state.generation == gen
+        dl.apply_state([dict(AGENT, status="error")], False, 6.0)
+        assert dl.state.generation == gen + 1
+
+    def test_agents_gone_falls_back_to_opus(self, loop_parts):
+        dl = _loop(loop_parts)
+        dl.apply_state([AGENT, dict(AGENT, id="2")], False, 0.0)
+        dl.cursor.display_idx = 1
+        dl.apply_state([], False, 3.0)
+        assert dl.cursor.display_idx == 0
+        assert dl.state.display_list == (display._MAIN_ENTRY,)
+
+
+def _write_state(path, agents, main_active=False):
+    """Atomic write, like the sync daemons (tempfile + os.replace)."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"agents": agents, "main_active": main_active}))
+    os.replace(tmp, path)
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    path = tmp_path / "pixoo-agents.json"
+    monkeypatch.setattr(display, "STATE_FILE", path)
+    monkeypatch.setattr(display, "NOTIFY_MODE_FILE", tmp_path / "pixoo-notify-mode")
+    monkeypatch.setattr(display, "is_notify_mode", None)
+    return path
+
+
+def _live(agent):
+    return dict(agent, last_seen=time.time())
+
+
+async def _run_then(dl, duration, *steps):
+    """Run the loop while applying (delay, callable) steps from the side."""
+    async def side():
+        for delay, step in steps:
+            await asyncio.sleep(delay)
+            step()
+
+    await asyncio.gather(dl.run(duration_sec=duration), side())
+
+
+class TestStateWatcher:
+
+    @pytest.mark.parametrize("mode", ["inotify", "stat"])
+    def test_replace_is_noticed(self, state_file, monkeypatch, mode):
+        monkeypatch.setattr(display, "STATE_STAT_POLL_SEC", 0.02)
+        _write_state(state_file, [])
+
+        async def scenario():
+            watcher = display.StateWatcher(state_file)
+            if mode == "inotify":
+                watcher.start()
+                if watcher.mode != "inotify":
+                    pytest.skip("inotify not available")
+            try:
+                assert watcher.load() == ({"agents": [], "main_active": False}, True)
+                assert watcher.load()[1] is False  # unchanged file is not re-parsed
+                asyncio.get_running_loop().call_later(0.05, _write_state, state_file, [], True)
+                started = time.monotonic()
+                await watcher.wait(timeout=5.0)
+                assert time.monotonic() - started < 1.0
+                data, changed = watcher.load()
+                assert changed and data["main_active"] is True
+            finally:
+                watcher.close()
+
+        asyncio.run(scenario())
+
+    def test_wait_times_out(self, state_file):
+        async def scenario():
+            watcher = display.StateWatcher(state_file)
+            watcher.load()
+            await watcher.wait(timeout=0.05)
+            return watcher.load()[1]
+
+        assert asyncio.run(scenario()) is False
+
+    def test_next_agent_expiry(self):
+        now = 10_000.0
+        agents = [{"last_seen": now - 100}, {"last_seen": now - 500}]
+        assert display.next_agent_expiry(agents, now) == display.AGENT_TTL_SEC - 500
+        assert display.next_agent_expiry([], now) is None
+
+
+class TestRun:
+
+    def test_pushes_frames_on_ticks(self, loop_parts, state_file):
+        _write_state(state_file, [_live(AGENT)], True)
+        sender = _FakeSender()
+        dl = _loop(loop_parts, sender)
+        asyncio.run(dl.run(duration_sec=0.5))
+        # t=0 plus 2 frame ticks and 3 scroll ticks within 0.5s (identical frames are deduped)
+        assert 3 <= dl.dedup.pushed + dl.dedup.skipped <= 6
+        # a send still in flight on the I/O thread at shutdown isn't counted as pushed
+        assert 1 <= dl.dedup.pushed <= len(sender.payloads) <= dl.dedup.pushed + 1
+        assert all(len(base64.b64decode(p)) == 64 * 64 * 3 for p in sender.payloads)
+        assert [a.id for a in dl.state.agents] == ["1"]
+
+    def test_new_agent_applied_on_next_frame_tick(self, loop_parts, state_file):
+        _write_state(state_file, [], True)
+        dl = _loop(loop_parts)
+        asyncio.run(_run_then(dl, 0.6, (0.1, lambda: _write_state(state_file, [_live(AGENT)], True))))
+        assert dl.agent_count == 1
+
+    def test_first_pixel_logged_then_warm_up(self, loop_parts, state_file, monkeypatch):
+        renderer, _ = loop_parts
+        warmed = []
+        monkeypatch.setattr(renderer, "warm_up", lambda: warmed.append(True))
+        _write_state(state_file, [_live(AGENT)], True)
+        dl = _loop(loop_parts)
+        asyncio.run(dl.run(duration_sec=0.3))
+        assert dl.first_pixel_s is not None
+        assert [step for step, _ in dl.profile.steps] == ["first frame"]
+        assert warmed == [True]  # once, after the first push
+
+    def test_git_ticker_replaces_fallback_without_state_change(self, loop_parts, state_file):
+        _write_state(state_file, [], True)
+        renderer, ahead = loop_parts
+        dl = display.DisplayLoop(renderer, ahead, _FakeSender(), ["opus", "codex"], display.FALLBACK_TICKER)
+        asyncio.run(dl.run(duration_sec=0.5))
+        assert dl.state.ticker == "ticker"  # get_latest_git_commits, scanned at start-up in the background
+
+    def test_state_read_failure_propagates(self, loop_parts, state_file, monkeypatch):
+        def boom(path):
+            raise OSError("state file vanished")
+
+        monkeypatch.setattr(display, "parse_state_file", boom)
+        _write_state(state_file, [])
+        with pytest.raises(OSError):
+            asyncio.run(_loop(loop_parts).run(duration_sec=1.0))
+
+
+class TestDeepIdle:
+
+    def test_sleep_uploads_animation_once_and_stops_pushing(self, loop_parts, state_file, monkeypatch):
+        monkeypatch.setattr(display, "SLEEP_AFTER_SEC", 0)
+        _write_state(state_file, [])
+        sender = _FakeSender()
+        dl = _loop(loop_parts, sender)
+        asyncio.run(dl.run(duration_sec=0.5))
+        assert len(sender.animations) == 1
+        frames, speed = sender.animations[0]
+        assert len(frames) == 4 and speed == display.FRAME_INTERVAL_MS
+        assert sender.payloads == []
+        assert dl.state.ticker == display.SLEEP_TICKER
+        assert dl.frame_stats.ticks == 0
+
+    def test_sleep_animation_is_composed_off_the_event_loop(self, loop_parts, state_file, monkeypatch):
+        monkeypatch.setattr(display, "SLEEP_AFTER_SEC", 0)
+        _write_state(state_file, [])
+        renderer, _ = loop_parts
+        threads = []
+        render = renderer.render
+
+        def record(spec, state):
+            threads.append(threading.current_thread().name)
+            return render(spec, state)
+
+        monkeypatch.setattr(renderer, "render", record)
+        sender = _FakeSender()
+        asyncio.run(_loop(loop_parts, sender).run(duration_sec=0.5))
+        assert len(sender.animations) == 1
+        assert threads and all(name.startswith("render-ahead") for name in threads)
+
+    def test_legacy_notify_poll_parks_in_deep_idle(self, loop_parts, state_file, monkeypatch):
+        monkeypatch.setattr(display, "SLEEP_AFTER_SEC", 0)
+        monkeypatch.setattr(display, "NOTIFY_LEGACY_POLL_SEC", 0.01)
+        polls = []
+        monkeypatch.setattr(display, "is_notify_mode", lambda: polls.append(time.monotonic()) or False)
+        _write_state(state_file, [])
+        sender = _FakeSender()
+        asyncio.run(_loop(loop_parts, sender).run(duration_sec=0.5))
+        assert len(sender.animations) == 1
+        assert len(polls) <= 2  # at most the poll(s) before the sleep animation went up
+
+    def test_agent_wakes_rendering(self, loop_parts, state_file, monkeypatch):
+        monkeypatch.setattr(display, "SLEEP_AFTER_SEC", 0)
+        _write_state(state_file, [])
+        sender = _FakeSender()
+        dl = _loop(loop_parts, sender)
+        asyncio.run(_run_then(dl, 0.6, (0.2, lambda: _write_state(state_file, [_live(AGENT)]))))
+        assert len(sender.animations) == 1
+        assert sender.payloads  # pushing again after the wake-up
+        assert not dl.is_sleeping
+
+    def test_idle_timer_enters_sleep_without_file_change(self, loop_parts, state_file, monkeypatch):
+        monkeypatch.setattr(display, "SLEEP_AFTER_SEC", 0.3)
+        _write_state(state_file, [])
+        sender = _FakeSender()
+        dl = _loop(loop_parts, sender)
+        asyncio.run(dl.run(duration_sec=0.8))
+        assert dl.is_sleeping
+        assert len(sender.animations) == 1
+
+
+class TestNotifyMode:
+
+    def test_flag_file_pauses_and_resumes_pushes(self, loop_parts, state_file):
+        _write_state(state_file, [_live(AGENT)], True)
+        flag = display.NOTIFY_MODE_FILE
+        sender = _FakeSender()
+        dl = _loop(loop_parts, sender)
+        pushed = []
+
+        def snapshot():
+            pushed.append(len(sender.payloads))
+
+        asyncio.run(_run_then(
+            dl, 1.2,
+            (0.2, flag.touch), (0.1, snapshot), (0.4, snapshot),
+            (0.0, flag.unlink), (0.05, snapshot),
+        ))
+        on, paused, resumed = pushed
+        assert paused == on  # nothing pushed while the notification owns the device
+        assert resumed > paused  # repainted right away, not on the next changed frame
+        assert not dl.notify_mode
+
+    def test_leaving_notify_mode_in_deep_idle_reuploads_sleep(self, loop_parts, state_file, monkeypatch):
+        monkeypatch.setattr(display, "SLEEP_AFTER_SEC", 0)
+        _write_state(state_file, [])
+        display.NOTIFY_MODE_FILE.touch()
+        sender = _FakeSender()
+        dl = _loop(loop_parts, sender)
+        asyncio.run(_run_then(dl, 0.5, (0.2, lambda: display.NOTIFY_MODE_FILE.unlink())))
+        assert len(sender.animations) == 1  # held back while notifying, uploaded once it ended
+        assert sender.payloads == []
+
+
+class _StaticSource(display.TickerSource):
+
+    def __init__(self, name, priority, texts, delay=0.0, **kw):
+        super().__init__(interval=0.05, **kw)
+        self.name = name
+        self.priority = priority
+        self.texts = list(texts)
+        self.delay = delay
+        self.fetches = 0
+
+    def fetch(self, trigger):
+        self.fetches += 1
+        time.sleep(self.delay)
+        return self.texts.pop(0) if len(self.texts) > 1 else self.texts[0]
+
+
+async def _run_board(board, seconds):
+    awake = asyncio.Event()
+    awake.set()
+    task = asyncio.create_task(board.run(awake))
+    await asyncio.sleep(seconds)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+class TestTickerBoard:
+
+    def test_priority_and_fall_through(self):
+        git = _StaticSource("git", 0, [None])
+        todo = _StaticSource("todo", 1, ["TOP: ship it"])
+        board = display.TickerBoard([todo, git], fallback="idle")
+        assert board.current() == "idle"
+        asyncio.run(_run_board(board, 0.1))
+        assert board.current() == "TOP: ship it"  # git has nothing to show
+        git.text, git.expires = "🔧 [repo] abc fix", time.monotonic() + 60
+        assert board.current() == "🔧 [repo] abc fix"
+
+    def test_slow_fetch_keeps_last_text_without_piling_up(self):
+        slow = _StaticSource("git", 0, ["fresh"], delay=0.4, timeout=0.05)
+        slow.text, slow.expires = "last", time.monotonic() + 60
+        board = display.TickerBoard([slow], fallback="idle")
+        asyncio.run(_run_board(board, 0.3))
+        assert board.current() == "last"
+        assert slow.fetches == 1  # still stuck: no second thread started behind it
+
+    def test_expired_text_falls_back(self):
+        git = _StaticSource("git", 0, ["🔧 old"], ttl=0.0)
+        todo = _StaticSource("todo", 1, ["TOP: next"])
+        board = display.TickerBoard([git, todo], fallback="idle")
+        asyncio.run(_run_board(board, 0.1))
+        assert board.current() == "TOP: next"
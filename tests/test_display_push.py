@@ -0,0 +1,49 @@
+"""Tests for the push path (dedup) in pixoo-display-test.py."""
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+FRAME = bytes(64 * 64 * 3)
+
+
+class TestFrameDigest:
+
+    def test_stable_and_content_sensitive(self):
+        other = bytearray(FRAME)
+        other[-1] = 1
+        assert display.frame_digest(FRAME) == display.frame_digest(bytes(FRAME))
+        assert display.frame_digest(FRAME) != display.frame_digest(bytes(other))
+
+    def test_accepts_memoryview(self):
+        assert display.frame_digest(memoryview(FRAME)) == display.frame_digest(FRAME)
+
+
+class TestFrameDedup:
+
+    def test_first_frame_is_new(self):
+        assert display.FrameDedup().is_new(b"a")
+
+    def test_identical_frame_skipped_after_push(self):
+        dedup = display.FrameDedup()
+        dedup.mark_pushed(b"a")
+        assert not dedup.is_new(b"a")
+        assert dedup.is_new(b"b")
+        assert (dedup.pushed, dedup.skipped) == (1, 1)
+
+    def test_unpushed_frame_is_not_remembered(self):
+        dedup = display.FrameDedup()
+        assert dedup.is_new(b"a")  # e.g. send failed, never marked
+        assert dedup.is_new(b"a")
+
+    def test_invalidate_forces_repush(self):
+        dedup = display.FrameDedup()
+        dedup.mark_pushed(b"a")
+        dedup.invalidate()
+        assert dedup.is_new(b"a")
+
+    def test_stats(self):
+        dedup = display.FrameDedup()
+        dedup.mark_pushed(b"a")
+        for _ in range(3):
+            dedup.is_new(b"a")
+        assert dedup.stats() == "pushed=1 skipped=3 (75% deduped)"
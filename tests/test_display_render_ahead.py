@@ -0,0 +1,327 @@
+"""Tests for the render-ahead frame buffer in pixoo-display-test.py."""
+import base64
+import http.client
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from tests.display_module import load_display_module
+
+display = load_display_module()
+
+SAMPLE_FRAME = str(Path(__file__).parent / "sample_frame.png")
+
+RAW_AGENTS = [
+    {"id": "1", "char": "codex", "task": "ebay-ph4-impl-long-window-name", "role": "DEV",
+     "status": "active", "started": 1000.0},
+    {"id": "2", "char": "opus", "task": "lead", "role": "PL", "status": "waiting", "started": 1050.0},
+]
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    sprites = display.SpriteStore.from_pngs({
+        "opus": [SAMPLE_FRAME] * 4,
+        "codex": [SAMPLE_FRAME] * 3,
+    })
+    return display.FrameRenderer(
+        sprites, "opus",
+        display.load_font(size=display.SCROLL_FONT_SIZE),
+        display.load_font(size=display.UI_FONT_SIZE),
+        display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE),
+    )
+
+
+def _state(renderer, generation=1):
+    ticker = "[DEV] building..."
+    agents = renderer.agent_views(RAW_AGENTS, ["opus", "codex"])
+    return display.RenderState(
+        generation=generation,
+        agents=agents,
+        main_active=True,
+        display_list=tuple(display.DisplayEntry(a.char, a.started, False) for a in agents),
+        ticker=ticker,
+        ticker_w=renderer.ticker_width(ticker),
+        is_sleeping=False,
+    )
+
+
+def _live_specs(renderer, state, cursor, count, wall_offset):
+    """What the run loop produces, one event at a time."""
+    specs = []
+    while len(specs) < count:
+        t = cursor.next_event()
+        cursor.rotate(t, len(state.display_list))
+        cursor.sync_worker(*renderer.worker_name(state.agents, cursor.display_idx))
+        anim_frames = renderer.sprites.frame_count(renderer.sprite_for(state, cursor.display_idx))
+        if cursor.advance(t, anim_frames, state.ticker_w):
+            specs.append(renderer.spec(state, cursor, t + wall_offset))
+    return specs
+
+
+class TestFrameClock:
+
+    def test_deadlines_do_not_accumulate_drift(self):
+        clock = display.FrameClock(0.0, 0.15)
+        for i in range(1000):
+            clock.take(clock.next_t)
+        assert clock.next_t == 1000 * 0.15
+
+    def test_catch_up_limit(self):
+        clock = display.FrameClock(0.0, 0.25, max_catch_up=2)
+        assert clock.take(-0.1) == (0, 0, 0.0)
+        ticks, dropped, lateness = clock.take(5.1)  # 21 deadlines passed
+        assert (ticks, dropped) == (3, 18)
+        assert lateness == pytest.approx(5.1)
+        assert clock.next_t == 5.25
+
+    def test_copy_is_independent(self):
+        clock = display.FrameClock(0.0, 0.25)
+        clone = clock.copy()
+        clone.take(1.0)
+        assert clock.next_t == 0.0
+
+
+class TestTickStats:
+
+    def test_histogram_and_misses(self):
+        stats = display.TickStats("scroll")
+        for ms in (0.5, 3, 30, 5000):
+            stats.record(ms / 1000.0, dropped=0)
+        stats.record(0.0, dropped=4)
+        assert stats.counts[0] == 2 and stats.counts[-1] == 1
+        assert (stats.ticks, stats.late, stats.dropped) == (5, 2, 4)
+        line = stats.stats()
+        assert "late=2 (40.0% >20ms)" in line and ">1000:1" in line
+
+
+class TestRenderCursor:
+
+    def test_advance_drops_stale_ticks(self):
+        cursor = display.RenderCursor(0.0)
+        assert cursor.advance(0.0, 4, 100)
+        frame_s = display.FRAME_INTERVAL_MS / 1000.0
+        stats = display.TickStats("frame")
+        assert cursor.advance_frames(frame_s * 2 + 0.01, 4, stats)  # one tick missed
+        assert (cursor.anim_frame_idx, cursor.color_tick) == (2, 2)
+        assert (stats.ticks, stats.dropped) == (1, 1)
+        assert cursor.next_frame_t == frame_s * 3
+        assert not cursor.advance(cursor.next_event() - 0.001, 4, 100)
+
+    def test_ticker_wraps_to_right_edge(self):
+        cursor = display.RenderCursor(0.0)
+        cursor.text_x = -10
+        cursor.advance(0.0, 4, ticker_w=10)
+        assert cursor.text_x == display.DISPLAY_SIZE
+
+    def test_rotate_waits_for_swap_interval(self):
+        cursor = display.RenderCursor(0.0)
+        cursor.anim_frame_idx = 2
+        assert not cursor.rotate(display.CHARACTER_SWAP_SEC - 0.1, 2)
+        assert cursor.rotate(display.CHARACTER_SWAP_SEC, 2)
+        assert (cursor.display_idx, cursor.anim_frame_idx) == (1, 0)
+
+    def test_rotate_single_entry_only_resets_timer(self):
+        cursor = display.RenderCursor(0.0)
+        assert not cursor.rotate(display.CHARACTER_SWAP_SEC, 1)
+        assert cursor.display_idx == 0
+        assert cursor.last_char_swap_t == display.CHARACTER_SWAP_SEC
+
+    def test_sync_worker_resets_offset_on_new_agent(self):
+        cursor = display.RenderCursor(0.0)
+        cursor.sync_worker((0, "1", "name"), 80)
+        cursor.worker_scroll_offset = 5
+        cursor.sync_worker((0, "1", "name"), 80)
+        assert cursor.worker_scroll_offset == 5
+        cursor.sync_worker((1, "2", "other"), 30)
+        assert (cursor.worker_scroll_offset, cursor.worker_w) == (0, 30)
+
+
+class TestAgentViews:
+
+    def test_ingest_resolves_everything_frames_read(self, renderer):
+        raw = {"id": "7", "char": "grok", "task": "🦞 fix-login", "role": "QA", "status": "done"}
+        view = renderer.agent_views([raw], ["opus", "codex"])[0]
+        assert (view.char, view.name, view.label) == ("opus", "fix-login", "QA")
+        assert view.name_color == display.ROLE_COLORS["QA"]
+        assert view.label_color == (170, 133, 0)  # dimmed: neither active nor waiting
+        font = display.load_font(size=display.ICON_BAR_ROW1_FONT_SIZE)
+        assert view.name_w == display.text_bbox_size(font, "fix-login")[0]
+
+    def test_ticks_do_not_touch_raw_agents(self, renderer, monkeypatch):
+        state = _state(renderer)
+
+        def fail(text):
+            raise AssertionError("strip_emoji called on the tick path")
+
+        monkeypatch.setattr(display, "strip_emoji", fail)
+        specs = display.predict_specs(renderer, state, display.RenderCursor(0.0), 40, 1000.0)
+        assert {s.agent_idx for s in specs} == {0}
+
+
+class TestPredictSpecs:
+
+    def test_matches_live_ticks_across_rotation(self, renderer):
+        state = _state(renderer)
+        start = display.CHARACTER_SWAP_SEC - 0.5  # rotation happens inside the window
+        cursor = display.RenderCursor(start)
+        cursor.last_char_swap_t = 0.0
+        predicted = display.predict_specs(renderer, state, cursor, 20, 1000.0)
+        assert cursor.next_event() == start  # prediction works on a copy
+        assert predicted == _live_specs(renderer, state, cursor, 20, 1000.0)
+        assert {s.agent_idx for s in predicted} == {0, 1}
+
+    def test_timer_only_for_subagents(self, renderer):
+        state = _state(renderer)._replace(agents=(), display_list=(display._MAIN_ENTRY,))
+        spec = display.predict_specs(renderer, state, display.RenderCursor(0.0), 1, 2000.0)[0]
+        assert spec.is_main
+        assert (spec.agent_idx, spec.elapsed_s, spec.timer_color) == (-1, None, 0)
+
+
+class TestWithTimer:
+
+    def test_patched_payload_matches_full_compose(self, renderer):
+        state = _state(renderer)
+        spec = display.predict_specs(renderer, state, display.RenderCursor(0.0), 1, 1000.0 + 754.6)[0]
+        assert spec.elapsed_s is not None
+        full = display.compose_frame(
+            bg_frame=renderer.sprites.frame(spec.sprite, spec.anim_idx),
+            scroll_font=renderer._scroll_font,
+            ui_font=renderer._ui_font,
+            scroll_text=state.ticker,
+            scroll_x=spec.text_x,
+            agents=state.agents,
+            main_active=state.main_active,
+            elapsed_sec=spec.elapsed_s,
+            color_tick=spec.timer_color,
+            is_main=spec.is_main,
+            scroll_text_h=renderer._scroll_text_h,
+            current_agent=state.agents[spec.agent_idx],
+            worker_scroll_offset=spec.worker_offset,
+        )
+        patched = renderer.with_timer(renderer.render(spec, state), spec)
+        assert base64.b64decode(patched) == full.tobytes()
+
+    def test_no_timer_is_untouched(self, renderer):
+        spec = display.predict_specs(renderer, _state(renderer), display.RenderCursor(0.0), 1, 1000.0)[0]
+        payload = renderer.render(spec, _state(renderer))
+        assert renderer.with_timer(payload, spec._replace(elapsed_s=None)) is payload
+
+
+class _FakeConnection:
+    def __init__(self, replies, fail=None):
+        self.bodies = []
+        self._replies = replies
+        self._fail = fail
+
+    def request(self, method, url, body, headers):
+        if self._fail is not None:
+            raise self._fail
+        self.bodies.append(body)
+
+    def getresponse(self):
+        return io.BytesIO(json.dumps(self._replies.pop(0)).encode())
+
+    def close(self):
+        pass
+
+
+class TestFrameSender:
+
+    def test_send_posts_payload_verbatim(self):
+        sender = display.FrameSender("127.0.0.1")
+        sender._conn = _FakeConnection([{"error_code": 0, "PicId": 5}, {"error_code": 0}])
+        sender.connect()
+        sender.send(base64.b64encode(bytes(64 * 64 * 3)))
+        body = json.loads(sender._conn.bodies[-1])
+        assert body["Command"] == "Draw/SendHttpGif"
+        assert (body["PicID"], body["PicNum"], body["PicWidth"]) == (6, 1, 64)
+        assert base64.b64decode(body["PicData"]) == bytes(64 * 64 * 3)
+
+    def test_pic_id_resets_at_limit(self):
+        sender = display.FrameSender("127.0.0.1")
+        sender._conn = _FakeConnection([{"error_code": 0}, {"error_code": 0}])
+        sender._pic_id = display.GIF_ID_RESET_AT - 1
+        sender.send(b"AAAA")
+        assert json.loads(sender._conn.bodies[0])["Command"] == "Draw/ResetHttpGifId"
+        assert json.loads(sender._conn.bodies[1])["PicID"] == 1
+
+    def test_animation_shares_one_pic_id(self):
+        sender = display.FrameSender("127.0.0.1")
+        sender._conn = _FakeConnection([{"error_code": 0}] * 3)
+        sender.send_animation([b"AAAA", b"BBBB", b"CCCC"], 250)
+        bodies = [json.loads(b) for b in sender._conn.bodies]
+        assert [b["PicOffset"] for b in bodies] == [0, 1, 2]
+        assert {(b["PicID"], b["PicNum"], b["PicSpeed"]) for b in bodies} == {(1, 3, 250)}
+
+    def test_dropped_keep_alive_socket_is_retried_once(self):
+        sender = display.FrameSender("127.0.0.1")
+        sender._conn = _FakeConnection([], fail=http.client.RemoteDisconnected("closed"))
+        fresh = _FakeConnection([{"error_code": 0}])
+        sender._open = lambda: fresh
+        sender.send(b"AAAA")
+        assert json.loads(fresh.bodies[0])["PicData"] == "AAAA"
+
+    def test_fresh_connection_failure_is_not_retried(self):
+        sender = display.FrameSender("127.0.0.1")
+        opened = []
+        sender._open = lambda: opened.append(1) or _FakeConnection([], fail=BrokenPipeError())
+        with pytest.raises(BrokenPipeError):
+            sender.send(b"AAAA")
+        assert len(opened) == 1
+
+    def test_device_error_raises(self):
+        sender = display.FrameSender("127.0.0.1")
+        sender._conn = _FakeConnection([{"error_code": 1}])
+        with pytest.raises(RuntimeError):
+            sender.send(b"AAAA")
+
+
+class TestRenderAhead:
+
+    def test_predicted_frame_is_taken_from_buffer(self, renderer):
+        state = _state(renderer)
+        cursor = display.RenderCursor(0.0)
+        ahead = display.RenderAhead(renderer, depth=4)
+        try:
+            ahead.refill(state, cursor, 0.0, 1000.0)
+            ahead._job.result(timeout=10)
+            spec = _live_specs(renderer, state, cursor, 1, 1000.0)[0]
+            assert ahead.take(spec) == renderer.render(spec.untimed(), state)
+            assert ahead.take(spec._replace(text_x=-999)) is None
+            assert (ahead.hits, ahead.misses) == (1, 1)
+        finally:
+            ahead.close()
+
+    def test_stable_state_caches_whole_loop(self, renderer, monkeypatch):
+        monkeypatch.setattr(display, "LOOP_STABLE_SEC", 0.0)
+        state = _state(renderer)._replace(
+            agents=(), display_list=(display._MAIN_ENTRY,), ticker="", ticker_w=0,
+        )
+        cursor = display.RenderCursor(0.0)
+        ahead = display.RenderAhead(renderer, depth=4)
+        try:
+            ahead.refill(state, cursor, 0.0, 1000.0)
+            ahead._job.result(timeout=30)
+            assert ahead._loop_closed
+            job = ahead._job
+            ahead.refill(state, cursor, 1.0, 1001.0)
+            assert ahead._job is job  # nothing left to render for this state
+            specs = _live_specs(renderer, state, cursor, 200, 1000.0)
+            assert all(ahead.take(s) is not None for s in specs)
+        finally:
+            ahead.close()
+
+    def test_stale_generation_is_dropped(self, renderer):
+        ahead = display.RenderAhead(renderer, depth=2)
+        try:
+            old = _state(renderer, generation=1)
+            ahead.refill(old, display.RenderCursor(0.0), 0.0, 1000.0)
+            ahead._job.result(timeout=10)
+            ahead.refill(_state(renderer, generation=2), display.RenderCursor(0.0), 0.0, 1000.0)
+            ahead._job.result(timeout=10)
+            assert {s.generation for s in ahead._frames} == {2}
+        finally:
+            ahead.close()
@@ -5,7 +5,11 @@ build_agents, sanitize_output, extract_scroll_text, and tmux
 window add/remove/restart scenarios.
 """
 
+import io
+import subprocess
+import threading
 import time
+from pathlib import Path
 
 import pytest
 
@@ -156,31 +160,31 @@ class TestDetermineStatus:
     def test_first_observation_is_active(self):
         outputs, times = {}, {}
         assert sync.determine_status("hello", "w0", outputs, times, 100.0) == "active"
-        assert outputs["w0"] == "hello"
+        assert outputs["w0"] == sync.output_digest("hello")
 
     def test_same_output_stays_active_within_threshold(self):
-        outputs = {"w0": "hello"}
+        outputs = {"w0": sync.output_digest("hello")}
         times = {"w0": 100.0}
         assert sync.determine_status("hello", "w0", outputs, times, 110.0) == "active"
 
     def test_same_output_becomes_waiting_after_threshold(self):
-        outputs = {"w0": "hello"}
+        outputs = {"w0": sync.output_digest("hello")}
         times = {"w0": 100.0}
         after_threshold = 100.0 + sync.WAITING_THRESHOLD_SEC + 1
         assert sync.determine_status("hello", "w0", outputs, times, after_threshold) == "waiting"
 
     def test_same_output_becomes_waiting_at_exact_threshold(self):
         """Boundary: exactly at WAITING_THRESHOLD_SEC should be waiting (>= not >)."""
-        outputs = {"w0": "hello"}
+        outputs = {"w0": sync.output_digest("hello")}
         times = {"w0": 100.0}
         exactly_threshold = 100.0 + sync.WAITING_THRESHOLD_SEC
         assert sync.determine_status("hello", "w0", outputs, times, exactly_threshold) == "waiting"
 
     def test_output_change_resets_to_active(self):
-        outputs = {"w0": "hello"}
+        outputs = {"w0": sync.output_digest("hello")}
         times = {"w0": 50.0}
         assert sync.determine_status("world", "w0", outputs, times, 200.0) == "active"
-        assert outputs["w0"] == "world"
+        assert outputs["w0"] == sync.output_digest("world")
         assert times["w0"] == 200.0
 
     def test_error_detected_in_output(self):
@@ -216,7 +220,7 @@ class TestDetermineStatus:
 
         # t=0: error output
         sync.determine_status("error found", "w0", outputs, times, 0.0)
-        assert outputs["w0"] == "error found"
+        assert outputs["w0"].digest == sync.output_digest("error found").digest
 
         # t=3: same error, no diff → times stays at 0.0
         result = sync.determine_status("error found", "w0", outputs, times, 3.0)
@@ -226,7 +230,7 @@ class TestDetermineStatus:
         # t=6: error clears, new output
         result = sync.determine_status("all clear", "w0", outputs, times, 6.0)
         assert result == "active"
-        assert outputs["w0"] == "all clear"
+        assert outputs["w0"] == sync.output_digest("all clear")
         assert times["w0"] == 6.0
 
         # t=40: output still "all clear" → should be waiting (6+30 < 40)
@@ -255,6 +259,68 @@ class TestDetermineStatus:
         result = sync.determine_status("ok now", "w0", outputs, times, 95.0)
         assert result == "waiting"
 
+    def test_diff_state_is_digest_plus_tail(self):
+        outputs, times = {}, {}
+        big = "\n".join(f"line {i}" for i in range(500))
+        sync.determine_status(big, "w0", outputs, times, 100.0)
+        assert outputs["w0"].tail == tuple(f"line {i}" for i in range(495, 500))
+        assert len(outputs["w0"].digest) == 16
+
+    def test_change_outside_tail_still_detected(self):
+        """Only the tail is kept, but the digest covers the whole capture."""
+        outputs, times = {}, {}
+        before = "header A\n" + "\n".join(["same"] * 10)
+        after = "header B\n" + "\n".join(["same"] * 10)
+        sync.determine_status(before, "w0", outputs, times, 100.0)
+        assert sync.determine_status(after, "w0", outputs, times, 200.0) == "active"
+        assert times["w0"] == 200.0
+
+    def test_stale_error_line_decays(self):
+        """An old error that just stays on screen stops counting after the decay."""
+        outputs, times = {}, {}
+        screen = "Error: build broke\n$ "
+        assert sync.determine_status(screen, "w0", outputs, times, 0.0) == "error"
+        screen += "ls\nREADME.md\n$ "
+        assert sync.determine_status(screen, "w0", outputs, times, 10.0) == "error"
+        later = sync.ERROR_DECAY_SEC + 1
+        screen += "git status\n$ "
+        assert sync.determine_status(screen, "w0", outputs, times, later) == "active"
+
+    def test_only_new_lines_are_scanned(self):
+        outputs, times = {}, {}
+        rules = sync.ErrorRules(sync.ERROR_PATTERN_RE, 5.0)
+        screen = "Traceback (most recent call last):\nok\n$ "
+        sync.determine_status(screen, "w0", outputs, times, 0.0, rules)
+        screen += "echo\n$ "
+        assert sync.determine_status(screen, "w0", outputs, times, 10.0, rules) == "active"
+        screen += "make\nmake: *** [all] Error 2\n$ "
+        assert sync.determine_status(screen, "w0", outputs, times, 11.0, rules) == "error"
+        assert outputs["w0"].error_line == "make: *** [all] Error 2"
+
+    def test_repeated_prompt_does_not_hide_new_error(self):
+        outputs, times = {}, {}
+        sync.determine_status("a\nb\n$", "w0", outputs, times, 0.0)
+        assert sync.determine_status("a\nb\n$\nFAILED x\n$", "w0", outputs, times, 100.0) == "error"
+
+    def test_error_patterns_from_config(self):
+        rules = sync.error_rules({"error_patterns": ["npm ERR!", "[broken"], "error_decay_sec": 5})
+        assert rules.decay == 5.0
+        assert rules.matcher.search("npm ERR! code ELIFECYCLE")
+        assert rules.matcher.search("Traceback (most recent call last):")
+        outputs, times = {}, {}
+        assert sync.determine_status("npm ERR! missing", "w0", outputs, times, 0.0, rules) == "error"
+        assert sync.determine_status("npm ERR! missing", "w0", outputs, times, 6.0, rules) != "error"
+
+    def test_error_rules_defaults_for_bad_config(self):
+        assert sync.error_rules({}) == sync.DEFAULT_ERROR_RULES
+        rules = sync.error_rules({"error_patterns": "x", "error_decay_sec": -1})
+        assert rules == sync.DEFAULT_ERROR_RULES
+
+    def test_new_lines_after_in_place_rewrite(self):
+        prev = ("a", "b", "spinner 1s")
+        assert sync.new_lines(prev, ["a", "b", "spinner 2s", "c"]) == ["spinner 2s", "c"]
+        assert sync.new_lines(prev, ["x", "y"]) == ["x", "y"]
+
 
 # ── build_agents ────────────────────────────────────────────────
 
@@ -422,3 +488,588 @@ class TestAltScreen:
         # Should not update tracking dicts
         assert "w0" not in outputs
         assert "w0" not in times
+
+
+# ── Batched list-panes query ────────────────────────────────────
+
+def _pane_line(idx, name, pane_index=0, pane_id=None, activity=1000, history=10, cursor="0,5"):
+    pane_id = pane_id or f"%{idx * 10 + pane_index}"
+    return "\t".join([str(idx), name, "4242", str(pane_index), pane_id,
+                      str(activity), str(history), cursor])
+
+
+class _FakeRun:
+    """Stands in for subprocess.run; records every tmux invocation."""
+
+    def __init__(self, list_panes_stdout="", captures=None):
+        self.list_panes_stdout = list_panes_stdout
+        self.captures = captures or {}
+        self.calls: list[list[str]] = []
+
+    def __call__(self, args, **kwargs):
+        self.calls.append(args)
+        if args[1] == "list-panes":
+            return subprocess.CompletedProcess(args, 0, self.list_panes_stdout, "")
+        target = args[args.index("-t") + 1]
+        out = self.captures.get(target, "")
+        if callable(out):
+            out = out()  # e.g. a tmux call that hangs
+        return subprocess.CompletedProcess(args, 0, out, "")
+
+    def count(self, command):
+        return sum(1 for c in self.calls if c[1] == command)
+
+
+@pytest.fixture
+def poll_state():
+    """Diff / capture / cadence tables main() keeps between fallback polling cycles."""
+    return {"first_seen": {}, "captures": {}, "outputs": {}, "times": {}, "cadence": {}}
+
+
+class TestBatchedQuery:
+    """One list-panes per cycle; capture-pane only for panes that moved."""
+
+    def test_list_panes_keeps_lowest_pane_per_window(self, monkeypatch):
+        fake = _FakeRun("\n".join([
+            _pane_line(1, "a-impl", pane_index=1, pane_id="%11"),
+            _pane_line(1, "a-impl", pane_index=0, pane_id="%10", activity=1234, history=77),
+            _pane_line(2, "b-review"),
+        ]) + "\n")
+        monkeypatch.setattr(sync.subprocess, "run", fake)
+        windows = sync.get_tmux_windows()
+        assert [w["window_index"] for w in windows] == [1, 2]
+        assert windows[0]["pane_id"] == "%10"
+        assert windows[0]["activity"] == 1234
+        assert windows[0]["history_size"] == 77
+        assert fake.count("list-panes") == 1
+
+    def test_capture_is_bounded_around_cursor(self, monkeypatch, poll_state):
+        fake = _FakeRun(_pane_line(1, "a-impl", cursor="4,30"), captures={"%10": "x\n"})
+        self._cycle(monkeypatch, fake, poll_state, 1003.0)
+        capture = [c for c in fake.calls if c[1] == "capture-pane"][0]
+        assert capture[capture.index("-S") + 1] == str(30 - sync.CAPTURE_TAIL_ROWS)
+        assert capture[capture.index("-E") + 1] == "-"
+
+    def test_capture_range_without_cursor_is_full_pane(self):
+        assert sync.capture_range(None) == []
+        assert sync.capture_range("") == []
+
+    def test_list_panes_failure_returns_none(self, monkeypatch):
+        monkeypatch.setattr(
+            sync.subprocess, "run",
+            lambda args, **kw: subprocess.CompletedProcess(args, 1, "", "no session"),
+        )
+        assert sync.get_tmux_windows() is None
+
+    def _cycle(self, monkeypatch, fake, state, now):
+        monkeypatch.setattr(sync.subprocess, "run", fake)
+        windows = sync.get_tmux_windows()
+        agents, _ = sync.build_agents(windows, {}, state["first_seen"])
+        n = sync.enrich_with_capture(
+            agents, windows, state["captures"],
+            state["outputs"], state["times"], now,
+            deadline=sync.CAPTURE_DEADLINE_SEC,
+        )
+        return agents, n
+
+    def test_unchanged_panes_are_not_recaptured(self, monkeypatch, poll_state):
+        fake = _FakeRun(
+            _pane_line(1, "a-impl", activity=1000) + "\n" + _pane_line(2, "b-impl", activity=1000),
+            captures={"%10": "building...\n", "%20": "idle $\n"},
+        )
+        _, n = self._cycle(monkeypatch, fake, poll_state, 1003.0)
+        assert n == 2
+
+        # Only window 2 produced output since the last cycle
+        fake.list_panes_stdout = (
+            _pane_line(1, "a-impl", activity=1000) + "\n"
+            + _pane_line(2, "b-impl", activity=1005, history=11)
+        )
+        fake.captures["%20"] = "idle $\nls\n"
+        agents, n = self._cycle(monkeypatch, fake, poll_state, 1006.0)
+        assert n == 1
+        assert [c[c.index("-t") + 1] for c in fake.calls if c[1] == "capture-pane"][-1] == "%20"
+        assert agents[0]["scroll_text"] == "building..."
+        assert agents[1]["scroll_text"] == "ls"
+
+    def test_quiet_pane_still_ages_into_waiting(self, monkeypatch, poll_state):
+        fake = _FakeRun(_pane_line(1, "a-impl", activity=1000), captures={"%10": "done\n"})
+        self._cycle(monkeypatch, fake, poll_state, 1003.0)
+        agents, n = self._cycle(monkeypatch, fake, poll_state, 1003.0 + sync.WAITING_THRESHOLD_SEC)
+        assert n == 0
+        assert agents[0]["status"] == "waiting"
+
+    def test_activity_in_capture_second_is_rechecked(self, monkeypatch, poll_state):
+        """window_activity has 1s resolution — output later in the same second must not be lost."""
+        fake = _FakeRun(_pane_line(1, "a-impl", activity=1003), captures={"%10": "a\n"})
+        self._cycle(monkeypatch, fake, poll_state, 1003.2)
+        _, n = self._cycle(monkeypatch, fake, poll_state, 1006.0)
+        assert n == 1
+        _, n = self._cycle(monkeypatch, fake, poll_state, 1009.0)
+        assert n == 0
+
+    def test_hung_capture_keeps_previous_status_within_deadline(self, monkeypatch, poll_state):
+        fake = _FakeRun(
+            _pane_line(1, "a-impl", activity=1000) + "\n" + _pane_line(2, "b-impl", activity=1000),
+            captures={"%10": "Traceback here\n", "%20": "ok\n"},
+        )
+        agents, _ = self._cycle(monkeypatch, fake, poll_state, 1003.0)
+        assert agents[0]["status"] == "error"
+
+        release = threading.Event()
+        fake.captures["%10"] = lambda: (release.wait(5), "recovered\n")[1]
+        fake.captures["%20"] = "ok\nnext\n"
+        fake.list_panes_stdout = (
+            _pane_line(1, "a-impl", activity=1005) + "\n" + _pane_line(2, "b-impl", activity=1005)
+        )
+        monkeypatch.setattr(sync, "CAPTURE_DEADLINE_SEC", 0.2)
+        start = time.monotonic()
+        agents, n = self._cycle(monkeypatch, fake, poll_state, 1006.0)
+        assert time.monotonic() - start < 1.0
+        assert n == 1
+        assert agents[0]["status"] == "error"          # kept from last cycle
+        assert agents[0]["scroll_text"] == "Traceback here"
+        assert agents[1]["scroll_text"] == "next"
+
+        # Still hung: no second capture is stacked on top of it
+        calls = fake.count("capture-pane")
+        self._cycle(monkeypatch, fake, poll_state, 1009.0)
+        assert fake.count("capture-pane") == calls
+
+        release.set()
+        poll_state["captures"]["1"]["pending"].result(timeout=5)
+        agents, _ = self._cycle(monkeypatch, fake, poll_state, 1012.0)
+        assert agents[0]["scroll_text"] == "recovered"
+        assert agents[0]["status"] == "active"
+
+    def test_new_window_missing_deadline_uses_defaults(self, monkeypatch, poll_state):
+        release = threading.Event()
+        fake = _FakeRun(_pane_line(1, "a-impl"), captures={"%10": lambda: (release.wait(5), "x\n")[1]})
+        monkeypatch.setattr(sync, "CAPTURE_DEADLINE_SEC", 0.1)
+        agents, n = self._cycle(monkeypatch, fake, poll_state, 1003.0)
+        release.set()
+        assert n == 0
+        assert agents[0]["status"] == "active"
+        assert agents[0]["scroll_text"] == ""
+
+    def test_removed_window_drops_cached_capture(self, monkeypatch, poll_state):
+        fake = _FakeRun(_pane_line(1, "a-impl") + "\n" + _pane_line(2, "b-impl"))
+        self._cycle(monkeypatch, fake, poll_state, 1003.0)
+        fake.list_panes_stdout = _pane_line(2, "b-impl")
+        self._cycle(monkeypatch, fake, poll_state, 1006.0)
+        assert set(poll_state["captures"]) == {"2"}
+
+
+# ── tmux control mode ───────────────────────────────────────────
+
+def _control_client():
+    """A ControlModeClient without a tmux process — commands go to a buffer."""
+    client = sync.ControlModeClient()
+    client._stdin = io.BytesIO()
+    return client
+
+
+def _sent(client):
+    return client._stdin.getvalue().decode().splitlines()
+
+
+def _reply(lines, n=1, flags=1):
+    body = "".join(f"{line}\n" for line in lines)
+    return f"%begin 1700000000 {n} {flags}\n{body}%end 1700000000 {n} {flags}\n".encode()
+
+
+def _attached(now=1000.0):
+    """Client that has received the window list and pane snapshots."""
+    client = _control_client()
+    client.refresh_windows()
+    client.feed(_reply([
+        "@1\t0\ta-impl\t100\t0\t%1\t0\t2\t80\t24",
+        "@1\t0\ta-impl\t101\t1\t%4\t0\t0\t80\t24",   # second pane of window 0 — ignored
+        "@2\t1\tmonitor\t200\t0\t%2\t2\t0\t80\t24",
+    ]), now)
+    client.feed(_reply(["$ make", "compiling"], n=2), now)
+    client.feed(_reply(["$ "], n=3), now)
+    return client
+
+
+class TestControlMode:
+    """Push-based updates from `tmux -C` notifications."""
+
+    def test_decode_control_output(self):
+        assert sync.decode_control_output(rb"ok\015\012back\134slash") == b"ok\r\nback\\slash"
+
+    @pytest.mark.parametrize("out, flags", [
+        ("tmux 3.3a\n", ["-f", "read-only,ignore-size"]),
+        ("tmux next-3.4\n", ["-f", "read-only,ignore-size"]),
+        ("tmux master\n", ["-f", "read-only,ignore-size"]),
+        ("tmux 3.0a\n", ["-r"]),
+    ])
+    def test_attach_flags_follow_tmux_version(self, monkeypatch, out, flags):
+        monkeypatch.setattr(sync, "_tmux_version", None)
+        monkeypatch.setattr(sync.subprocess, "run",
+                            lambda args, **kw: subprocess.CompletedProcess(args, 0, out, ""))
+        started = []
+
+        class _Proc:
+            stdin = io.BytesIO()
+
+        monkeypatch.setattr(sync.subprocess, "Popen", lambda args, **kw: started.append(args) or _Proc())
+        assert sync.ControlModeClient().start()
+        assert started[0][-len(flags):] == flags and started[0][:3] == ["tmux", "-C", "attach-session"]
+
+    def test_version_probe_failure_is_retried(self, monkeypatch):
+        monkeypatch.setattr(sync, "_tmux_version", None)
+        results = iter([OSError("no tmux"), "tmux 3.3a\n"])
+
+        def run(args, **kw):
+            r = next(results)
+            if isinstance(r, Exception):
+                raise r
+            return subprocess.CompletedProcess(args, 0, r, "")
+
+        monkeypatch.setattr(sync.subprocess, "run", run)
+        assert sync.tmux_version() is None
+        assert sync.tmux_version() == (3, 3)
+        assert sync.tmux_version() == (3, 3)  # cached — no third `tmux -V`
+
+    def test_failed_attach_backs_off_instead_of_disabling(self):
+        retry = sync.ControlRetry(True)
+        assert retry.due(0.0)
+        delays = [retry.failed(t) for t in (0.0, 100.0, 200.0)]
+        assert delays == [sync.POLL_SEC, sync.POLL_SEC * 2, sync.POLL_SEC * 4]
+        assert not retry.due(200.0 + delays[-1] - 0.1) and retry.due(200.0 + delays[-1])
+        for _ in range(20):
+            retry.failed(0.0)
+        assert retry.backoff == sync.CONTROL_RETRY_MAX_SEC
+        assert retry.cap(15.0, retry.next_at - 2.0) == 2.0  # polling wakes for the retry
+        retry.attached()
+        assert retry.due(0.0) and retry.backoff == sync.POLL_SEC
+        assert not sync.ControlRetry(False).due(1e9)
+
+    def test_attach_block_is_not_a_reply(self):
+        client = _control_client()
+        client.refresh_windows()
+        client.feed(b"%begin 1 0 0\n%end 1 0 0\n%session-changed $0 shared\n", 1000.0)
+        assert not client.ready
+        client.feed(_reply(["@1\t0\ta-impl\t100\t0\t%1\t0\t2\t80\t24"]), 1000.0)
+        assert client.ready
+        assert [w["window_name"] for w in client.window_list()] == ["a-impl"]
+
+    def test_window_list_seeds_pane_zero_only(self):
+        client = _attached()
+        assert set(client.tails) == {"%1", "%2"}
+        assert [line for line in _sent(client) if line.startswith("capture-pane")] == [
+            "capture-pane -p -t %1", "capture-pane -p -t %2",
+        ]
+        assert client.tails["%1"].text() == "$ make\ncompiling"
+
+    def test_output_updates_tail_and_marks_changed(self):
+        client = _attached()
+        client.changed = False
+        client.feed(b"%output %1 \\015\\012done \\033[32mok\\033[0m\\015\\012$ \n", 1010.0)
+        assert client.changed
+        assert client.tails["%1"].last_output == 1010.0
+        assert client.tails["%1"].text().endswith("done ok\n$")
+        # a bare prompt has nothing to read — the last real line scrolls instead
+        assert sync.extract_scroll_text(client.tails["%1"].text()) == "done ok"
+
+    def test_output_for_untracked_pane_is_ignored(self):
+        client = _attached()
+        client.changed = False
+        client.feed(b"%output %4 noise\\015\\012\n", 1010.0)
+        assert not client.changed
+
+    def test_split_utf8_and_carriage_return(self):
+        tail = sync.PaneTail(1000.0)
+        data = "進捗 10%\r進捗 90%\r\n".encode()
+        tail.feed(data[:4], 1000.0)
+        tail.feed(data[4:], 1001.0)
+        assert tail.text() == "進捗 90%"
+
+    def test_partial_lines_are_joined_across_notifications(self):
+        client = _attached()
+        client.feed(b"%output %2 hel\n%output %2 lo\\015\\012\n", 1010.0)
+        assert client.tails["%2"].text() == "$ hello"  # continues the seeded prompt line
+
+    def test_window_rename_updates_name(self):
+        client = _attached()
+        client.feed(b"%window-renamed @1 b-review\n", 1010.0)
+        agents, _ = sync.control_mode_agents(client, {}, {}, 1010.0)
+        assert agents[0]["task"] == "b-review"
+        assert agents[0]["role"] == "QA"
+
+    def test_window_add_and_close_requery(self):
+        client = _attached()
+        before = len(_sent(client))
+        client.feed(b"%window-add @3\n%unlinked-window-close @2\n", 1010.0)
+        assert [line.split()[0] for line in _sent(client)[before:]] == ["list-panes", "list-panes"]
+        client.feed(_reply(["@1\t0\ta-impl\t100\t0\t%1\t0\t2\t80\t24"], n=4), 1010.0)
+        client.feed(_reply(["@1\t0\ta-impl\t100\t0\t%1\t0\t2\t80\t24"], n=5), 1010.0)
+        assert set(client.tails) == {"%1"}
+
+    def test_status_from_output_age(self):
+        client = _attached(now=1000.0)
+        agents, main_active = sync.control_mode_agents(client, {}, {}, 1001.0)
+        assert main_active
+        assert agents[0]["status"] == "active"
+        assert client.next_transition(1001.0) == 1000.0 + sync.WAITING_THRESHOLD_SEC
+        later = 1000.0 + sync.WAITING_THRESHOLD_SEC
+        agents, _ = sync.control_mode_agents(client, {}, {}, later)
+        assert agents[0]["status"] == "waiting"
+
+    def test_error_output_sets_error(self):
+        client = _attached()
+        client.feed(b"%output %1 Traceback (most recent call last):\\015\\012\n", 1010.0)
+        agents, _ = sync.control_mode_agents(client, {}, {}, 1010.0)
+        assert agents[0]["status"] == "error"
+
+    def test_error_decays_and_wakes_publisher(self):
+        client = _attached()
+        client.feed(b"%output %1 FAILED test_x\\015\\012\n", 1010.0)
+        agents, _ = sync.control_mode_agents(client, {"error_decay_sec": 5}, {}, 1010.0)
+        assert agents[0]["status"] == "error"
+        assert client.next_transition(1010.0, 5.0) == 1015.0
+        agents, _ = sync.control_mode_agents(client, {"error_decay_sec": 5}, {}, 1015.0)
+        assert agents[0]["status"] == "active"
+
+    def test_visible_state_ignores_last_seen(self):
+        a = [{"id": "0", "task": "t", "role": "DEV", "status": "active",
+              "scroll_text": "x", "last_seen": 1.0}]
+        b = [dict(a[0], last_seen=2.0)]
+        assert sync.visible_state(a, False) == sync.visible_state(b, False)
+
+
+# ── TermScreen (VT100 screen model) ─────────────────────────────
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _replay(name):
+    """Feed a recorded %output stream (tests/fixtures/tui-synthetic-*.out) into a TermScreen."""
+    screen = None
+    for line in (FIXTURES / f"{name}.out").read_bytes().split(b"\n"):
+        if line.startswith(b"# size "):
+            width, height = map(int, line[7:].split(b"x"))
+            screen = sync.TermScreen(width, height)
+        elif line.startswith(b"%output "):
+            payload = line.split(b" ", 2)[2]
+            screen.feed(sync.decode_control_output(payload).decode())
+    return screen
+
+
+class TestTermScreen:
+    """Incremental terminal model used for control-mode pane output."""
+
+    # tui_demo.py の Ink / ratatui 風再描画を実 tmux で録画したもの（実アプリの出力ではない）
+    @pytest.mark.parametrize("name", ["tui-synthetic-claude", "tui-synthetic-codex"])
+    def test_recorded_tui_matches_tmux_screen(self, name):
+        screen = _replay(name)
+        want = (FIXTURES / f"{name}.screen").read_text().rstrip("\n").split("\n")
+        got = ["".join(row).rstrip() for row in screen.rows][:len(want)]
+        assert got == [line.rstrip() for line in want]
+
+    @pytest.mark.parametrize("name, status", [
+        ("tui-synthetic-claude", "Thinking…"),
+        ("tui-synthetic-codex", "Working ("),
+    ])
+    def test_recorded_tui_scroll_text_is_status_line(self, name, status):
+        assert status in sync.extract_scroll_text(_replay(name).text())
+
+    def test_cursor_up_redraw_replaces_lines(self):
+        screen = sync.TermScreen(40, 5)
+        screen.feed("step 1\r\nstatus: a")
+        screen.feed("\x1b[2K\x1b[1A\x1b[2K\x1b[Gstep 2\r\nstatus: b")
+        assert screen.text() == "step 2\nstatus: b"
+
+    def test_escape_split_across_chunks(self):
+        screen = sync.TermScreen(40, 5)
+        screen.feed("red \x1b[3")
+        screen.feed("1mtext\x1b]0;ti")
+        screen.feed("tle\x07!")
+        assert screen.text() == "red text!"
+
+    def test_wide_chars_take_two_cells(self):
+        screen = sync.TermScreen(10, 2)
+        screen.feed("日本語ab\x1b[3Gx")
+        assert screen.text() == "日x語ab"
+
+    @pytest.mark.parametrize("count", [2, 999999999])
+    def test_insert_chars_is_clamped_to_row(self, count):
+        screen = sync.TermScreen(10, 2)
+        screen.feed(f"abcdef\x1b[3G\x1b[{count}@x")
+        assert screen.text() == ("abx cdef" if count == 2 else "abx")
+        assert all(len(row) == 10 for row in screen.rows)
+
+    def test_scrolled_lines_go_to_history(self):
+        screen = sync.TermScreen(20, 3, history=2)
+        screen.feed("\r\n".join(f"line {i}" for i in range(6)))
+        assert screen.lines() == [f"line {i}" for i in range(1, 6)]
+
+    def test_alt_screen_restores_main(self):
+        screen = sync.TermScreen(20, 3)
+        screen.feed("$ vim\r\n")
+        screen.feed("\x1b[?1049h\x1b[Hediting\x1b[?1049l")
+        assert screen.text() == "$ vim"
+
+    def test_resize_keeps_cursor_rows(self):
+        screen = sync.TermScreen(20, 4)
+        screen.feed("a\r\nb\r\nc\r\nd")
+        screen.resize(10, 2)
+        assert screen.lines() == ["a", "b", "c", "d"]
+        assert (screen.width, screen.height) == (10, 2)
+
+    @pytest.mark.parametrize("height", [10, 3])
+    def test_resize_during_alt_screen_resizes_main(self, height):
+        screen = sync.TermScreen(20, 5)
+        screen.feed("hello\r\n\x1b[?1049hediting\r\n")
+        screen.resize(20, height)
+        screen.feed("\x1b[?1049l")
+        assert len(screen.rows) == height
+        screen.feed("".join(f"l{i}\r\n" for i in range(12)))
+        lines = screen.lines()
+        assert lines[-1] == "l11" and "editing" not in lines
+        assert len(screen.rows) == height and all(len(row) == 20 for row in screen.rows)
+
+    def test_sanitize_plain_text_is_untouched(self):
+        raw = "plain\tcapture\n"
+        assert sync.sanitize_output(raw) is raw
+
+    def test_sanitize_applies_carriage_return(self):
+        assert sync.sanitize_output("50%\r90% done\nnext") == "90% done\nnext"
+
+    def test_scroll_text_skips_frames_and_input_box(self):
+        captured = "\n".join([
+            "⏺ Bash(pytest)",
+            "✻ Running tests…",
+            "╭────────╮",
+            "│ >      │",
+            "╰────────╯",
+            "  ? for shortcuts",
+        ])
+        assert sync.extract_scroll_text(captured) == "✻ Running tests…"
+        assert sync.extract_scroll_text("result\n────────\n") == "result"
+
+
+# ── Adaptive polling cadence ────────────────────────────────────
+
+class TestPollCadence:
+    """Per-window backoff for the capture-pane fallback loop."""
+
+    @staticmethod
+    def _plan(status, cadence, now, change_time):
+        agents = [{"window_index": 1, "status": status}]
+        return sync.plan_next_poll(agents, {}, {"1": change_time}, cadence, now)
+
+    @staticmethod
+    def _cycle(fake, state, now):
+        """One main() fallback cycle; returns the delay main() would sleep."""
+        windows = sync.get_tmux_windows()
+        agents, _ = sync.build_agents(windows, {}, state["first_seen"])
+        sync.enrich_with_capture(agents, windows, state["captures"], state["outputs"],
+                                 state["times"], now, cadence=state["cadence"])
+        return sync.plan_next_poll(agents, state["outputs"], state["times"], state["cadence"], now)
+
+    def test_changed_output_polls_fast(self):
+        cadence = {}
+        assert self._plan("active", cadence, 100.0, change_time=100.0) == sync.POLL_FAST_SEC
+        assert cadence["1"] == (sync.POLL_FAST_SEC, 100.0 + sync.POLL_FAST_SEC)
+
+    def test_quiet_window_backs_off_to_cap(self):
+        cadence = {}
+        self._plan("active", cadence, 100.0, change_time=100.0)
+        intervals = []
+        for _ in range(6):
+            now = cadence["1"][1]
+            self._plan("active", cadence, now, change_time=100.0)
+            intervals.append(cadence["1"][0])
+        assert intervals == [2.0, 4.0, 8.0, sync.POLL_MAX_SEC, sync.POLL_MAX_SEC, sync.POLL_MAX_SEC]
+
+    def test_waiting_window_jumps_to_cap(self):
+        cadence = {"1": (sync.POLL_FAST_SEC, 100.0)}
+        self._plan("waiting", cadence, 100.0, change_time=0.0)
+        assert cadence["1"] == (sync.POLL_MAX_SEC, 100.0 + sync.POLL_MAX_SEC)
+
+    def test_not_yet_due_keeps_interval(self):
+        cadence = {"1": (8.0, 110.0)}
+        assert self._plan("active", cadence, 105.0, change_time=100.0) == sync.POLL_PROBE_SEC
+        assert cadence["1"] == (8.0, 110.0)
+
+    def test_sleep_never_exceeds_probe_interval(self):
+        cadence = {"1": (sync.POLL_MAX_SEC, 200.0)}
+        assert self._plan("waiting", cadence, 190.0, change_time=0.0) == sync.POLL_PROBE_SEC
+
+    def test_wakes_for_waiting_transition(self):
+        cadence = {"1": (sync.POLL_MAX_SEC, 200.0)}
+        change = 100.0
+        now = change + sync.WAITING_THRESHOLD_SEC - 1
+        assert self._plan("active", cadence, now, change_time=change) == pytest.approx(1.0)
+
+    def test_wakes_for_error_decay(self):
+        cadence = {"1": (sync.POLL_MAX_SEC, 200.0)}
+        agents = [{"window_index": 1, "status": "error"}]
+        state = sync.output_digest("x")._replace(error_at=100.0, error_line="x")
+        delay = sync.plan_next_poll(agents, {"1": state}, {}, cadence, 103.0, decay=3.5)
+        assert delay == pytest.approx(0.5)
+
+    def test_capture_waits_for_due_unless_backed_off_window_moves(self):
+        entry = {"signature": ("%1", 900, 0, "0,0"), "at": 900.0}
+        moved = {"pane_id": "%1", "activity": 950, "history_size": 0, "cursor": "0,0"}
+        assert sync.capture_due(moved, entry, (sync.POLL_MAX_SEC, 960.0), 950.5)  # activity snaps back
+        assert not sync.capture_due(moved, entry, (sync.POLL_FAST_SEC, 951.0), 950.5)  # fast: its turn next
+        assert sync.capture_due(moved, entry, (sync.POLL_FAST_SEC, 951.0), 951.0)
+        no_activity = dict(moved, activity=0)
+        assert not sync.capture_due(no_activity, entry, (8.0, 960.0), 950.5)
+
+    def test_active_window_is_captured_fast_idle_one_is_not(self, monkeypatch, poll_state):
+        """One window streams output, the other is idle — captures follow each window's cadence."""
+        tick = {"n": 0}
+
+        def busy_output():
+            tick["n"] += 1
+            return f"step {tick['n']}\n"
+
+        fake = _FakeRun(captures={"%10": busy_output, "%20": "$\n"})
+        monkeypatch.setattr(sync.subprocess, "run", fake)
+        now, gaps = 1000.0, []
+        while now < 1060.0:
+            # a-impl 側は毎秒 activity が進む、b-impl は最初から静か
+            fake.list_panes_stdout = (
+                _pane_line(1, "a-impl", pane_id="%10", activity=int(now)) + "\n"
+                + _pane_line(2, "b-impl", pane_id="%20", activity=900) + "\n"
+            )
+            delay = self._cycle(fake, poll_state, now)
+            gaps.append(delay)
+            now += delay
+        busy = sum(1 for c in fake.calls if c[1] == "capture-pane" and "%10" in c)
+        idle = sum(1 for c in fake.calls if c[1] == "capture-pane" and "%20" in c)
+        assert busy >= 60 / sync.POLL_FAST_SEC - 2
+        assert idle == 1
+        assert poll_state["cadence"]["1"][0] == sync.POLL_FAST_SEC
+        assert poll_state["cadence"]["2"][0] == sync.POLL_MAX_SEC
+        assert max(gaps) <= sync.POLL_FAST_SEC
+
+    def test_idle_team_still_spots_new_windows_quickly(self, monkeypatch, poll_state):
+        fake = _FakeRun(_pane_line(1, "a-impl", pane_id="%10", activity=900) + "\n",
+                        captures={"%10": "$\n", "%20": "new\n"})
+        monkeypatch.setattr(sync.subprocess, "run", fake)
+        now = 1000.0
+        while now < 1300.0:
+            now += self._cycle(fake, poll_state, now)
+        assert fake.count("capture-pane") == 1  # idle: one probe per POLL_PROBE_SEC, no captures
+        assert poll_state["cadence"]["1"][0] == sync.POLL_MAX_SEC
+        opened = now
+        fake.list_panes_stdout += _pane_line(2, "b-impl", pane_id="%20", activity=int(now)) + "\n"
+        while "2" not in poll_state["captures"]:
+            now += self._cycle(fake, poll_state, now)
+        assert now - opened <= sync.POLL_PROBE_SEC
+
+    def test_panes_without_activity_follow_the_backoff(self, monkeypatch, poll_state):
+        """tmux that reports no window_activity: captures are paced by the cadence, not every probe."""
+        fake = _FakeRun(_pane_line(1, "a-impl", pane_id="%10", activity=0) + "\n",
+                        captures={"%10": "$\n"})
+        monkeypatch.setattr(sync.subprocess, "run", fake)
+        now, probes = 1000.0, 0
+        while now < 1120.0:
+            now += self._cycle(fake, poll_state, now)
+            probes += 1
+        assert fake.count("capture-pane") < probes / 3
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Pixoo tmux Bench — TermScreen vs 旧 regex 除去パスの比較
+
+録画済み pane 出力（tmux control mode の %output 行そのまま）を両方の
+パスに流し、処理時間とスクロール表示に選ばれる行を比べる。
+同梱の tests/fixtures/tui-synthetic-*.out は tui_demo.py の合成出力なので、
+実セッションの評価には record で録ったものを渡すこと。
+
+Usage:
+  python3 tools/pixoo-tmux-bench.py [FIXTURE.out ...]   # 既定: tests/fixtures/tui-*.out
+  python3 tools/pixoo-tmux-bench.py record TARGET OUT.out [SECONDS]
+"""
+
+import argparse
+import re
+import select
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+import pixoo_tmux_sync as sync  # noqa: E402
+
+FIXTURE_DIR = REPO_DIR / "tests" / "fixtures"
+
+# --- 旧実装（比較用にここだけに残す） ---
+LEGACY_ANSI_ESCAPE_RE = re.compile(
+    r"\x1b\[[0-9;]*[a-zA-Z]"
+    r"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)"
+    r"|\x1b\[[0-?]*[ -/]*[@-~]"
+    r"|\x1b[()][A-Z0-9]"
+)
+LEGACY_CONTROL_CHAR_RE = re.compile(r"[\x00-\x08\x0b-\x1f]")
+
+
+def legacy_sanitize(raw: str) -> str:
+    return LEGACY_CONTROL_CHAR_RE.sub("", LEGACY_ANSI_ESCAPE_RE.sub("", raw))
+
+
+def legacy_scroll_text(captured: str) -> str:
+    lines = [line for line in captured.split("\n") if line.strip()]
+    return lines[-1].strip()[:80] if lines else ""
+
+
+class LegacyTail:
+    """The line-splitting + regex model PaneTail used before TermScreen."""
+
+    def __init__(self, history: int = sync.PANE_TAIL_LINES):
+        self.lines: list[str] = []
+        self.partial = ""
+        self.history = history
+
+    @staticmethod
+    def _render(raw: str) -> str:
+        text = LEGACY_ANSI_ESCAPE_RE.sub("", raw).rstrip("\r")
+        return LEGACY_CONTROL_CHAR_RE.sub("", text.rsplit("\r", 1)[-1])
+
+    def feed(self, text: str) -> None:
+        *done, self.partial = (self.partial + text).split("\n")
+        self.lines.extend(line for line in map(self._render, done) if line.strip())
+        del self.lines[:-self.history]
+
+    def text(self) -> str:
+        current = self._render(self.partial)
+        return "\n".join(self.lines + ([current] if current.strip() else []))
+
+
+# --- fixtures ---
+
+def load_fixture(path: Path) -> tuple[tuple[int, int], list[str], str | None]:
+    """((width, height), decoded %output chunks, tmux's final screen or None)."""
+    size = (80, 24)
+    chunks: list[str] = []
+    with path.open("rb") as f:
+        for line in f:
+            line = line.rstrip(b"\n")
+            if line.startswith(b"# size "):
+                w, h = line[7:].split(b"x")
+                size = (int(w), int(h))
+            elif line.startswith(b"%output "):
+                payload = line.split(b" ", 2)[2] if line.count(b" ") >= 2 else b""
+                chunks.append(sync.decode_control_output(payload).decode("utf-8", "replace"))
+    screen_path = path.with_suffix(".screen")
+    screen = screen_path.read_text() if screen_path.exists() else None
+    return size, chunks, screen
+
+
+def bench(path: Path) -> None:
+    size, chunks, screen = load_fixture(path)
+    total = sum(len(c) for c in chunks)
+    print(f"== {path.name}: {len(chunks)} chunks, {total} chars, {size[0]}x{size[1]}")
+
+    # 1 chunk ごとに「受信 → 表示テキスト更新」まで（control mode の publish 相当）
+    legacy = LegacyTail()
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        legacy.feed(chunk)
+        legacy_text = legacy_scroll_text(legacy.text())
+    legacy_s = time.perf_counter() - t0
+
+    term = sync.TermScreen(*size)
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        term.feed(chunk)
+        term_text = sync.extract_scroll_text(term.text())
+    term_s = time.perf_counter() - t0
+
+    # control mode は publish（≤ 1/CONTROL_PUBLISH_MIN_SEC 回/秒）でしか text() を作らない
+    feed_only = sync.TermScreen(*size)
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        feed_only.feed(chunk)
+    feed_s = time.perf_counter() - t0
+
+    for name, secs, text in (("regex", legacy_s, legacy_text), ("TermScreen", term_s, term_text)):
+        per_chunk = secs / max(1, len(chunks)) * 1e6
+        print(f"  {name:<10} {secs * 1000:8.1f} ms  {per_chunk:7.1f} µs/chunk  scroll: {text!r}")
+    print(f"  {'  feed only':<10} {feed_s * 1000:8.1f} ms  {feed_s / max(1, len(chunks)) * 1e6:7.1f} µs/chunk")
+
+    if screen is not None:
+        want = screen.rstrip("\n").split("\n")
+        got = ["".join(row).rstrip() for row in term.rows]
+        same = sum(1 for a, b in zip(want, got) if a.rstrip() == b)
+        print(f"  TermScreen vs tmux capture-pane: {same}/{len(want)} rows identical")
+        print(f"  tmux screen scroll: {sync.extract_scroll_text(screen)!r}")
+
+    # capture-pane 経路: プレーンテキストの除去コスト
+    if screen is not None:
+        n = 2000
+        t0 = time.perf_counter()
+        for _ in range(n):
+            legacy_sanitize(screen)
+        legacy_cap = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(n):
+            sync.sanitize_output(screen)
+        term_cap = time.perf_counter() - t0
+        print(f"  sanitize capture ×{n}: regex {legacy_cap * 1000:.1f} ms, "
+              f"sanitize_output {term_cap * 1000:.1f} ms")
+
+
+# --- recording ---
+
+def record(target: str, out: Path, seconds: float) -> None:
+    info = subprocess.run(
+        ["tmux", "display-message", "-p", "-t", target,
+         "#{session_name}\t#{pane_id}\t#{pane_width}\t#{pane_height}"],
+        capture_output=True, text=True, timeout=5,
+    )
+    if info.returncode != 0:
+        sys.exit(f"[!] tmux target not found: {target}")
+    session, pane_id, width, height = info.stdout.strip().split("\t")
+    proc = subprocess.Popen(
+        ["tmux", "-C", "attach-session", "-t", session, "-f", "read-only,ignore-size"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    prefix = f"%output {pane_id} ".encode()
+    print(f"[i] Recording {pane_id} ({width}x{height}) for {seconds}s → {out}")
+    lines = [f"# size {width}x{height}\n".encode()]
+    buf = b""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        readable, _, _ = select.select([proc.stdout], [], [], 0.2)
+        if not readable:
+            continue
+        data = proc.stdout.read1(65536)
+        if not data:
+            break
+        *complete, buf = (buf + data).split(b"\n")
+        lines.extend(line + b"\n" for line in complete if line.startswith(prefix))
+    proc.terminate()
+    proc.wait()
+    out.write_bytes(b"".join(lines))
+    screen = subprocess.run(
+        ["tmux", "capture-pane", "-p", "-t", pane_id],
+        capture_output=True, text=True, timeout=5,
+    )
+    out.with_suffix(".screen").write_text(screen.stdout)
+    print(f"[i] {len(lines) - 1} %output lines saved")
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if argv[:1] == ["record"]:
+        parser = argparse.ArgumentParser(
+            prog="pixoo-tmux-bench.py record",
+            description="TARGET の pane を録画し、OUT に %output 行、OUT.screen に終了時の capture-pane を保存",
+        )
+        parser.add_argument("target", metavar="TARGET", help="tmux target (e.g. shared:2, %%5)")
+        parser.add_argument("out", metavar="OUT.out", type=Path, help="output path (.screen is written next to it)")
+        parser.add_argument("seconds", metavar="SECONDS", type=float, nargs="?", default=15.0,
+                            help="recording time (default: %(default)s)")
+        args = parser.parse_args(argv[1:])
+        record(args.target, args.out, args.seconds)
+        return
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [-h] [FIXTURE.out ...]\n       %(prog)s record [-h] TARGET OUT.out [SECONDS]",
+        description="Pixoo tmux Bench — TermScreen vs 旧 regex 除去パスの比較",
+    )
+    parser.add_argument(
+        "paths", metavar="FIXTURE.out", type=Path, nargs="*",
+        help=f"recorded pane output (default: {FIXTURE_DIR.relative_to(REPO_DIR)}/tui-*.out)",
+    )
+    args = parser.parse_args(argv)
+    paths = args.paths or sorted(FIXTURE_DIR.glob("tui-*.out"))
+    if not paths:
+        sys.exit(f"[!] No fixtures in {FIXTURE_DIR}")
+    for path in paths:
+        if not path.exists():
+            parser.error(f"no such fixture: {path}")
+        bench(path)
+
+if __name__ == "__main__":
+    main()